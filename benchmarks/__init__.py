@@ -0,0 +1,3 @@
+"""
+Benchmarks for the analysis stages of opensoar on synthetic flights. Run with: python -m benchmarks.run
+"""
@@ -0,0 +1,264 @@
+"""
+Benchmark suite for the analysis stages of opensoar, using synthetic flights. IGC parsing is also compared with the
+aerofiles Reader on the IGC files of the repository (tests/igc_files), which contain real header, comment and
+extension records.
+
+Every stage is timed (best of a number of repetitions) and measured for peak memory (with tracemalloc, in a separate
+run). Stages on a single flight are scaled over the trace duration, the competition day over the number of competitors.
+
+Usage::
+
+    python -m benchmarks.run
+    python -m benchmarks.run --durations 1 12 --competitors 10 --repeat 1
+    python -m benchmarks.run --engine planar --json results.json
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import time
+import tracemalloc
+from typing import Callable, List
+
+from aerofiles.igc import Reader
+
+from benchmarks.synthetic import generate_race_task, generate_aat, generate_flight, flight_to_igc_lines
+from opensoar.competition.competition_day import CompetitionDay
+from opensoar.competition.competitor import Competitor
+from opensoar.igc.reader import parse_igc_bytes, parse_igc, read_igc
+from opensoar.task.trip import Trip
+from opensoar.thermals.flight_phases import FlightPhases
+from opensoar.thermals.pysoar_thermal_detector import PySoarThermalDetector
+from opensoar.utilities.distance_engines import PlanarDistanceEngine
+
+DEFAULT_DURATIONS = [1, 2, 4, 8, 12]  # hours
+DEFAULT_COMPETITORS = [10, 50, 100, 200]
+COMPETITION_DAY_DURATION = 3  # hours
+IGC_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests', 'igc_files')
+
+
+def measure(func: Callable[[], object], repeat: int):
+    """
+    :param func: function without arguments performing the stage
+    :param repeat: number of timed repetitions
+    :return: best time in seconds and peak memory in bytes
+    """
+
+    times = list()
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(times), peak
+
+
+def _task_length(duration: float) -> float:
+    """Leg length of a 3 leg task which can be completed in duration hours"""
+    task_hours = max(duration - 0.75, 0.25)
+    return task_hours * 3600 * 25 / 3  # cross country speed of 25 m/s
+
+
+def _engine(task, engine_name):
+    if engine_name == 'planar':
+        return PlanarDistanceEngine.from_waypoints(task.waypoints)
+    else:
+        return None
+
+
+def single_flight_stages(duration: float, sample_rate: int, engine_name: str):
+    """
+    Stages which analyse one flight of the given duration. Every stage creates new tasks and copies the trace,
+    such that no cached results of earlier repetitions are used.
+    :param duration: in hours
+    :param sample_rate: seconds between fixes
+    :param engine_name: 'ellipsoid' or 'planar'
+    :return: list of (name, function)
+    """
+
+    leg_length = _task_length(duration)
+    flight_duration = datetime.timedelta(hours=duration)
+
+    def race_task():
+        task = generate_race_task(leg_length=leg_length)
+        return generate_race_task(leg_length=leg_length, distance_engine=_engine(task, engine_name))
+
+    def aat():
+        t_min = datetime.timedelta(hours=max(duration - 1, 0.5))
+        task = generate_aat(leg_length=leg_length, t_min=t_min)
+        return generate_aat(leg_length=leg_length, t_min=t_min, distance_engine=_engine(task, engine_name))
+
+    race_trace = generate_flight(race_task(), flight_duration, sample_rate)
+    aat_trace = generate_flight(aat(), flight_duration, sample_rate)
+    aat_outlanding_trace = generate_flight(aat(), flight_duration, sample_rate, outlanding_fraction=0.6)
+    igc_lines = flight_to_igc_lines(generate_flight(race_task(), flight_duration, sample_rate, engine_noise=True))
+    igc_bytes = ''.join(igc_lines).encode('ascii')
+
+    def igc_parsing_aerofiles():
+        Reader(skip_duplicates=True).read(igc_lines)
+
+    def igc_parsing():
+        parse_igc_bytes(igc_bytes, fallback=False)
+
+    def sector_tests():
+        waypoint = race_task().waypoints[1]
+        for fix in race_trace:
+            waypoint.inside_sector(fix)
+
+    def race_apply_rules():
+        race_task().apply_rules(list(race_trace))
+
+    def aat_apply_rules():
+        aat().apply_rules(list(aat_trace))
+
+    def aat_outlanding_apply_rules():
+        aat().apply_rules(list(aat_outlanding_trace))
+
+    def thermal_detection():
+        task = race_task()
+        PySoarThermalDetector(task.distance_engine).analyse(list(race_trace))
+
+    def flight_phases_legs():
+        task = race_task()
+        trace = list(race_trace)
+        trip = Trip(task, trace)
+        phases = FlightPhases('pysoar', trace, trip, task.distance_engine)
+        for leg in range(trip.started_legs()):
+            phases.thermals(leg)
+            phases.cruises(leg)
+        phases.all_phases('all')
+
+    return [
+        ('aerofiles Reader.read', igc_parsing_aerofiles),
+        ('parse_igc_bytes', igc_parsing),
+        ('Waypoint.inside_sector', sector_tests),
+        ('RaceTask.apply_rules', race_apply_rules),
+        ('AAT.apply_rules completed', aat_apply_rules),
+        ('AAT.apply_rules outlanding', aat_outlanding_apply_rules),
+        ('PySoarThermalDetector.analyse', thermal_detection),
+        ('FlightPhases legs', flight_phases_legs),
+    ], len(race_trace)
+
+
+def igc_file_stages(igc_directory: str):
+    """
+    Parsing of all IGC files in a directory with the aerofiles Reader and with the reader of opensoar. Files are read
+    from disk within every stage. Lines which are not valid utf-8 are decoded as latin1 for the aerofiles Reader.
+    :param igc_directory:
+    :return: list of (name, function), number of files and total number of fixes
+    """
+
+    file_paths = sorted(os.path.join(igc_directory, file_name) for file_name in os.listdir(igc_directory)
+                        if file_name.lower().endswith('.igc'))
+
+    def aerofiles_reader():
+        for file_path in file_paths:
+            with open(file_path, encoding='latin1') as f:
+                Reader(skip_duplicates=True).read(f)
+
+    def opensoar_parse_igc():
+        for file_path in file_paths:
+            with open(file_path, encoding='latin1') as f:
+                parse_igc(f)
+
+    def opensoar_read_igc():
+        for file_path in file_paths:
+            read_igc(file_path)
+
+    number_of_fixes = sum(len(read_igc(file_path)['fix_records'][1]) for file_path in file_paths)
+
+    return [
+        ('aerofiles Reader.read (files)', aerofiles_reader),
+        ('parse_igc (files)', opensoar_parse_igc),
+        ('read_igc (files)', opensoar_read_igc),
+    ], len(file_paths), number_of_fixes
+
+
+def competition_day_stage(number_of_competitors: int, sample_rate: int, engine_name: str):
+    """
+    :param number_of_competitors:
+    :param sample_rate: seconds between fixes
+    :param engine_name: 'ellipsoid' or 'planar'
+    :return: function analysing a competition day
+    """
+
+    leg_length = _task_length(COMPETITION_DAY_DURATION)
+    task = generate_race_task(leg_length=leg_length)
+    distance_engine = _engine(task, engine_name)
+
+    traces = list()
+    for seed in range(number_of_competitors):
+        outlanding_fraction = 0.7 if seed % 10 == 9 else None  # some outlandings
+        traces.append(generate_flight(task, datetime.timedelta(hours=COMPETITION_DAY_DURATION), sample_rate, seed,
+                                      outlanding_fraction=outlanding_fraction))
+
+    def analyse_flights():
+        competitors = [Competitor(list(trace), competition_id=str(index)) for index, trace in enumerate(traces)]
+        day_task = generate_race_task(leg_length=leg_length, distance_engine=distance_engine)
+        competition_day = CompetitionDay('benchmark', datetime.date(2014, 6, 21), 'club', competitors, day_task)
+        competition_day.analyse_flights('pysoar')
+
+    return analyse_flights
+
+
+def run(durations: List[float], competitors: List[int], sample_rate: int, repeat: int, engine_name: str,
+        igc_directory: str = IGC_DIRECTORY):
+    results = list()
+
+    def report(stage, parameter, seconds, peak):
+        results.append(dict(stage=stage, parameter=parameter, seconds=seconds, peak_memory=peak))
+        print('{:<32} {:>22} {:>12.1f} {:>12.1f}'.format(stage, parameter, seconds * 1000, peak / 1e6), flush=True)
+
+    print('{:<32} {:>22} {:>12} {:>12}'.format('stage', 'parameter', 'time [ms]', 'peak [MB]'))
+
+    if igc_directory:
+        stages, number_of_files, number_of_fixes = igc_file_stages(igc_directory)
+        for stage, func in stages:
+            seconds, peak = measure(func, repeat)
+            report(stage, '{} files, {} fixes'.format(number_of_files, number_of_fixes), seconds, peak)
+
+    for duration in durations:
+        stages, number_of_fixes = single_flight_stages(duration, sample_rate, engine_name)
+        for stage, func in stages:
+            seconds, peak = measure(func, repeat)
+            report(stage, '{}h, {} fixes'.format(duration, number_of_fixes), seconds, peak)
+
+    for number_of_competitors in competitors:
+        func = competition_day_stage(number_of_competitors, sample_rate, engine_name)
+        seconds, peak = measure(func, repeat)
+        report('CompetitionDay.analyse_flights', '{} competitors'.format(number_of_competitors), seconds, peak)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--durations', type=float, nargs='+', default=DEFAULT_DURATIONS,
+                        help='trace durations in hours')
+    parser.add_argument('--competitors', type=int, nargs='*', default=DEFAULT_COMPETITORS,
+                        help='numbers of competitors for the competition day')
+    parser.add_argument('--sample-rate', type=int, default=1, help='seconds between fixes')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed repetitions per stage')
+    parser.add_argument('--engine', choices=['ellipsoid', 'planar'], default='ellipsoid', help='distance engine')
+    parser.add_argument('--igc-directory', default=IGC_DIRECTORY,
+                        help='directory with IGC files for comparing the readers. empty to skip.')
+    parser.add_argument('--json', help='optional path for storing the results')
+    args = parser.parse_args()
+
+    results = run(args.durations, args.competitors, args.sample_rate, args.repeat, args.engine, args.igc_directory)
+
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(dict(engine=args.engine, sample_rate=args.sample_rate, results=results), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""
+Deterministic generator for synthetic tasks and flights.
+
+The flights alternate straight cruises and circling climbs along the task, such that they exercise the same code paths
+as real flights: start line crossings, sector entries, thermal detection and (optionally) outlandings and ENL.
+Equal arguments always result in equal output.
+"""
+import datetime
+import random
+from math import radians, degrees, sin, cos, atan2, sqrt
+from typing import List
+
+from opensoar.task.aat import AAT
+from opensoar.task.race_task import RaceTask
+from opensoar.task.waypoint import Waypoint
+from opensoar.trace.trace import Trace
+
+EARTH_RADIUS = 6371000
+
+CRUISE_SPEED = 40  # m/s
+CRUISE_DURATION = 420  # s, duration of a cruise between two thermals
+CRUISE_SINK = 1.2  # m/s
+CIRCLING_SPEED = 25  # m/s
+CIRCLING_RADIUS = 90  # m
+CLIMB_RATE = 2.0  # m/s
+PRE_START_DURATION = 900  # s, circling below the start before crossing the line
+ENL_ENGINE_RUNNING = 900
+ENL_GLIDING = 20
+
+
+def _offset(lat, lon, distance_north, distance_east):
+    """Position at a (small) offset in meters, using a spherical approximation"""
+    end_lat = lat + degrees(distance_north / EARTH_RADIUS)
+    end_lon = lon + degrees(distance_east / (EARTH_RADIUS * cos(radians(lat))))
+    return end_lat, end_lon
+
+
+def _distance_bearing(lat1, lon1, lat2, lon2):
+    """Distance and bearing using a spherical approximation"""
+    north = radians(lat2 - lat1) * EARTH_RADIUS
+    east = radians(lon2 - lon1) * EARTH_RADIUS * cos(radians(0.5 * (lat1 + lat2)))
+    return sqrt(north ** 2 + east ** 2), degrees(atan2(east, north)) % 360
+
+
+def generate_waypoints(number_of_legs: int = 3, leg_length: float = 100000, latitude: float = 52.0,
+                       longitude: float = 6.0, aat: bool = False, seed: int = 0) -> List[Waypoint]:
+    """
+    Waypoints of a closed polygonal task, with a start line, a finish line and either turn point cylinders (race) or
+    large areas (aat).
+    :param number_of_legs:
+    :param leg_length: approximate length of every leg in meters
+    :param latitude: latitude of the start in degrees
+    :param longitude: longitude of the start in degrees
+    :param aat: when True, the turn points get areas (20 km, at most a quarter of the leg length) instead of
+                cylinders of 500 m
+    :param seed:
+    :return:
+    """
+    rng = random.Random(seed)
+
+    points = [(latitude, longitude)]
+    heading = rng.uniform(0, 360)
+    for _ in range(number_of_legs - 1):
+        lat, lon = points[-1]
+        length = leg_length * rng.uniform(0.9, 1.1)
+        points.append(_offset(lat, lon, length * cos(radians(heading)), length * sin(radians(heading))))
+        heading += 360 / number_of_legs + rng.uniform(-15, 15)
+    points.append((latitude, longitude))
+
+    turnpoint_radius = min(20000, 0.25 * leg_length) if aat else 500
+    waypoints = [Waypoint('Start', latitude, longitude, None, None, 5000, 90, True, 'next')]
+    for index, (lat, lon) in enumerate(points[1:-1]):
+        waypoints.append(Waypoint('TP{}'.format(index + 1), lat, lon, None, None, turnpoint_radius, 180, False,
+                                  'symmetrical'))
+    waypoints.append(Waypoint('Finish', latitude, longitude, None, None, 1000, 90, True, 'previous'))
+    return waypoints
+
+
+def generate_race_task(number_of_legs: int = 3, leg_length: float = 100000, seed: int = 0,
+                       distance_engine=None) -> RaceTask:
+    waypoints = generate_waypoints(number_of_legs, leg_length, seed=seed)
+    return RaceTask(waypoints, distance_engine=distance_engine)
+
+
+def generate_aat(number_of_legs: int = 3, leg_length: float = 100000, t_min: datetime.timedelta = None,
+                 seed: int = 0, distance_engine=None) -> AAT:
+    if t_min is None:
+        t_min = datetime.timedelta(hours=3)
+    waypoints = generate_waypoints(number_of_legs, leg_length, aat=True, seed=seed)
+    return AAT(waypoints, t_min, distance_engine=distance_engine)
+
+
+class _FlightState:
+    """Position, altitude and time of the synthetic glider, appending a fix for every sample"""
+
+    def __init__(self, lat, lon, altitude, time, sample_rate, engine_noise, rng):
+        self.lat = lat
+        self.lon = lon
+        self.altitude = altitude
+        self.time = time
+        self.sample_rate = sample_rate
+        self.engine_noise = engine_noise
+        self.rng = rng
+        self.fixes = list()
+
+    def add_fix(self, enl=ENL_GLIDING):
+        gps_alt = int(round(self.altitude))
+        fix = dict(time=self.time.time(), lat=self.lat, lon=self.lon, validity='A',
+                   pressure_alt=gps_alt - 30, gps_alt=gps_alt, datetime=self.time)
+        if self.engine_noise:
+            fix['ENL'] = enl + self.rng.randint(0, 10)
+        self.fixes.append(fix)
+        self.time += datetime.timedelta(seconds=self.sample_rate)
+
+    def cruise(self, bearing, duration):
+        """Fly straight ahead, with a small random heading noise"""
+        for _ in range(int(duration // self.sample_rate)):
+            heading = radians(bearing + self.rng.uniform(-3, 3))
+            distance = CRUISE_SPEED * self.sample_rate
+            self.lat, self.lon = _offset(self.lat, self.lon, distance * cos(heading), distance * sin(heading))
+            self.altitude -= CRUISE_SINK * self.sample_rate
+            self.add_fix()
+
+    def circle(self, duration, bearing):
+        """Climb in circles starting in the direction of bearing. The glider drifts slowly with the wind."""
+        direction = self.rng.choice((-1, 1))
+        turn_rate = direction * degrees(CIRCLING_SPEED / CIRCLING_RADIUS)  # degrees per second
+        drift_north, drift_east = self.rng.uniform(-2, 2), self.rng.uniform(-2, 2)
+
+        # centre of the circle perpendicular to the flight direction
+        center_bearing = radians(bearing + direction * 90)
+        center_lat, center_lon = _offset(self.lat, self.lon, CIRCLING_RADIUS * cos(center_bearing),
+                                         CIRCLING_RADIUS * sin(center_bearing))
+        angle = radians(bearing - direction * 90)  # angle of the glider as seen from the centre
+
+        climb_rate = CLIMB_RATE * self.rng.uniform(0.6, 1.4)
+        for _ in range(int(duration // self.sample_rate)):
+            angle += radians(turn_rate * self.sample_rate)
+            center_lat, center_lon = _offset(center_lat, center_lon, drift_north * self.sample_rate,
+                                             drift_east * self.sample_rate)
+            self.lat, self.lon = _offset(center_lat, center_lon, CIRCLING_RADIUS * cos(angle),
+                                         CIRCLING_RADIUS * sin(angle))
+            self.altitude += climb_rate * self.sample_rate
+            self.add_fix()
+
+    def stand_still(self, duration, enl=ENL_GLIDING):
+        for _ in range(int(duration // self.sample_rate)):
+            self.add_fix(enl)
+
+
+def generate_flight(task, duration: datetime.timedelta = None, sample_rate: int = 1, seed: int = 0,
+                    outlanding_fraction: float = None, engine_noise: bool = False,
+                    start_time: datetime.datetime = None, as_trace: bool = False):
+    """
+    Synthetic flight along the waypoints of a task, flying through the centre of every waypoint. Cruises and climbs
+    alternate, where the climb durations are chosen such that the task (or the part up to the outlanding) takes the
+    requested duration.
+    :param task: RaceTask or AAT
+    :param duration: total duration of the flight, including the part before the start. defaults to 3 hours.
+    :param sample_rate: seconds between fixes
+    :param seed:
+    :param outlanding_fraction: optional fraction of the task distance after which the glider lands
+    :param engine_noise: when True, ENL values are logged. With an outlanding, the engine is started after landing.
+    :param start_time: time of the first fix. defaults to 2014-06-21 10:00 UTC
+    :param as_trace: when True, a Trace is returned instead of a list of fixes
+    :return: list of fixes in the layout of aerofiles b-records, or Trace
+    """
+
+    if duration is None:
+        duration = datetime.timedelta(hours=3)
+    if start_time is None:
+        start_time = datetime.datetime(2014, 6, 21, 10, 0, 0, tzinfo=datetime.timezone.utc)
+
+    rng = random.Random(seed)
+    waypoints = task.waypoints
+
+    legs = list()
+    for waypoint1, waypoint2 in zip(waypoints[:-1], waypoints[1:]):
+        legs.append(_distance_bearing(waypoint1.latitude, waypoint1.longitude, waypoint2.latitude,
+                                      waypoint2.longitude))
+    task_distance = sum(distance for distance, _ in legs)
+    flown_distance = task_distance if outlanding_fraction is None else outlanding_fraction * task_distance
+
+    # landed time after an outlanding and the time after the finish are spent standing still
+    remaining_duration = 600
+    task_duration = duration.total_seconds() - PRE_START_DURATION - 300 - remaining_duration
+    cruise_duration = flown_distance / CRUISE_SPEED
+    if task_duration <= cruise_duration:
+        raise ValueError('Duration too short for the task')
+    climb_duration_per_cruise = (task_duration - cruise_duration) / max(cruise_duration / CRUISE_DURATION, 1)
+
+    # pre start: climb 2 km behind the start line
+    _, first_leg_bearing = legs[0]
+    start = waypoints[0]
+    lat, lon = _offset(start.latitude, start.longitude, -2000 * cos(radians(first_leg_bearing)),
+                       -2000 * sin(radians(first_leg_bearing)))
+    state = _FlightState(lat, lon, 800, start_time, sample_rate, engine_noise, rng)
+    state.circle(PRE_START_DURATION, first_leg_bearing)
+
+    # move back to the start line and start
+    distance_to_start, bearing_to_start = _distance_bearing(state.lat, state.lon, start.latitude, start.longitude)
+    state.cruise(bearing_to_start, distance_to_start / CRUISE_SPEED)
+
+    distance_flown = 0
+    time_since_climb = 0
+    for leg, (waypoint1, waypoint2) in enumerate(zip(waypoints[:-1], waypoints[1:])):
+
+        # prevent accumulation of the heading noise: aim at the next waypoint from the actual position
+        while True:
+            distance, bearing = _distance_bearing(state.lat, state.lon, waypoint2.latitude, waypoint2.longitude)
+            if distance < CRUISE_SPEED * state.sample_rate or distance_flown >= flown_distance:
+                break
+
+            step_duration = min(CRUISE_DURATION - time_since_climb, distance / CRUISE_SPEED,
+                                (flown_distance - distance_flown) / CRUISE_SPEED)
+            step_duration = max(step_duration, state.sample_rate)
+            state.cruise(bearing, step_duration)
+            distance_flown += CRUISE_SPEED * step_duration
+            time_since_climb += step_duration
+
+            if time_since_climb >= CRUISE_DURATION:
+                state.circle(climb_duration_per_cruise * rng.uniform(0.7, 1.3), bearing)
+                time_since_climb = 0
+
+        if distance_flown >= flown_distance:
+            break
+
+    if outlanding_fraction is None:
+        # fly through the finish
+        state.cruise(bearing, 120)
+        state.altitude = 0
+        state.stand_still(remaining_duration)
+    else:
+        state.altitude = 0
+        state.stand_still(remaining_duration / 2)
+        state.stand_still(remaining_duration / 2, enl=ENL_ENGINE_RUNNING if engine_noise else ENL_GLIDING)
+
+    if as_trace:
+        return Trace.from_fixes(state.fixes)
+    else:
+        return state.fixes
+
+
+def _igc_coordinate(value, degree_digits, positive, negative):
+    hemisphere = positive if value >= 0 else negative
+    minutes = round(abs(value) * 60000)
+    return '{:0{}d}{:05d}{}'.format(minutes // 60000, degree_digits, minutes % 60000, hemisphere)
+
+
+def flight_to_igc_lines(fixes) -> List[str]:
+    """
+    Minimal IGC file (header, I record and b-records) of a synthetic flight.
+    :param fixes: list of fixes or Trace
+    :return: lines including line endings
+    """
+
+    first_datetime = fixes[0]['datetime']
+    has_enl = 'ENL' in fixes[0]
+    lines = ['AXXXSYNTHETIC\r\n', 'HFDTE{}\r\n'.format(first_datetime.strftime('%d%m%y'))]
+    if has_enl:
+        lines.append('I013638ENL\r\n')
+
+    for fix in fixes:
+        line = 'B{}{}{}A{:05d}{:05d}'.format(fix['datetime'].strftime('%H%M%S'),
+                                             _igc_coordinate(fix['lat'], 2, 'N', 'S'),
+                                             _igc_coordinate(fix['lon'], 3, 'E', 'W'),
+                                             fix['pressure_alt'], fix['gps_alt'])
+        if has_enl:
+            line += '{:03d}'.format(fix['ENL'])
+        lines.append(line + '\r\n')
+
+    return lines
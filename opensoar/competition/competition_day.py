@@ -44,13 +44,16 @@ class CompetitionDay:
         self.date = date
         self.plane_class = plane_class
 
-    def analyse_flights(self, classification_method: str, analysis_progress=None, skip_failed_analyses: bool=False):
+    def analyse_flights(self, classification_method: str, analysis_progress=None, skip_failed_analyses: bool=False,
+                        sanitise: bool=False):
         """
         :param classification_method: method for detecting thermals. See FlightPhases for more info.
         :param analysis_progress: optional function to log the analysis progress. Should have the following signature:
                                   func(number_of_analyses, total_number_of_flights)
         :param skip_failed_analyses: if True, exceptions are caught during a failed analysis. a list is return with the
                                      competition ids of all failed analyses.
+        :param sanitise: if True, invalid fixes are removed from the traces before the analysis. See
+                         Competitor.sanitise.
         :return:
         """
 
@@ -65,6 +68,9 @@ class CompetitionDay:
         failed_comp_ids = []
         for competitor in self.competitors:
 
+            if sanitise and competitor.trace is not None:
+                competitor.sanitise()
+
             if skip_failed_analyses:
                 try:
                     competitor.analyse(self.task, classification_method)
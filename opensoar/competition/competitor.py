@@ -1,6 +1,9 @@
 from typing import List, Union
 
 from opensoar.task.trip import Trip
+from opensoar.trace.sanitising import sanitise, MAX_SPEED
+from opensoar.trace.store import TraceReference
+from opensoar.trace.trace import Trace
 from opensoar.thermals.flight_phases import FlightPhases
 
 
@@ -10,12 +13,13 @@ class Competitor:
     the plane and the gps trace.
     """
 
-    def __init__(self, trace: List, competition_id: str=None, plane_model: str=None, ranking: Union[int, str]=None,
-                 pilot_name: str=None):
+    def __init__(self, trace: Union[List, Trace, TraceReference], competition_id: str=None, plane_model: str=None,
+                 ranking: Union[int, str]=None, pilot_name: str=None):
 
         """
 
-        :param trace:
+        :param trace: list of b-records, Trace or TraceReference. A referenced trace is loaded from its TraceStore
+                      on first use.
         :param competition_id:
         :param plane_model:
         :param ranking: may also be 'HC' when competitor flies hors concours.
@@ -32,6 +36,19 @@ class Competitor:
         self._trip = None
         self._phases = None
 
+        # to be set by sanitise method
+        self.sanitising_report = None
+
+    @property
+    def trace(self):
+        if isinstance(self._trace, TraceReference):
+            self._trace = self._trace.load()
+        return self._trace
+
+    @trace.setter
+    def trace(self, trace):
+        self._trace = trace
+
     @property
     def trip(self):
         return self._trip
@@ -48,6 +65,15 @@ class Competitor:
     def phases(self):
         return self._phases
 
+    def sanitise(self, max_speed: float = MAX_SPEED, remove_zero_movement: bool = True):
+        """
+        Remove fixes with duplicate times, time reversals, gps spikes and fixes without movement from the trace, see
+        trace.sanitising. The removed fixes are listed in sanitising_report.
+        :param max_speed: m/s
+        :param remove_zero_movement: remove fixes which are identical to the previous fix apart from the time
+        """
+        self.trace, self.sanitising_report = sanitise(self.trace, max_speed, remove_zero_movement)
+
     def analyse(self, task, classification_method: str):
 
         if self.trace is None or len(self.trace) == 0:
@@ -57,4 +83,4 @@ class Competitor:
 
         # competitor should have at least started
         if len(self._trip.fixes) >= 1:
-            self._phases = FlightPhases(classification_method, self.trace, self._trip)
+            self._phases = FlightPhases(classification_method, self.trace, self._trip, task.distance_engine)
@@ -10,11 +10,10 @@ from typing import List, Dict, Tuple, Optional
 import urllib.request
 import logging
 
-from aerofiles.igc import Reader
-
 from opensoar.competition.competition_day import CompetitionDay
 from opensoar.competition.competitor import Competitor
 from opensoar.competition.daily_results_page import DailyResultsPage
+from opensoar.igc.parallel import read_igc_files
 from opensoar.task.task import Task
 from opensoar.task.waypoint import Waypoint
 from opensoar.task.race_task import RaceTask
@@ -31,7 +30,7 @@ class CrosscountryDaily(DailyResultsPage):
     BASE_API_URL = "https://www.crosscountry.aero/c/sgp/rest"
     FLIGHT_DOWNLOAD_URL = "https://www.crosscountry.aero/flight/download/sgp"
     
-    def __init__(self, url: str):
+    def __init__(self, url: str, compression: str = None):
         """
         Initialize with the URL to the Crosscountry API.
         
@@ -40,8 +39,9 @@ class CrosscountryDaily(DailyResultsPage):
                  https://www.crosscountry.aero/c/sgp/rest/day/{comp_id}/{day_id}
                  or
                  https://www.crosscountry.aero/c/sgp/rest/comp/{comp_id}
+            compression: Optional compression of the downloaded IGC files ('gz', 'xz' or 'zst')
         """
-        super().__init__(url)
+        super().__init__(url, compression)
         
         # Extract competition ID and day ID from the URL
         self.competition_id = None
@@ -272,7 +272,8 @@ class CrosscountryDaily(DailyResultsPage):
         
         return race_days
 
-    def generate_competition_day(self, target_directory: str, download_progress=None, start_time_buffer: int = 0):
+    def generate_competition_day(self, target_directory: str, download_progress=None, start_time_buffer: int = 0,
+                                 max_workers: int = 1):
         """
         Get competition day with all flights from the Crosscountry API.
         
@@ -280,6 +281,7 @@ class CrosscountryDaily(DailyResultsPage):
             target_directory: Directory in which the IGC files are saved
             download_progress: Optional progress function
             start_time_buffer: Optional relaxation on the start time in seconds
+            max_workers: Optional number of processes parsing the IGC files. None uses all cpus.
             
         Returns:
             CompetitionDay object
@@ -308,17 +310,14 @@ class CrosscountryDaily(DailyResultsPage):
         
         task = RaceTask(waypoints, timezone, start_opening, start_time_buffer)
         
-        # Download flights and create Competitor objects
-        competitors = []
+        # Download flights
+        downloaded = []
         files_downloaded = 0
         total_competitors = len(competitors_info)
         
         for competitor_info in competitors_info:
             competition_id = competitor_info['competition_id']
             igc_url = competitor_info['igc_url']
-            ranking = competitor_info['ranking']
-            plane_model = competitor_info['plane_model']
-            pilot_name = competitor_info['pilot_name']
             
             if igc_url is None:
                 logger.info(f"No IGC file available for {competition_id}")
@@ -327,21 +326,7 @@ class CrosscountryDaily(DailyResultsPage):
             try:
                 file_path = self.download_flight(igc_url, competition_id)
                 files_downloaded += 1
-                
-                # Try to read the IGC file with different encodings
-                try:
-                    # Try utf-8
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        parsed_igc = Reader(skip_duplicates=True).read(f)
-                except UnicodeDecodeError:
-                    # If not utf-8 use latin1
-                    with open(file_path, 'r', encoding='latin1') as f:
-                        parsed_igc = Reader(skip_duplicates=True).read(f)
-                    
-                # Create and add the competitor
-                trace = parsed_igc['fix_records'][1]
-                competitor = Competitor(trace, competition_id, plane_model, ranking, pilot_name)
-                competitors.append(competitor)
+                downloaded.append((competitor_info, file_path))
                 
                 # Update progress if callback provided
                 if download_progress is not None:
@@ -350,7 +335,22 @@ class CrosscountryDaily(DailyResultsPage):
             except Exception as e:
                 logger.error(f"Error processing competitor {competition_id}: {e}")
                 continue
-                    
+
+        # Parse the IGC files (concurrently when max_workers allows) and create Competitor objects
+        parsed_igc_files = read_igc_files([file_path for _, file_path in downloaded], max_workers)
+
+        competitors = []
+        for (competitor_info, _), parsed_igc in zip(downloaded, parsed_igc_files):
+            competition_id = competitor_info['competition_id']
+            if isinstance(parsed_igc, Exception):
+                logger.error(f"Error processing competitor {competition_id}: {parsed_igc}")
+                continue
+
+            trace = parsed_igc['fix_records'][1]
+            competitor = Competitor(trace, competition_id, competitor_info['plane_model'], competitor_info['ranking'],
+                                    competitor_info['pilot_name'])
+            competitors.append(competitor)
+
         # Create CompetitionDay object with competitors and task
         competition_day = CompetitionDay(competition_name, date, class_name, competitors, task)
         
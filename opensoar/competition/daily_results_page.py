@@ -10,6 +10,7 @@ from typing import List
 from bs4 import BeautifulSoup
 
 from opensoar.competition.competition_day import CompetitionDay
+from opensoar.igc.archive import compressed_file_path, write_igc_bytes
 from opensoar.task.task import Task
 from opensoar.utilities.retry_utils import web_request_retry
 
@@ -19,12 +20,20 @@ class DailyResultsPage(ABC):
     Abstract Base Class for daily result pages. Specific implementation example: soaringspot.
     """
 
-    def __init__(self, url):
+    def __init__(self, url, compression: str = None):
+        """
+        :param url:
+        :param compression: optional compression of the downloaded igc files: 'gz', 'xz' or 'zst' (requires the
+                            zstandard package). Files are read back transparently.
+        """
         if url.startswith('http://') or url.startswith('https://'):
             self.url = url
         else:
             self.url = 'http://{}'.format(url)
 
+        compressed_file_path('', compression)  # validates the compression
+        self.compression = compression
+
         self._igc_directory = None  # to be set in subclass
         self._html_soup = None  # to be set when the page is evaluated
 
@@ -76,7 +85,7 @@ class DailyResultsPage(ABC):
         :param competition_id:
         :return:
         """
-        return '{}.igc'.format(competition_id)
+        return compressed_file_path('{}.igc'.format(competition_id), self.compression)
 
     def igc_file_path(self, competition_id: str) -> str:
         """
@@ -110,9 +119,8 @@ class DailyResultsPage(ABC):
             response = requests.get(igc_url, timeout=30)
             response.raise_for_status()  # Raise an exception for HTTP errors
             
-            # Write the content to the file
-            with open(file_path, 'wb') as f:
-                f.write(response.content)
+            # Write the content to the file, compressed when requested
+            write_igc_bytes(file_path, response.content)
                 
             # Verify file was created
             if not os.path.exists(file_path):
@@ -125,7 +133,7 @@ class DailyResultsPage(ABC):
 
     @abstractmethod
     def generate_competition_day(self, target_directory: str, download_progress=None, start_time_buffer: int = 0,
-                                 include_hc_competitors: bool=True) -> CompetitionDay:
+                                 include_hc_competitors: bool=True, max_workers: int = 1) -> CompetitionDay:
         """
         Construct a CompetitionDay. Information is pulled from the overview table and
         from the igc files, which are automatically downloaded.
@@ -137,6 +145,7 @@ class DailyResultsPage(ABC):
                                   func(downloads, total_number_of_flights)
         :param start_time_buffer: optional relaxation on the start time in seconds. E.g. start_time_buffer = 10 means
                                   that a contestant can cross the start line 10 seconds before the official opening time
+        :param max_workers: optional number of processes parsing the igc files concurrently. None uses all cpus.
         :return:
         """
 
@@ -0,0 +1,182 @@
+"""
+Competition day from IGC files on disk, e.g. flights received by email or collected from loggers.
+The task is taken from the comment lines of the files (SoaringSpot or Strepla), so no network connection is needed.
+"""
+import datetime
+import glob
+import os
+from typing import Dict, List, Optional, Tuple
+
+from opensoar.competition import soaringspot, strepla
+from opensoar.competition.competition_day import CompetitionDay
+from opensoar.competition.competitor import Competitor
+from opensoar.competition.daily_results_page import DailyResultsPage
+from opensoar.igc.archive import COMPRESSIONS, zip_igc_members, read_zip_members
+from opensoar.igc.parallel import read_igc_files, parse_igc_contents
+from opensoar.igc.reader import read_igc_metadata, scan_igc_metadata
+from opensoar.task.task import Task
+
+IGC_EXTENSIONS = ['.igc'] + ['.igc' + extension for extension in COMPRESSIONS.values()]
+
+
+def get_info_from_metadata(metadata: dict, date: datetime.date,
+                           start_time_buffer: int = 0) -> Tuple[Optional[Task], dict]:
+    """
+    Task and competitor information from the comment lines, written either by SoaringSpot or by Strepla.
+    :param metadata: see igc.reader.read_igc_metadata
+    :param date: date of the flight, needed for the start opening of SoaringSpot tasks
+    :param start_time_buffer:
+    :return: task (None when not present) and competitor information
+    """
+
+    sources = {record['source'] for record in metadata['comment_records'][1]}
+    if 'SCS' in sources:
+        task, _, competitor_information = strepla.get_info_from_comment_lines(metadata, start_time_buffer)
+    else:
+        task, _, competitor_information = soaringspot.get_info_from_comment_lines(metadata, date, start_time_buffer)
+
+    return task, competitor_information
+
+
+class LocalDirectoryDaily:
+    """
+    Counterpart of DailyResultsPage for IGC files which are already on disk. The source is a directory, a glob
+    pattern or a zip file containing one IGC file per competitor. Compressed files ('.igc.gz', '.igc.xz',
+    '.igc.zst') are read transparently.
+    """
+
+    def __init__(self, source: str, competition_name: str = None, plane_class: str = None,
+                 date: datetime.date = None):
+        """
+        :param source: directory, glob pattern (e.g. 'flights/*.igc') or zip file
+        :param competition_name: defaults to the name of the directory or zip file
+        :param plane_class:
+        :param date: date of the competition day. defaults to the date in the header of the first file
+        """
+        self.source = source
+        self.competition_name = competition_name
+        self.plane_class = plane_class
+        self.date = date
+
+    def _is_zip(self) -> bool:
+        return self.source.lower().endswith('.zip') and os.path.isfile(self.source)
+
+    def igc_files(self) -> List[str]:
+        """Sorted IGC files in the source. For a zip file, the names of the members are returned."""
+
+        if self._is_zip():
+            return sorted(zip_igc_members(self.source))
+
+        if os.path.isdir(self.source):
+            file_paths = [os.path.join(self.source, file_name) for file_name in os.listdir(self.source)]
+        else:
+            file_paths = glob.glob(self.source)
+
+        return sorted(file_path for file_path in file_paths
+                      if os.path.isfile(file_path) and
+                      any(file_path.lower().endswith(extension) for extension in IGC_EXTENSIONS))
+
+    @staticmethod
+    def competition_id_from_file_name(file_name: str) -> str:
+        """File name without directory and IGC (and compression) extensions, e.g. 'flights/PR.igc.gz' -> 'PR'"""
+        base_name = os.path.basename(file_name)
+        for extension in sorted(IGC_EXTENSIONS, key=len, reverse=True):
+            if base_name.lower().endswith(extension):
+                return base_name[:-len(extension)]
+        return base_name
+
+    def _default_competition_name(self) -> str:
+        if self._is_zip():
+            return os.path.splitext(os.path.basename(self.source))[0]
+        elif os.path.isdir(self.source):
+            return os.path.basename(os.path.normpath(self.source))
+        else:
+            return os.path.basename(os.path.dirname(self.source)) or self.source
+
+    def _read_metadata(self, igc_file: str, zip_contents: Optional[Dict[str, bytes]]) -> dict:
+        if zip_contents is not None:
+            return scan_igc_metadata(zip_contents[igc_file])
+        else:
+            return read_igc_metadata(igc_file)
+
+    def _read_traces(self, igc_files: List[str], max_workers: int, zip_contents: Optional[Dict[str, bytes]]) -> list:
+        if zip_contents is not None:
+            return parse_igc_contents([zip_contents[igc_file] for igc_file in igc_files], max_workers)
+        else:
+            return read_igc_files(igc_files, max_workers)
+
+    def generate_competition_day(self, start_time_buffer: int = 0, max_workers: int = 1,
+                                 skip_different_task: bool = False, task: Task = None) -> CompetitionDay:
+        """
+        Construct a CompetitionDay from all IGC files in the source. The task is selected from the comment lines of all
+        files before any trace is decoded.
+
+        :param start_time_buffer: optional relaxation on the start time in seconds. E.g. start_time_buffer = 10 means
+                                  that a contestant can cross the start line 10 seconds before the official opening time
+        :param max_workers: number of processes parsing the igc files. None uses all cpus.
+        :param skip_different_task: leave out competitors whose file contains another task than the selected one
+        :param task: optional task, for files without task information. Overrides the task in the files.
+        :return:
+        """
+
+        if self._is_zip():
+            # the archive is opened and decompressed once, for both the metadata and the traces
+            zip_contents = read_zip_members(self.source)
+            igc_files = sorted(zip_contents)
+        else:
+            zip_contents = None
+            igc_files = self.igc_files()
+
+        if len(igc_files) == 0:
+            raise ValueError('No IGC files found in {}'.format(self.source))
+
+        date = self.date
+        flights = list()
+        tasks = list()
+        for igc_file in igc_files:
+            try:
+                metadata = self._read_metadata(igc_file, zip_contents)
+                if date is None:
+                    date = metadata['header'][1].get('utc_date')
+                file_task, competitor_information = get_info_from_metadata(metadata, date, start_time_buffer)
+            except Exception:
+                print('{} is skipped because the file could not be parsed'.format(igc_file))
+                continue
+
+            flights.append((igc_file, file_task, competitor_information))
+            if file_task is not None:
+                tasks.append(file_task)
+
+        if task is None:
+            if len(tasks) == 0:
+                raise ValueError('No task information in the IGC files. Provide the task explicitly.')
+            task = DailyResultsPage._select_task(tasks)
+
+        if skip_different_task:
+            # files without task information are left out as well (Task.__eq__ does not accept None)
+            for igc_file, file_task, _ in flights:
+                if file_task is None or file_task != task:
+                    print('{} is skipped because of a different task'.format(igc_file))
+            flights = [flight for flight in flights if flight[1] is not None and flight[1] == task]
+
+        parsed_igc_files = self._read_traces([igc_file for igc_file, _, _ in flights], max_workers, zip_contents)
+
+        competitors = list()
+        for (igc_file, _, competitor_information), parsed_igc_file in zip(flights, parsed_igc_files):
+            if isinstance(parsed_igc_file, Exception):
+                print('{} is skipped because the file could not be parsed'.format(igc_file))
+                continue
+
+            trace_errors, trace = parsed_igc_file['fix_records']
+            if len(trace_errors) != 0:
+                print('{} is skipped because of invalid trace'.format(igc_file))
+                continue
+
+            competition_id = competitor_information.get('competition_id') or \
+                self.competition_id_from_file_name(igc_file)
+            competitor = Competitor(trace, competition_id, competitor_information.get('plane_model'), None,
+                                    competitor_information.get('pilot_name'))
+            competitors.append(competitor)
+
+        competition_name = self.competition_name or self._default_competition_name()
+        return CompetitionDay(competition_name, date, self.plane_class, competitors, task)
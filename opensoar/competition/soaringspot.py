@@ -9,11 +9,12 @@ from typing import List, Tuple, Union, Optional
 from urllib.error import URLError
 from urllib.parse import urljoin
 
-from aerofiles.igc import Reader
 from bs4 import BeautifulSoup
 
 from opensoar.competition.competition_day import CompetitionDay
 from opensoar.competition.competitor import Competitor
+from opensoar.igc.parallel import read_igc_files
+from opensoar.igc.reader import read_igc_metadata
 from opensoar.task.aat import AAT
 from opensoar.task.race_task import RaceTask
 from opensoar.task.task import Task
@@ -257,8 +258,8 @@ class SoaringSpotDaily(DailyResultsPage):
     Helper class for dealing with daily result pages which are published on the SoaringSpot platform.
     """
 
-    def __init__(self, url: str):
-        super().__init__(url)
+    def __init__(self, url: str, compression: str = None):
+        super().__init__(url, compression)
 
     def _get_competitors_info(self, include_hc_competitors: bool, include_dns_competitors: bool = False) -> List[dict]:
         """
@@ -425,7 +426,16 @@ class SoaringSpotDaily(DailyResultsPage):
         return competition_name, date, plane_class
 
     def generate_competition_day(self, target_directory: str, download_progress=None, start_time_buffer: int=0,
-                                 include_hc_competitors: bool = True) -> CompetitionDay:
+                                 include_hc_competitors: bool = True, skip_different_task: bool = False,
+                                 max_workers: int = 1) -> CompetitionDay:
+        """
+        See DailyResultsPage.generate_competition_day. The task is selected from the comment lines of all files before
+        any trace is decoded.
+
+        :param skip_different_task: optional argument for leaving out competitors whose file contains another task
+                                    than the selected one. Their traces are not decoded.
+        :param max_workers: number of processes parsing the igc files. None uses all cpus.
+        """
 
         # get info from website
         competition_name, date, plane_class = self._get_competition_day_info()
@@ -433,7 +443,7 @@ class SoaringSpotDaily(DailyResultsPage):
 
         self.set_igc_directory(target_directory, competition_name, plane_class, date)
 
-        competitors = list()
+        flights = list()
         tasks = list()
         files_downloaded = 0
         unknown_number = 1  # number for empty competition IDs
@@ -458,34 +468,46 @@ class SoaringSpotDaily(DailyResultsPage):
             if download_progress is not None:
                 download_progress(files_downloaded, len(competitors_info))
 
+            # get info from file, without decoding the trace
             try:
-                try:  # try utf-8
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        parsed_igc_file = Reader(skip_duplicates=True).read(f)
-                except UnicodeDecodeError:  # if not utf-8 use latin1
-                    with open(file_path, 'r', encoding='latin1') as f:
-                        parsed_igc_file = Reader(skip_duplicates=True).read(f)
+                metadata = read_igc_metadata(file_path)
+                task, _, competitor_information = get_info_from_comment_lines(metadata, date, start_time_buffer)
             except Exception:
                 print('{} is skipped because the file could not be parsed'.format(competition_id))
                 continue
 
+            flights.append((competition_id, ranking, file_path, task, competitor_information))
+            if task is not None:
+                tasks.append(task)
+
+        # Select task from tasks list
+        task = self._select_task(tasks)
+
+        if skip_different_task:
+            # files without task information are left out as well (Task.__eq__ does not accept None)
+            for competition_id, _, _, competitor_task, _ in flights:
+                if competitor_task is None or competitor_task != task:
+                    print('{} is skipped because of a different task'.format(competition_id))
+            flights = [flight for flight in flights if flight[3] is not None and flight[3] == task]
+
+        parsed_igc_files = read_igc_files([file_path for _, _, file_path, _, _ in flights], max_workers)
+
+        competitors = list()
+        for flight, parsed_igc_file in zip(flights, parsed_igc_files):
+            competition_id, ranking, _, _, competitor_information = flight
+            if isinstance(parsed_igc_file, Exception):
+                print('{} is skipped because the file could not be parsed'.format(competition_id))
+                continue
+
             trace_errors, trace = parsed_igc_file['fix_records']
             if len(trace_errors) != 0:
                 print('{} is skipped because of invalid trace'.format(competition_id))
                 continue
 
-            # get info from file
-            task, _, competitor_information = get_info_from_comment_lines(parsed_igc_file, date, start_time_buffer)
             plane_model = competitor_information.get('plane_model', None)
             pilot_name = competitor_information.get('pilot_name', None)
 
             competitor = Competitor(trace, competition_id, plane_model, ranking, pilot_name)
-
             competitors.append(competitor)
-            if task is not None:
-                tasks.append(task)
-
-        # Select task from tasks list
-        task = self._select_task(tasks)
 
         return CompetitionDay(competition_name, date, plane_class, competitors, task)
@@ -0,0 +1,3 @@
+"""
+This package contains the functionality for reading IGC files.
+"""
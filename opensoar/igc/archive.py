@@ -0,0 +1,132 @@
+"""
+Compressed storage of IGC files.
+
+IGC files are plain ASCII with a lot of redundancy and compress well. Files ending in '.gz', '.xz' or '.zst' are
+compressed and decompressed transparently. Zstandard requires the optional `zstandard` package. A complete day can also
+be stored as a single zip file with one IGC file per competitor.
+"""
+import gzip
+import lzma
+import os
+import tempfile
+import zipfile
+from typing import Dict, List, Sequence
+
+COMPRESSIONS = {
+    'gz': '.gz',
+    'xz': '.xz',
+    'zst': '.zst',
+}
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError('Reading and writing .zst files requires the zstandard package: pip install zstandard')
+    return zstandard
+
+
+def compression_of(file_path: str):
+    """
+    :param file_path:
+    :return: key in COMPRESSIONS, None for uncompressed files
+    """
+    for compression, extension in COMPRESSIONS.items():
+        if file_path.endswith(extension):
+            return compression
+    return None
+
+
+def compressed_file_path(file_path: str, compression: str = None) -> str:
+    """Path of the compressed version of a file. Without compression, the path is returned unchanged."""
+    if compression is None:
+        return file_path
+    elif compression not in COMPRESSIONS:
+        raise ValueError('Unknown compression: {}. Choose from {}'.format(compression, list(COMPRESSIONS)))
+    return file_path + COMPRESSIONS[compression]
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == 'gz':
+        return gzip.decompress(data)
+    elif compression == 'xz':
+        return lzma.decompress(data)
+    elif compression == 'zst':
+        return _zstandard().ZstdDecompressor().decompress(data)
+    else:
+        return data
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == 'gz':
+        return gzip.compress(data)
+    elif compression == 'xz':
+        return lzma.compress(data)
+    elif compression == 'zst':
+        return _zstandard().ZstdCompressor(level=19).compress(data)
+    else:
+        return data
+
+
+def read_igc_bytes(file_path: str) -> bytes:
+    """
+    Raw (decompressed) content of an IGC file. The file is read with a single read and decompressed in memory.
+    :param file_path: plain IGC file or a file ending in '.gz', '.xz' or '.zst'
+    :return:
+    """
+    with open(file_path, 'rb') as f:
+        return _decompress(f.read(), compression_of(file_path))
+
+
+def write_igc_bytes(file_path: str, data: bytes):
+    """
+    Write the content of an IGC file, compressed according to the extension of file_path. The file is written to a
+    temporary file in the same directory first, such that an interrupted download never leaves a partial file behind.
+    :param file_path:
+    :param data: raw (uncompressed) content
+    """
+    compressed = _compress(data, compression_of(file_path))
+
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_path)), suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as f:
+            f.write(compressed)
+        os.replace(temporary_path, file_path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def _strip_compression(file_name: str) -> str:
+    compression = compression_of(file_name)
+    return file_name if compression is None else file_name[:-len(COMPRESSIONS[compression])]
+
+
+def _igc_members(archive: zipfile.ZipFile) -> List[str]:
+    return [name for name in archive.namelist() if _strip_compression(name).lower().endswith('.igc')]
+
+
+def zip_igc_members(zip_path: str) -> List[str]:
+    """Names of the (optionally compressed) IGC files in a zip archive, in archive order"""
+    with zipfile.ZipFile(zip_path) as archive:
+        return _igc_members(archive)
+
+
+def read_zip_member(zip_path: str, member: str) -> bytes:
+    """Raw (decompressed) content of an IGC file inside a zip archive"""
+    with zipfile.ZipFile(zip_path) as archive:
+        return _decompress(archive.read(member), compression_of(member))
+
+
+def read_zip_members(zip_path: str, members: Sequence[str] = None) -> Dict[str, bytes]:
+    """
+    Raw (decompressed) content of several IGC files inside a zip archive, with the archive opened once.
+    :param zip_path:
+    :param members: defaults to all IGC files in the archive
+    :return: content by member name, in the order of members
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        if members is None:
+            members = _igc_members(archive)
+        return {member: _decompress(archive.read(member), compression_of(member)) for member in members}
@@ -0,0 +1,125 @@
+"""
+Binary cache of parsed IGC files.
+
+The parsed content of an IGC file (trace columns, comment records, extensions and date) is stored in an .npz file,
+named after the SHA-256 hash of the raw file content. Re-analysing a downloaded competition day loads the traces from
+the cache instead of parsing the IGC text again. Since the key is the content, a changed or re-downloaded file with
+other content never uses a stale entry.
+"""
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+from opensoar.igc.archive import read_igc_bytes
+from opensoar.igc.reader import parse_igc_bytes
+from opensoar.trace.trace import Trace
+
+CACHE_DIRECTORY_NAME = '.trace_cache'
+CACHE_VERSION = 1  # increase when the layout of the cache files or the output of the reader changes
+
+_COLUMNS = ('time', 'lat', 'lon', 'gps_alt', 'pressure_alt')
+
+
+def content_hash(file_path: str) -> str:
+    """SHA-256 hex digest of the (decompressed) file content"""
+    return hashlib.sha256(read_igc_bytes(file_path)).hexdigest()
+
+
+def cache_file_path(cache_directory: str, digest: str) -> str:
+    return os.path.join(cache_directory, 'v{}-{}.npz'.format(CACHE_VERSION, digest))
+
+
+def save_parsed_igc(file_path: str, parsed_igc_file: dict):
+    """
+    Store parsed IGC content. The file is written to a temporary file first, such that an interrupted run never
+    leaves a partial cache entry behind.
+    :param file_path: path of the .npz file
+    :param parsed_igc_file: output of read_igc, without fix record errors
+    """
+
+    trace = parsed_igc_file['fix_records'][1]
+    utc_date = parsed_igc_file['header'][1].get('utc_date')
+
+    arrays = {column: getattr(trace, column) for column in _COLUMNS}
+    if trace.enl is not None:
+        arrays['enl'] = trace.enl
+    arrays['comment_records'] = np.array(json.dumps(parsed_igc_file['comment_records'][1]))
+    arrays['fix_record_extensions'] = np.array(json.dumps(parsed_igc_file['fix_record_extensions'][1]))
+    arrays['utc_date'] = np.array('' if utc_date is None else utc_date.isoformat())
+
+    directory = os.path.dirname(file_path)
+    os.makedirs(directory, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temporary_path, file_path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def load_parsed_igc(file_path: str) -> dict:
+    """
+    :param file_path: path of the .npz file
+    :return: dict in the layout of read_igc
+    """
+
+    with np.load(file_path, allow_pickle=False) as arrays:
+        trace = Trace(*(arrays[column] for column in _COLUMNS), enl=arrays['enl'] if 'enl' in arrays else None)
+        comment_records = json.loads(str(arrays['comment_records']))
+        extensions = json.loads(str(arrays['fix_record_extensions']))
+        utc_date = str(arrays['utc_date'])
+
+    header = dict(utc_date=datetime.date.fromisoformat(utc_date) if utc_date else None)
+    for extension in extensions:
+        extension['bytes'] = tuple(extension['bytes'])
+
+    return dict(fix_records=[[], trace],
+                comment_records=[[], comment_records],
+                fix_record_extensions=[[], extensions],
+                header=[[], header])
+
+
+def read_igc_cached(file_path: str, cache_directory: str = None) -> dict:
+    """
+    Read an IGC file, using the cached parse result when the same content has been parsed before. Files with
+    invalid fix records are not cached.
+    :param file_path: plain or compressed IGC file
+    :param cache_directory: defaults to a '.trace_cache' directory next to the IGC file
+    :return: see read_igc
+    """
+
+    if cache_directory is None:
+        cache_directory = os.path.join(os.path.dirname(os.path.abspath(file_path)), CACHE_DIRECTORY_NAME)
+
+    # the content is read once, for both the hash and (on a cache miss) the parsing. compressed files are hashed
+    # after decompression, such that they share the cache entry with the uncompressed file.
+    data = read_igc_bytes(file_path)
+
+    cache_path = cache_file_path(cache_directory, hashlib.sha256(data).hexdigest())
+    if os.path.exists(cache_path):
+        try:
+            return load_parsed_igc(cache_path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            # damaged entry (e.g. truncated): remove it, parse again and write a new entry
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+
+    parsed_igc_file = parse_igc_bytes(data)
+
+    fix_errors, trace = parsed_igc_file['fix_records']
+    if len(fix_errors) == 0 and isinstance(trace, Trace):
+        try:
+            save_parsed_igc(cache_path, parsed_igc_file)
+        except OSError:
+            pass  # e.g. read-only directory: caching is an optimization only
+
+    return parsed_igc_file
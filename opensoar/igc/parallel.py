@@ -0,0 +1,74 @@
+"""
+Parsing of many IGC files at once, e.g. all flights of a competition day, using a pool of worker processes.
+
+The traces are returned as Trace objects, which are transferred from the workers as a handful of NumPy arrays
+instead of a list of dicts per fix.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Sequence, Union
+
+from opensoar.igc.cache import read_igc_cached
+from opensoar.igc.reader import read_igc, parse_igc_bytes
+
+
+def _read_igc_file(file_path: str, use_cache: bool) -> Union[dict, Exception]:
+    """Parse a single file. Errors are returned instead of raised, such that one invalid file does not stop the pool"""
+    try:
+        if use_cache:
+            return read_igc_cached(file_path)
+        else:
+            return read_igc(file_path)
+    except Exception as e:
+        return e
+
+
+def read_igc_files(file_paths: Sequence[str], max_workers: int = 1,
+                   use_cache: bool = True) -> List[Union[dict, Exception]]:
+    """
+    Parse IGC files concurrently.
+    :param file_paths:
+    :param max_workers: number of worker processes. 1 parses in the current process, None uses all cpus.
+    :param use_cache: read through the binary trace cache, see read_igc_cached
+    :return: parsed files (see read_igc) in the order of file_paths. For a file which could not be read or parsed,
+             the exception is returned in its place.
+    """
+
+    if max_workers == 1 or len(file_paths) <= 1:
+        return [_read_igc_file(file_path, use_cache) for file_path in file_paths]
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    # chunks reduce the overhead per task, while leaving enough chunks to balance the load
+    chunksize = max(1, len(file_paths) // (4 * max_workers))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_read_igc_file, file_paths, [use_cache] * len(file_paths), chunksize=chunksize))
+
+
+def _parse_igc_content(data: bytes) -> Union[dict, Exception]:
+    """Parse the content of a single file. Errors are returned instead of raised, see _read_igc_file"""
+    try:
+        return parse_igc_bytes(data)
+    except Exception as e:
+        return e
+
+
+def parse_igc_contents(contents: Sequence[bytes], max_workers: int = 1) -> List[Union[dict, Exception]]:
+    """
+    Parse the raw content of IGC files concurrently, e.g. the members of a zip archive (see read_zip_members).
+    :param contents: raw (decompressed) content per file
+    :param max_workers: number of worker processes. 1 parses in the current process, None uses all cpus.
+    :return: parsed files (see read_igc) in the order of contents. For content which could not be parsed, the
+             exception is returned in its place.
+    """
+
+    if max_workers == 1 or len(contents) <= 1:
+        return [_parse_igc_content(data) for data in contents]
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    chunksize = max(1, len(contents) // (4 * max_workers))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_parse_igc_content, contents, chunksize=chunksize))
@@ -0,0 +1,310 @@
+"""
+Fast IGC reader which decodes the B records of a file directly into the columns of a Trace.
+
+Only the records needed for the analysis are decoded: B records (including the ENL extension announced in the
+I record), L records and the date from the H records. The result has the layout of the aerofiles Reader output for
+these records, such that it can be used by the functions which extract the task from the comment lines. Files which
+can not be decoded in a vectorized way fall back to the aerofiles Reader.
+"""
+import datetime
+import re
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from aerofiles.igc import Reader
+
+from opensoar.igc.archive import read_igc_bytes, read_zip_members
+from opensoar.trace.trace import Trace
+
+B_RECORD_LENGTH = 35  # number of characters in a b-record without extensions
+
+_METADATA_LINE = re.compile(rb'^[HIL][^\r\n]*', re.MULTILINE)
+
+_DIGIT_WEIGHTS_2 = np.array([10, 1])
+_DIGIT_WEIGHTS_3 = np.array([100, 10, 1])
+_DIGIT_WEIGHTS_5 = np.array([10000, 1000, 100, 10, 1])
+
+
+class IgcDecodeError(ValueError):
+    """Raised when a file contains records which can not be decoded by the fast reader"""
+
+
+def decode_h_utc_date(line: str):
+    """
+    Date from a 'HFDTE' record, either in the short ('HFDTE210614') or long ('HFDTEDATE:210614,01') format.
+    :param line:
+    :return: date, None for '000000'
+    """
+    colon = line.find(':', 5)
+    value = line[colon + 1:].strip() if colon >= 0 else line[5:].strip()
+    date_str = value[:6]
+
+    if len(date_str) != 6:
+        raise IgcDecodeError('Date string does not have correct length')
+    elif date_str == '000000':
+        return None
+    return datetime.datetime.strptime(date_str, '%d%m%y').date()
+
+
+def decode_i_record(line: str) -> List[dict]:
+    """
+    Extensions of the b-records.
+    :param line: e.g. 'I023638FXA3941ENL'
+    :return: list of dicts with keys 'bytes' (1-based first and last position) and 'extension_type'
+    """
+    line = line.strip()
+    extension_count = int(line[1:3])
+
+    extensions = list()
+    for index in range(extension_count):
+        position = 3 + index * 7
+        if position + 7 > len(line):
+            raise IgcDecodeError('Incomplete extension record')
+        extensions.append({
+            'bytes': (int(line[position:position + 2]), int(line[position + 2:position + 4])),
+            'extension_type': line[position + 4:position + 7],
+        })
+
+    return extensions
+
+
+def _digits(characters: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Integer value of columns of ascii digits"""
+    digits = characters.astype(np.int64) - ord('0')
+    if np.any((digits < 0) | (digits > 9)):
+        raise IgcDecodeError('Unexpected character in numeric field')
+    return digits @ weights
+
+
+def _signed_digits(characters: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Integer value of columns of ascii digits, of which the first may be a minus sign"""
+    negative = characters[:, 0] == ord('-')
+    characters = characters.copy()
+    characters[negative, 0] = ord('0')
+    values = _digits(characters, weights)
+    return np.where(negative, -values, values)
+
+
+def _extension_values(b_lines: List[str], extension: dict) -> np.ndarray:
+    """Values of an integer extension. Missing and malformed values are taken as zero."""
+    start_byte, end_byte = extension['bytes']
+    strings = [line[start_byte - 1:end_byte] for line in b_lines]
+
+    try:
+        return np.array(strings).astype(np.int64)
+    except ValueError:
+        values = np.zeros(len(strings), dtype=np.int64)
+        for index, string in enumerate(strings):
+            try:
+                values[index] = int(string)
+            except ValueError:
+                continue
+        return values
+
+
+def decode_b_records(b_lines: List[str], date: datetime.date, extensions: List[dict] = None,
+                     skip_duplicates: bool = True) -> Trace:
+    """
+    Decode all b-records at once.
+    :param b_lines: lines starting with 'B', either as str or as (undecoded) bytes
+    :param date: utc date of the first fix
+    :param extensions: decoded I record. Only the ENL extension is used.
+    :param skip_duplicates: remove fixes with the same time as the previous fix (as aerofiles Reader does)
+    :return:
+    """
+
+    if len(b_lines) == 0:
+        return Trace([], [], [])
+    if date is None:
+        raise IgcDecodeError('No date present')
+
+    if isinstance(b_lines[0], bytes):
+        buffer = b''.join([line[:B_RECORD_LENGTH] for line in b_lines])
+    else:
+        try:
+            buffer = ''.join([line[:B_RECORD_LENGTH] for line in b_lines]).encode('ascii')
+        except UnicodeEncodeError:
+            raise IgcDecodeError('Non ascii characters in b-records')
+    if len(buffer) != B_RECORD_LENGTH * len(b_lines):
+        raise IgcDecodeError('B-record too short')
+    records = np.frombuffer(buffer, dtype=np.uint8).reshape(len(b_lines), B_RECORD_LENGTH)
+
+    seconds_of_day = (_digits(records[:, 1:3], _DIGIT_WEIGHTS_2) * 3600 +
+                      _digits(records[:, 3:5], _DIGIT_WEIGHTS_2) * 60 +
+                      _digits(records[:, 5:7], _DIGIT_WEIGHTS_2))
+
+    # same operations as aerofiles, such that the coordinates are bitwise equal
+    lat = _digits(records[:, 7:9], _DIGIT_WEIGHTS_2) + (_digits(records[:, 9:14], _DIGIT_WEIGHTS_5) / 1000) / 60.
+    lon = _digits(records[:, 15:18], _DIGIT_WEIGHTS_3) + (_digits(records[:, 18:23], _DIGIT_WEIGHTS_5) / 1000) / 60.
+    if np.any(lat > 90) or np.any(lon > 180):
+        raise IgcDecodeError('Coordinate out of range')
+    if not (np.all(np.isin(records[:, 14], (ord('N'), ord('S')))) and
+            np.all(np.isin(records[:, 23], (ord('E'), ord('W'))))):
+        raise IgcDecodeError('Invalid hemisphere')
+    lat = np.where(records[:, 14] == ord('S'), -lat, lat)
+    lon = np.where(records[:, 23] == ord('W'), -lon, lon)
+
+    pressure_alt = _signed_digits(records[:, 25:30], _DIGIT_WEIGHTS_5)
+    gps_alt = _signed_digits(records[:, 30:35], _DIGIT_WEIGHTS_5)
+
+    enl = None
+    for extension in extensions or []:
+        if extension['extension_type'] == 'ENL':
+            enl = _extension_values(b_lines, extension)
+
+    # a time before the previous fix means that the next day has started
+    time_differences = np.diff(seconds_of_day)
+    days = np.concatenate([[0], np.cumsum(time_differences < 0)])
+    start_of_day = datetime.datetime.combine(date, datetime.time(), tzinfo=datetime.timezone.utc).timestamp()
+    time = int(start_of_day) + days * 86400 + seconds_of_day
+
+    if skip_duplicates:
+        keep = np.concatenate([[True], time_differences != 0])
+        if not np.all(keep):
+            time, lat, lon, pressure_alt, gps_alt = time[keep], lat[keep], lon[keep], pressure_alt[keep], gps_alt[keep]
+            enl = None if enl is None else enl[keep]
+
+    return Trace(time, lat, lon, gps_alt, pressure_alt, enl)
+
+
+def _parse_with_aerofiles(lines: List[str], skip_duplicates: bool) -> dict:
+    parsed_igc_file = Reader(skip_duplicates=skip_duplicates).read(lines)
+
+    trace_errors, trace = parsed_igc_file['fix_records']
+    if len(trace_errors) == 0:
+        parsed_igc_file['fix_records'] = [trace_errors, Trace.from_fixes(trace)]
+
+    return parsed_igc_file
+
+
+def _split_records(lines: Iterable[str]) -> Tuple[List[str], List[dict], dict, List[dict]]:
+    """
+    Sort the lines by record type and decode all records except the b-records.
+    :param lines:
+    :return: b-record lines, comment records, header and extensions
+    """
+
+    b_lines = list()
+    comment_records = list()
+    header = dict()
+    extensions = list()
+
+    for line in lines:
+        record_type = line[:1]
+        if record_type == 'B':
+            b_lines.append(line)
+        elif record_type == 'L':
+            comment_records.append({'source': line[1:4], 'comment': line[4:].strip()})
+        elif record_type == 'H' and line[2:5] == 'DTE':
+            header['utc_date'] = decode_h_utc_date(line)
+        elif record_type == 'I':
+            extensions = decode_i_record(line)
+
+    return b_lines, comment_records, header, extensions
+
+
+def parse_igc(lines: Iterable[str], skip_duplicates: bool = True, fallback: bool = True) -> dict:
+    """
+    Parse the lines of an IGC file.
+    :param lines: e.g. an opened (text) file
+    :param skip_duplicates: remove fixes with the same time as the previous fix
+    :param fallback: use the aerofiles Reader when the fast decoding fails. Otherwise IgcDecodeError is raised.
+    :return: dict with keys 'fix_records', 'comment_records', 'fix_record_extensions' and 'header', in the layout
+             of the aerofiles Reader. The trace in 'fix_records' is a Trace.
+    """
+
+    lines = list(lines)
+
+    try:
+        b_lines, comment_records, header, extensions = _split_records(lines)
+        trace = decode_b_records(b_lines, header.get('utc_date'), extensions, skip_duplicates)
+    except ValueError:
+        if fallback:
+            return _parse_with_aerofiles(lines, skip_duplicates)
+        raise
+
+    return dict(fix_records=[[], trace],
+                comment_records=[[], comment_records],
+                fix_record_extensions=[[], extensions],
+                header=[[], header])
+
+
+def _decode_line(line: bytes) -> str:
+    try:
+        return line.decode('utf-8')
+    except UnicodeDecodeError:
+        return line.decode('latin1')
+
+
+def scan_igc_metadata(data: bytes) -> dict:
+    """
+    Decode only the H, I and L records of an IGC file. The b-records, which make up almost all of a file, are
+    skipped without being decoded. This is sufficient for extracting the task and competitor information from the
+    comment lines. Since these lines are usually appended after the b-records, the complete file is scanned.
+    :param data: raw content of an IGC file
+    :return: dict with keys 'comment_records', 'fix_record_extensions' and 'header', in the layout of parse_igc
+    """
+
+    lines = [_decode_line(match.group()) for match in _METADATA_LINE.finditer(data)]
+    _, comment_records, header, extensions = _split_records(lines)
+
+    return dict(comment_records=[[], comment_records],
+                fix_record_extensions=[[], extensions],
+                header=[[], header])
+
+
+def parse_igc_bytes(data: bytes, skip_duplicates: bool = True, fallback: bool = True) -> dict:
+    """
+    Parse the raw content of an IGC file. The b-records are decoded from the bytes directly, all other lines are
+    decoded one by one as utf-8, with latin1 as fallback for lines which are not valid utf-8.
+    :param data:
+    :param skip_duplicates: remove fixes with the same time as the previous fix
+    :param fallback: use the aerofiles Reader when the fast decoding fails. Otherwise IgcDecodeError is raised.
+    :return: see parse_igc
+    """
+
+    raw_lines = data.splitlines()
+
+    try:
+        b_lines = [line for line in raw_lines if line[:1] == b'B']
+        other_lines = [_decode_line(line) for line in raw_lines if line[:1] != b'B']
+        _, comment_records, header, extensions = _split_records(other_lines)
+        trace = decode_b_records(b_lines, header.get('utc_date'), extensions, skip_duplicates)
+    except ValueError:
+        if fallback:
+            return _parse_with_aerofiles([_decode_line(line) + '\n' for line in raw_lines], skip_duplicates)
+        raise
+
+    return dict(fix_records=[[], trace],
+                comment_records=[[], comment_records],
+                fix_record_extensions=[[], extensions],
+                header=[[], header])
+
+
+def read_igc(file_path: str, skip_duplicates: bool = True) -> dict:
+    """
+    Read an IGC file from disk. The file is read once and decoded line by line, see parse_igc_bytes.
+    :param file_path: plain or compressed ('.gz', '.xz', '.zst') IGC file
+    :param skip_duplicates: remove fixes with the same time as the previous fix
+    :return: see parse_igc
+    """
+    return parse_igc_bytes(read_igc_bytes(file_path), skip_duplicates)
+
+
+def read_igc_metadata(file_path: str) -> dict:
+    """
+    Read the H, I and L records of an IGC file from disk. Lines are decoded as utf-8, with latin1 as fallback.
+    :param file_path: plain or compressed ('.gz', '.xz', '.zst') IGC file
+    :return: see scan_igc_metadata
+    """
+    return scan_igc_metadata(read_igc_bytes(file_path))
+
+
+def read_igc_zip(zip_path: str, skip_duplicates: bool = True) -> Dict[str, dict]:
+    """
+    Read all IGC files in a zip archive, e.g. all flights of a day.
+    :param zip_path:
+    :param skip_duplicates: remove fixes with the same time as the previous fix
+    :return: parsed files (see read_igc) by member name, in archive order
+    """
+    return {member: parse_igc_bytes(data, skip_duplicates) for member, data in read_zip_members(zip_path).items()}
@@ -1,23 +1,10 @@
 import datetime
-from copy import deepcopy
+from bisect import bisect_left
 
-from opensoar.task.task import Task
-from opensoar.utilities.helper_functions import double_iterator, calculate_distance_bearing, calculate_destination
-
-
-# TODO: This is a temporary fix for deepcopy issues with TimeZoneFix
-# Issue reference: https://github.com/Turbo87/aerofiles/issues/318
-# Remove this once aerofiles is updated with a proper fix
-from aerofiles.util.timezone import TimeZoneFix
-
-# TimeZoneFix from aerofiles doesn't support deepcopy properly
-# Add a __deepcopy__ method to fix serialization issues
-def _deepcopy_timezone_fix(self, memo):
-    """Create a proper deep copy of a TimeZoneFix instance."""
-    return TimeZoneFix(self.fix)
-
-# Apply monkeypatch
-TimeZoneFix.__deepcopy__ = _deepcopy_timezone_fix
+from opensoar.task.task import Task, TripIndices
+from opensoar.trace.resampling import decimate
+from opensoar.utilities.helper_functions import double_iterator, calculate_distance_bearing
+from opensoar.utilities.segment_table import get_segment_table
 
 
 class AAT(Task):
@@ -25,8 +12,12 @@ class AAT(Task):
     Assigned Area Task.
     """
 
+    # the distance optimization uses at most this many (evenly decimated) fixes per sector and after the last sector
+    MAX_FIXES_SECTOR = 300
+    MAX_FIXES_OUTSIDE_SECTOR = 300
+
     def __init__(self, waypoints, t_min: datetime.timedelta, timezone: int=None, start_opening: datetime.time=None,
-                 start_time_buffer: int=0, multistart: bool=False):
+                 start_time_buffer: int=0, multistart: bool=False, distance_engine=None):
         """
         :param waypoints:           see super()
         :param t_min:               minimal time to complete task
@@ -34,8 +25,9 @@ class AAT(Task):
         :param start_opening:       see super()
         :param start_time_buffer:   see super()
         :param multistart:          see super()
+        :param distance_engine:     see super()
         """
-        super().__init__(waypoints, timezone, start_opening, start_time_buffer, multistart)
+        super().__init__(waypoints, timezone, start_opening, start_time_buffer, multistart, distance_engine)
 
         self._t_min = t_min
         self._nominal_distances = self._calculate_nominal_distances()
@@ -58,11 +50,30 @@ class AAT(Task):
         return distances
 
     def apply_rules(self, trace):
-        fixes, outlanding_fix, sector_fixes = self._calculate_trip_fixes(trace)
-        start_time = self.determine_refined_start(trace, fixes)
+        return self._apply_rules(trace)[:6]
+
+    def apply_rules_indices(self, trace):
+        if type(self).apply_rules is not AAT.apply_rules:
+            # apply_rules is overridden in a subclass: derive the indices from its result
+            return super().apply_rules_indices(trace)
+        return self._apply_rules(trace)
+
+    def _apply_rules(self, trace):
+        """
+        :param trace:
+        :return: result of apply_rules with the trace indices of the trip fixes appended as TripIndices
+        """
+        fix_indices, outlanding_index, sector_indices = self._calculate_trip_fix_indices(trace)
+        fixes = [trace[fix_index] for fix_index in fix_indices]
+        outlanding_fix = None if outlanding_index is None else trace[outlanding_index]
+        sector_fixes = [[trace[fix_index] for fix_index in indices] for indices in sector_indices]
+
+        start_time = self.determine_refined_start(trace, fixes, fix_indices[0])
         distances = self._determine_trip_distances(fixes, outlanding_fix)
         finish_time = self._determine_finish_time(fixes, outlanding_fix)
-        return fixes, start_time, outlanding_fix, distances, finish_time, sector_fixes
+
+        indices = TripIndices(fix_indices, sector_indices, outlanding_index)
+        return fixes, start_time, outlanding_fix, distances, finish_time, sector_fixes, indices
 
     def _determine_finish_time(self, fixes, outlanding_fix):
         total_trip_time = (fixes[-1]['datetime'] - fixes[0]['datetime']).total_seconds()
@@ -73,36 +84,42 @@ class AAT(Task):
             finish_time = fixes[-1]['datetime']
         return finish_time
 
-    def _calculate_trip_fixes(self, trace):
+    def _calculate_trip_fix_indices(self, trace):
+        """
+        All fixes are handled by their index in the trace.
+        :param trace:
+        :return: indices of the trip fixes, the outlanding fix (None when completed) and the sector fixes
+        """
 
-        sector_fixes, enl_outlanding_fix = self._get_sector_fixes(trace)
-        reduced_sector_fixes = self._reduce_sector_fixes(sector_fixes, max_fixes_sector=300)
+        sector_indices, enl_outlanding_index = self._get_sector_fix_indices(trace)
+        reduced_sector_indices = self._reduce_sector_indices(sector_indices, self.MAX_FIXES_SECTOR)
 
-        outlanded = len(sector_fixes) != self.no_legs+1
+        outlanded = len(sector_indices) != self.no_legs+1
 
         if outlanded:
-            outside_sector_fixes = self._get_outside_sector_fixes(trace, sector_fixes, enl_outlanding_fix)
-            reduced_outside_sector_fixes = self._reduce_fixes(outside_sector_fixes, max_fixes=300)
+            outside_sector_indices = self._get_outside_sector_indices(trace, sector_indices, enl_outlanding_index)
+            reduced_outside_sector_indices = decimate(outside_sector_indices, self.MAX_FIXES_OUTSIDE_SECTOR)
 
-            waypoint_fixes = self._get_waypoint_fixes(outlanded, reduced_sector_fixes, reduced_outside_sector_fixes)
-            max_distance_fixes = self._compute_max_distance_fixes(outlanded, waypoint_fixes)
+            waypoint_indices = self._get_waypoint_indices(outlanded, reduced_sector_indices,
+                                                        reduced_outside_sector_indices)
+            max_distance_indices = self._compute_max_distance_indices(trace, outlanded, waypoint_indices)
 
-            waypoint_fixes = self._refine_max_distance_fixes(outlanded, max_distance_fixes, sector_fixes,
-                                                             reduced_outside_sector_fixes)
-            max_distance_fixes = self._compute_max_distance_fixes(outlanded, waypoint_fixes)
+            waypoint_indices = self._refine_max_distance_indices(outlanded, max_distance_indices, sector_indices,
+                                                               reduced_outside_sector_indices)
+            max_distance_indices = self._compute_max_distance_indices(trace, outlanded, waypoint_indices)
 
-            trip_fixes = max_distance_fixes[:-1]
-            outlanding_fix = max_distance_fixes[-1]
+            trip_indices = max_distance_indices[:-1]
+            outlanding_index = max_distance_indices[-1]
         else:
-            max_distance_fixes = self._compute_max_distance_fixes(outlanded, reduced_sector_fixes)
-            waypoint_fixes = self._refine_max_distance_fixes(outlanded, max_distance_fixes, sector_fixes)
+            max_distance_indices = self._compute_max_distance_indices(trace, outlanded, reduced_sector_indices)
+            waypoint_indices = self._refine_max_distance_indices(outlanded, max_distance_indices, sector_indices)
 
-            max_distance_fixes = self._compute_max_distance_fixes(outlanded, waypoint_fixes)
+            max_distance_indices = self._compute_max_distance_indices(trace, outlanded, waypoint_indices)
 
-            trip_fixes = max_distance_fixes
-            outlanding_fix = None
+            trip_indices = max_distance_indices
+            outlanding_index = None
 
-        return trip_fixes, outlanding_fix, sector_fixes
+        return trip_indices, outlanding_index, sector_indices
 
     def _determine_trip_distances(self, fixes, outlanding_fix):
 
@@ -118,95 +135,94 @@ class AAT(Task):
 
         return distances
 
-    def _get_sector_fixes(self, trace):
+    def _get_sector_fix_indices(self, trace):
+
+        table = self.fix_table(trace)
 
         current_leg = -1  # not yet started
-        sector_fixes = list()
-        enl_first_fix = None
+        sector_indices = list()
+        enl_first_index = None
         enl_registered = False
 
-        for fix_minus1, fix in double_iterator(trace):
+        times = get_segment_table(trace, self.distance_engine).times.tolist()  # seconds since epoch
+
+        for fix_index in range(1, len(trace)):
+            fix = trace[fix_index]
 
             # check ENL when aircraft logs ENL and no ENL outlanding has taken place
             if not enl_registered and self.enl_value_exceeded(fix):
-                if enl_first_fix is None:
-                    enl_first_fix = fix
+                if enl_first_index is None:
+                    enl_first_index = fix_index
 
-                enl_time = (fix['datetime'] - enl_first_fix['datetime']).total_seconds()
+                enl_time = times[fix_index] - times[enl_first_index]
                 if self.enl_time_exceeded(enl_time):
                     enl_registered = True
                     if current_leg > 0:
                         break
             elif not enl_registered:
-                enl_first_fix = None
+                enl_first_index = None
 
             if current_leg == -1:  # before start
-                if self.started(fix_minus1, fix):
-                    self._add_aat_sector_fix(sector_fixes, 0, fix_minus1)  # at task start point
+                if self._started(table, fix_index - 1, fix_index):
+                    self._add_aat_sector_fix(sector_indices, 0, fix_index - 1)  # at task start point
                     current_leg = 0
                     enl_registered = False
-                    enl_first_fix = None
+                    enl_first_index = None
             elif current_leg == 0:  # first leg, re-start still possible
-                if self.started(fix_minus1, fix):  # restart
-                    sector_fixes[0] = [fix_minus1]  # at task start point
+                if self._started(table, fix_index - 1, fix_index):  # restart
+                    sector_indices[0] = [fix_index - 1]  # at task start point
                     current_leg = 0
                     enl_registered = False
-                    enl_first_fix = None
-                elif self.waypoints[1].inside_sector(fix_minus1):  # first sector
+                    enl_first_index = None
+                elif table.inside_sector(1, fix_index - 1):  # first sector
                     if enl_registered:
                         break  # break when ENL is used and not restarted
-                    self._add_aat_sector_fix(sector_fixes, 1, fix_minus1)
+                    self._add_aat_sector_fix(sector_indices, 1, fix_index - 1)
                     current_leg += 1
             elif 0 < current_leg < self.no_legs - 1:  # at least second leg, no re-start possible
-                if self.waypoints[current_leg].inside_sector(fix_minus1):  # previous waypoint
-                    self._add_aat_sector_fix(sector_fixes, current_leg, fix_minus1)
-                elif self.waypoints[current_leg + 1].inside_sector(fix_minus1):  # next waypoint
-                    self._add_aat_sector_fix(sector_fixes, current_leg + 1, fix_minus1)
+                if table.inside_sector(current_leg, fix_index - 1):  # previous waypoint
+                    self._add_aat_sector_fix(sector_indices, current_leg, fix_index - 1)
+                elif table.inside_sector(current_leg + 1, fix_index - 1):  # next waypoint
+                    self._add_aat_sector_fix(sector_indices, current_leg + 1, fix_index - 1)
                     current_leg += 1
             elif current_leg == self.no_legs - 1:  # last leg
-                if self.waypoints[current_leg].inside_sector(fix_minus1):
-                    self._add_aat_sector_fix(sector_fixes, current_leg, fix_minus1)
-                elif self.finished(fix_minus1, fix):
-                    sector_fixes.append([fix])  # at task finish point
+                if table.inside_sector(current_leg, fix_index - 1):
+                    self._add_aat_sector_fix(sector_indices, current_leg, fix_index - 1)
+                elif self._finished(table, fix_index - 1, fix_index):
+                    sector_indices.append([fix_index])  # at task finish point
                     break
 
         # add last fix to sector if not already present
-        last_fix = trace[-1]
+        last_index = len(trace) - 1
         last_waypoint = self.waypoints[current_leg]
-        if not last_waypoint.is_line and last_waypoint.inside_sector(last_fix) and last_fix is not sector_fixes[-1][-1]:
-            sector_fixes[-1].append(last_fix)
+        if not last_waypoint.is_line and table.inside_sector(current_leg, last_index) and \
+                last_index != sector_indices[-1][-1]:
+            sector_indices[-1].append(last_index)
 
         if enl_registered:
-            return sector_fixes, enl_first_fix
+            return sector_indices, enl_first_index
         else:
-            return sector_fixes, None
+            return sector_indices, None
 
-    def _reduce_fixes(self, fixes, max_fixes):
-        reduction_factor = len(fixes) // max_fixes + 1
-        return fixes[0::reduction_factor]
-
-    def _reduce_sector_fixes(self, sector_fixes, max_fixes_sector):
+    def _reduce_sector_indices(self, sector_fixes, max_fixes_sector):
         reduced_sector_fixes = list()
         for sector, fixes in enumerate(sector_fixes):
-            reduced_fixes = self._reduce_fixes(fixes, max_fixes_sector)
+            reduced_fixes = decimate(fixes, max_fixes_sector)
             reduced_sector_fixes.append(reduced_fixes)
 
         return reduced_sector_fixes
 
-    def _get_outside_sector_fixes(self, trace, sector_fixes, enl_outlanding_fix):
-        last_sector_fix = sector_fixes[-1][-1]
-        last_sector_index = trace.index(last_sector_fix)
-
-        outside_sector_fixes = list()
-        if enl_outlanding_fix is not None:
-            enl_outlanding_index = trace.index(enl_outlanding_fix)
+    def _get_outside_sector_indices(self, trace, sector_indices, enl_outlanding_index):
+        last_sector_index = sector_indices[-1][-1]
 
+        outside_sector_indices = list()
+        if enl_outlanding_index is not None:
             if enl_outlanding_index > last_sector_index:
-                outside_sector_fixes = trace[last_sector_index + 1: enl_outlanding_index + 1]
+                outside_sector_indices = list(range(last_sector_index + 1, enl_outlanding_index + 1))
         else:
-            outside_sector_fixes = trace[last_sector_index+1:]
+            outside_sector_indices = list(range(last_sector_index + 1, len(trace)))
 
-        return outside_sector_fixes
+        return outside_sector_indices
 
     def _add_aat_sector_fix(self, sector_fixes, taskpoint_index, fix):
         if len(sector_fixes) < (taskpoint_index + 1):
@@ -214,8 +230,9 @@ class AAT(Task):
         else:
             sector_fixes[taskpoint_index].append(fix)
 
-    def _compute_max_distance_fixes(self, outlanded, waypoint_fixes):
+    def _compute_max_distance_indices(self, trace, outlanded, waypoint_indices):
 
+        waypoint_fixes = [[trace[fix_index] for fix_index in indices] for indices in waypoint_indices]
         distances = self._calculate_distances_between_sector_fixes(outlanded, waypoint_fixes)
 
         # determine index on last sector/outlanding-group with maximum distance
@@ -226,18 +243,16 @@ class AAT(Task):
                 max_dist = distance[0]
                 maximized_dist_index = index
 
-        last_fix = waypoint_fixes[-1][maximized_dist_index]
-        max_distance_fixes = [last_fix]
+        max_distance_indices = [waypoint_indices[-1][maximized_dist_index]]
 
         index = maximized_dist_index
 
-        legs = len(waypoint_fixes) - 1
+        legs = len(waypoint_indices) - 1
         for leg in list(reversed(range(legs))):
             index = distances[leg + 1][index][1]
-            max_distance_fix = waypoint_fixes[leg][index]
-            max_distance_fixes.insert(0, max_distance_fix)
+            max_distance_indices.insert(0, waypoint_indices[leg][index])
 
-        return max_distance_fixes
+        return max_distance_indices
 
     def _calculate_distances_between_sector_fixes(self, outlanded, waypoint_fixes):
 
@@ -270,8 +285,11 @@ class AAT(Task):
 
         return distances
 
-    def _refine_max_distance_fixes(self, outlanded, max_distance_fixes, sector_fixes, outside_sector_fixes=None):
-        """look around fixes whether more precise fixes can be found, increasing the distance"""
+    def _refine_max_distance_indices(self, outlanded, max_distance_fixes, sector_fixes, outside_sector_fixes=None):
+        """
+        look around fixes whether more precise fixes can be found, increasing the distance.
+        All fixes are given as index in the trace.
+        """
 
         if outside_sector_fixes is None:
             outside_sector_fixes = []
@@ -302,76 +320,81 @@ class AAT(Task):
 
     def _get_refinement_bounds(self, fix, fixes, refinement_fixes):
         """
-        :param fix:
-        :param fixes:
+        :param fix: index of fix in trace
+        :param fixes: ascending indices of fixes in trace
         :param refinement_fixes: this number of fixes before and after each fix
         :return:
         """
-        max_distance_index = fixes.index(fix)
+        max_distance_index = bisect_left(fixes, fix)  # fix indices are in ascending order
+        if max_distance_index == len(fixes) or fixes[max_distance_index] != fix:
+            # same error as list.index: refining around an insertion point would use the wrong fixes
+            raise ValueError('Fix {} is not in the fixes to be refined'.format(fix))
         refinement_start = max(max_distance_index - refinement_fixes, 0)
         refinement_end = min(len(fixes) + 1, max_distance_index + refinement_fixes + 1)
         return refinement_end, refinement_start
 
     def _calculate_distance_outlanding_leg(self, leg, start_tp_fix, outlanding_fix):
+        engine = self.distance_engine
         if leg == 0:
             tp1 = self.waypoints[leg + 1]
 
-            _, bearing = calculate_distance_bearing(start_tp_fix, outlanding_fix)
-            closest_area_fix = calculate_destination(start_tp_fix, tp1.r_max, bearing)
+            _, bearing = engine.distance_bearing(start_tp_fix, outlanding_fix)
+            closest_area_fix = engine.destination(start_tp_fix, tp1.r_max, bearing)
 
-            distance, _ = calculate_distance_bearing(self.start.fix, closest_area_fix)
-            distance -= calculate_distance_bearing(outlanding_fix, closest_area_fix)[0]
+            distance, _ = engine.distance_bearing(self.start.fix, closest_area_fix)
+            distance -= engine.distance_bearing(outlanding_fix, closest_area_fix)[0]
         elif leg == self.no_legs - 1:  # take finish-point of task
-            distance, _ = calculate_distance_bearing(start_tp_fix, self.finish.fix)
-            distance -= calculate_distance_bearing(self.finish.fix, outlanding_fix)[0]
+            distance, _ = engine.distance_bearing(start_tp_fix, self.finish.fix)
+            distance -= engine.distance_bearing(self.finish.fix, outlanding_fix)[0]
 
         else:
             tp1 = self.waypoints[leg + 1]
 
-            _, bearing = calculate_distance_bearing(tp1.fix, outlanding_fix)
-            closest_area_fix = calculate_destination(tp1.fix, tp1.r_max, bearing)
+            _, bearing = engine.distance_bearing(tp1.fix, outlanding_fix)
+            closest_area_fix = engine.destination(tp1.fix, tp1.r_max, bearing)
 
             if leg == 0:
-                distance, _ = calculate_distance_bearing(self.start.fix, closest_area_fix)
+                distance, _ = engine.distance_bearing(self.start.fix, closest_area_fix)
             else:
-                distance, _ = calculate_distance_bearing(start_tp_fix, closest_area_fix)
-            distance -= calculate_distance_bearing(outlanding_fix, closest_area_fix)[0]
+                distance, _ = engine.distance_bearing(start_tp_fix, closest_area_fix)
+            distance -= engine.distance_bearing(outlanding_fix, closest_area_fix)[0]
 
         return distance
 
     def _calculate_distance_completed_leg(self, leg, start_tp_fix, end_tp_fix):
+        engine = self.distance_engine
         if leg == 0:  # take start-point of task
             start = self.waypoints[0]
-            distance, _ = calculate_distance_bearing(start.fix, end_tp_fix)
+            distance, _ = engine.distance_bearing(start.fix, end_tp_fix)
 
             if start.distance_correction == 'shorten_legs':
                 distance -= start.r_max
         elif leg == self.no_legs - 1:  # take finish-point of task
             finish = self.waypoints[-1]
-            distance, _ = calculate_distance_bearing(start_tp_fix, finish.fix)
+            distance, _ = engine.distance_bearing(start_tp_fix, finish.fix)
 
             if finish.distance_correction == 'shorten_legs':
                 distance -= finish.r_max
         else:
-            distance, _ = calculate_distance_bearing(start_tp_fix, end_tp_fix)
+            distance, _ = engine.distance_bearing(start_tp_fix, end_tp_fix)
 
         return distance
 
-    def _get_waypoint_fixes(self, outlanded, sector_fixes, outside_sector_fixes=None):
+    def _get_waypoint_indices(self, outlanded, sector_fixes, outside_sector_fixes=None):
         """
         Waypoint fixes are fixes which can be used for the distance optimisation. They are grouped per waypoint. In
         case of an outlanding, the last sector waypoints are duplicated at the enable optimisation inside the sector.
         Optional fixes outside the sector on the outlanding leg are also added in the last list.
         :param outlanded:
-        :param sector_fixes:
-        :param outside_sector_fixes:
+        :param sector_fixes: indices of fixes in trace, per sector
+        :param outside_sector_fixes: indices of fixes in trace
         :return:
         """
 
         if outside_sector_fixes is None:
             outside_sector_fixes = list()
 
-        waypoint_fixes = deepcopy(sector_fixes)
+        waypoint_fixes = [list(fixes) for fixes in sector_fixes]
         if outlanded:
             waypoint_fixes.append(sector_fixes[-1])
             waypoint_fixes[-1].extend(outside_sector_fixes)
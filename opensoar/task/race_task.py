@@ -1,22 +1,77 @@
 import datetime
 
-from opensoar.task.task import Task
-from opensoar.utilities.helper_functions import calculate_distance_bearing, double_iterator
+import numpy as np
+
+from opensoar.task.task import Task, TripIndices
+from opensoar.utilities.helper_functions import calculate_distance_bearing, datetime_to_seconds
+from opensoar.utilities.segment_table import get_segment_table
+
+
+def _first_after(indices: np.ndarray, index: int, end: int = None):
+    """First of the sorted indices after index (and before end), None when there is none"""
+    position = np.searchsorted(indices, index, side='right')
+    if position < len(indices) and (end is None or indices[position] < end):
+        return int(indices[position])
+    return None
+
+
+class _EngineRuns:
+    """
+    Runs of consecutive fixes with an exceeded ENL value. After the ENL state is cleared at fix r, a run is timed from
+    the fix before its first fix (but not before r), and an engine run is registered at the first fix at which this
+    time exceeds the threshold.
+    """
+
+    def __init__(self, enl_exceeded: np.ndarray, times: np.ndarray, enl_time_exceeded):
+        """
+        :param enl_exceeded: per fix, whether the ENL value is exceeded
+        :param times: per fix, in seconds
+        :param enl_time_exceeded: test on a single duration in seconds, e.g. Task.enl_time_exceeded. it is called
+                                  per duration, so overrides do not need to accept arrays.
+        """
+        exceeded = np.zeros(len(enl_exceeded) + 2, dtype=np.int8)
+        exceeded[2:-1] = enl_exceeded[1:]  # the first fix only serves as the start of a run
+        steps = np.diff(exceeded)
+        self.first_fixes = np.flatnonzero(steps == 1)
+        self.last_fixes = np.flatnonzero(steps == -1) - 1
+
+        self.times = times
+        self.enl_time_exceeded = enl_time_exceeded
+
+    def registration(self, reset_index: int):
+        """
+        :param reset_index: fix at which the ENL state is cleared
+        :return: index of the fix at which an engine run is registered and the index of the first fix of the run.
+                 None, None when no engine run is registered after the reset.
+        """
+
+        run = np.searchsorted(self.last_fixes, reset_index + 1)
+        for first_fix, last_fix in zip(self.first_fixes[run:], self.last_fixes[run:]):
+            first_fix = max(int(first_fix), reset_index + 1)
+            durations = (self.times[first_fix:last_fix + 1] - self.times[first_fix - 1]).tolist()
+            for offset, duration in enumerate(durations):
+                if self.enl_time_exceeded(duration):
+                    return first_fix + offset, first_fix - 1
+
+        return None, None
+
 
 class RaceTask(Task):
     """
     Race task.
     """
 
-    def __init__(self, waypoints, timezone=None, start_opening=None, start_time_buffer=0, multistart=False):
+    def __init__(self, waypoints, timezone=None, start_opening=None, start_time_buffer=0, multistart=False,
+                 distance_engine=None):
         """
         :param waypoints:           see super()
         :param timezone:            see super()
         :param start_opening:       see super()
         :param start_time_buffer:   see super()
         :param multistart:          see super()
+        :param distance_engine:     see super()
         """
-        super().__init__(waypoints, timezone, start_opening, start_time_buffer, multistart)
+        super().__init__(waypoints, timezone, start_opening, start_time_buffer, multistart, distance_engine)
 
         self.distances = self.calculate_task_distances()
 
@@ -78,94 +133,181 @@ class RaceTask(Task):
         return distances
 
     def apply_rules(self, trace):
+        return self._apply_rules(trace)[:6]
+
+    def apply_rules_indices(self, trace):
+        if type(self).apply_rules is not RaceTask.apply_rules:
+            # apply_rules is overridden in a subclass: derive the indices from its result
+            return super().apply_rules_indices(trace)
+        return self._apply_rules(trace)
+
+    def _apply_rules(self, trace):
+        """
+        :param trace:
+        :return: result of apply_rules with the trace indices of the trip fixes appended as TripIndices
+        """
+
+        fix_indices, outlanding_index = self.determine_trip_fix_indices(trace)
+        fixes = [trace[fix_index] for fix_index in fix_indices]
+        outlanding_fix = None if outlanding_index is None else trace[outlanding_index]
 
-        fixes, outlanding_fix = self.determine_trip_fixes(trace)
         distances = self.determine_trip_distances(fixes, outlanding_fix)
-        refined_start = self.determine_refined_start(trace, fixes)
+        refined_start = self.determine_refined_start(trace, fixes, fix_indices[0])
         finish_time = fixes[-1]['datetime']
         sector_fixes = []  # not applicable for race tasks
-        return fixes, refined_start, outlanding_fix, distances, finish_time, sector_fixes
 
-    def determine_trip_fixes(self, trace):
+        indices = TripIndices(fix_indices, [], outlanding_index)
+        return fixes, refined_start, outlanding_fix, distances, finish_time, sector_fixes, indices
 
-        leg = -1
-        enl_first_fix = None
-        enl_registered = False
+    def determine_trip_fixes(self, trace):
+        fix_indices, outlanding_index = self.determine_trip_fix_indices(trace)
+        fixes = [trace[fix_index] for fix_index in fix_indices]
+        outlanding_fix = None if outlanding_index is None else trace[outlanding_index]
+        return fixes, outlanding_fix
 
-        fixes = list()
-        start_fixes = list()
-        for fix_minus1, fix in double_iterator(trace):
+    def determine_trip_fix_indices(self, trace):
+        """
+        Same as determine_trip_fixes, returning the indices of the fixes in the trace.
 
-            if not enl_registered and self.enl_value_exceeded(fix):
-                if enl_first_fix is None:
-                    enl_first_fix = fix_minus1
+        The start and leg transitions and the ENL runs are first determined for all fixes at once. The rules (start
+        opening, restarts and no further legs after an engine run) are then applied by walking from event to event.
+        This gives the same result as evaluating every pair of consecutive fixes in order, where:
 
-                enl_time = (fix['datetime'] - enl_first_fix['datetime']).total_seconds()
-                enl_registered = enl_registered or self.enl_time_exceeded(enl_time)
-            elif not enl_registered:
-                enl_first_fix = None
+        - the first start after the start opening begins leg 0
+        - a start during leg 0 is a restart, which replaces the start fix
+        - a start or restart clears the ENL state
+        - an engine run is registered when the ENL value stays exceeded for the ENL time threshold
+        - legs can not be finished after a registered engine run
+        """
 
-            if self.start_opening is None:
-                after_start_opening = True
-            else:
-                after_start_opening = self.start_opening + datetime.timedelta(seconds=self.start_time_buffer) < fix['datetime']
+        table = self.fix_table(trace)
+        times = get_segment_table(trace, self.distance_engine).times
+        engine_runs = _EngineRuns(self.enl_exceeded_mask(trace), times, self.enl_time_exceeded)
 
-            if leg == -1 and after_start_opening:
-                if self.started(fix_minus1, fix):
-                    fixes.append(fix_minus1)
-                    start_fixes.append(fix_minus1)
-                    leg += 1
-                    enl_first_fix = None
-                    enl_registered = False
-            elif leg == 0:
-                if self.started(fix_minus1, fix):  # restart
-                    fixes[0] = fix_minus1
-                    start_fixes.append(fix_minus1)
-                    enl_first_fix = None
-                    enl_registered = False
-                if self.finished_leg(leg, fix_minus1, fix) and not enl_registered:
-                    fixes.append(fix)
+        starts = self._transition_indices(table, 0, entering=False)
+        if self.start_opening is None:
+            first_starts = starts
+        else:
+            start_opening = datetime_to_seconds(self.start_opening + datetime.timedelta(seconds=self.start_time_buffer))
+            first_starts = starts[times[starts] > start_opening]
+
+        fix_indices = list()
+        start_indices = list()
+        reset_index = 0  # the ENL state is cleared at the first fix and at every (re)start
+        if len(first_starts) != 0:
+            start = int(first_starts[0])
+            fix_indices.append(start - 1)
+            start_indices.append(start - 1)
+            reset_index = start
+        enl_registered_index, enl_first_index = engine_runs.registration(reset_index)
+
+        leg = len(fix_indices) - 1
+        fix_index = reset_index  # last processed fix
+        if leg == 0:
+            leg_finishes = self._transition_indices(table, 1, entering=True)
+            while True:
+                restart = _first_after(starts, fix_index)
+                end = len(trace) if restart is None else restart
+                if enl_registered_index is not None:
+                    end = min(end, enl_registered_index)
+
+                finish = _first_after(leg_finishes, fix_index, end)
+                if finish is not None:
+                    fix_indices.append(finish)
+                    fix_index = finish
                     leg += 1
-            elif 0 < leg < self.no_legs:
-                if self.finished_leg(leg, fix_minus1, fix) and not enl_registered:
-                    fixes.append(fix)
+                    break
+                elif restart is None:
+                    break
+
+                fix_indices[0] = restart - 1
+                start_indices.append(restart - 1)
+                fix_index = restart
+                enl_registered_index, enl_first_index = engine_runs.registration(restart)
+
+                # the restart clears the ENL state before the leg is checked on the same pair of fixes
+                if _first_after(leg_finishes, restart - 1) == restart:
+                    fix_indices.append(restart)
                     leg += 1
+                    break
 
-        enl_fix = enl_first_fix if enl_registered else None
+        while 0 < leg < self.no_legs:
+            end = len(trace) if enl_registered_index is None else enl_registered_index
+            finish = _first_after(self._transition_indices(table, leg + 1, entering=True), fix_index, end)
+            if finish is None:
+                break
 
-        outlanding_fix = None
-        if len(fixes) is not len(self.waypoints):
-            outlanding_fix = self.determine_outlanding_fix(trace, fixes, start_fixes, enl_fix)
+            fix_indices.append(finish)
+            fix_index = finish
+            leg += 1
 
-        return fixes, outlanding_fix
+        enl_index = enl_first_index if enl_registered_index is not None else None
 
-    def determine_outlanding_fix(self, trace, fixes, start_fixes, enl_fix):
+        outlanding_index = None
+        if len(fix_indices) != len(self.waypoints):
+            outlanding_index = self.determine_outlanding_index(trace, fix_indices, start_indices, enl_index)
 
-        outlanding_leg = len(fixes) - 1
+        return fix_indices, outlanding_index
+
+    def determine_refined_taskpoint_time(self, trace, fixes, taskpoint_index, fix_index: int = None):
+        """
+        Time of the first interpolated fix after reaching a turnpoint or the finish.
+        :param trace:
+        :param fixes: trip fixes, as determined by apply_rules
+        :param taskpoint_index: index of the turnpoint or finish in the waypoints
+        :param fix_index: optional index of the taskpoint fix in the trace, to prevent a search
+        :return:
+        """
+        if taskpoint_index == 0:
+            raise ValueError('Use determine_refined_start for the start')
+
+        leg = taskpoint_index - 1
+        fix_i = trace.index(fixes[taskpoint_index]) if fix_index is None else fix_index
+        _, fix_after = self.refine_transition(trace[fix_i - 1], trace[fix_i],
+                                              lambda fix1, fix2: self.finished_leg(leg, fix1, fix2))
+        return fix_after['datetime']
+
+    def determine_outlanding_fix(self, trace, fixes, start_fixes, enl_fix):
 
         # check if there is an actual outlanding
         if len(fixes) == len(self.waypoints):
             return None
 
+        fix_indices = [trace.index(fix) for fix in fixes]
+        start_indices = [trace.index(start_fixes[0])]
+        enl_index = None if enl_fix is None else trace.index(enl_fix)
+        return trace[self.determine_outlanding_index(trace, fix_indices, start_indices, enl_index)]
+
+    def determine_outlanding_index(self, trace, fix_indices, start_indices, enl_index):
+        """Same as determine_outlanding_fix, using and returning indices of fixes in the trace"""
+
+        outlanding_leg = len(fix_indices) - 1
+
+        # check if there is an actual outlanding
+        if len(fix_indices) == len(self.waypoints):
+            return None
+
         # determine range within trace to be examined for outlanding fix
-        last_tp_i = trace.index(fixes[-1]) if outlanding_leg != 0 else trace.index(start_fixes[0])
-        if enl_fix is not None:
-            last_index = trace.index(enl_fix)
+        last_tp_i = fix_indices[-1] if outlanding_leg != 0 else start_indices[0]
+        if enl_index is not None:
+            last_index = enl_index
         else:
             last_index = len(trace) - 1
 
         # find fix which maximizes the distance
-        outlanding_fix = max(trace[last_tp_i:last_index + 1],
-                             key=lambda x: self.determine_outlanding_distance(outlanding_leg, x))
+        table = self.fix_table(trace)
+        distances_to_next_waypoint = table.distances(outlanding_leg + 1)[last_tp_i:last_index + 1]
+        outlanding_distances = self._outlanding_distances(outlanding_leg, distances_to_next_waypoint)
+        outlanding_index = last_tp_i + int(np.argmax(outlanding_distances))
 
-        max_distance = self.determine_outlanding_distance(outlanding_leg, outlanding_fix)
+        max_distance = self.determine_outlanding_distance(outlanding_leg, trace[outlanding_index])
         if max_distance < 0:  # no out-landing fix that improves the distance
-            if enl_fix is not None:
-                outlanding_fix = enl_fix
+            if enl_index is not None:
+                outlanding_index = enl_index
             else:
-                outlanding_fix = trace[-1]
+                outlanding_index = len(trace) - 1
 
-        return outlanding_fix
+        return outlanding_index
 
     def determine_outlanding_distance(self, outlanding_leg, fix):
 
@@ -174,10 +316,19 @@ class RaceTask(Task):
 
         # outlanding distance = distance between tps minus distance from next tp to outlanding
         outlanding_dist, _ = calculate_distance_bearing(previous_waypoint.fix, next_waypoint.fix)
-        outlanding_dist -= calculate_distance_bearing(next_waypoint.fix, fix)[0]
+        outlanding_dist -= self.distance_engine.distance_bearing(next_waypoint.fix, fix)[0]
 
         return outlanding_dist if outlanding_dist > 0 else 0
 
+    def _outlanding_distances(self, outlanding_leg, distances_to_next_waypoint):
+        """Same as determine_outlanding_distance, for an array of distances between next waypoint and fixes"""
+
+        previous_waypoint = self.waypoints[outlanding_leg]
+        next_waypoint = self.waypoints[outlanding_leg + 1]
+
+        leg_distance, _ = calculate_distance_bearing(previous_waypoint.fix, next_waypoint.fix)
+        return np.maximum(leg_distance - distances_to_next_waypoint, 0)
+
     def determine_trip_distances(self, fixes, outlanding_fix):
 
         distances = list()
@@ -198,3 +349,12 @@ class RaceTask(Task):
             return next_waypoint.crossed_line(fix1, fix2)
         else:
             return next_waypoint.outside_sector(fix1) and next_waypoint.inside_sector(fix2)
+
+    def _finished_leg(self, table, leg, fix_index1, fix_index2):
+        """Same as finished_leg, using the fix indices in the table"""
+
+        waypoint_index = leg + 1
+        if self.waypoints[waypoint_index].is_line:
+            return table.crossed_line(waypoint_index, fix_index1, fix_index2)
+        else:
+            return table.outside_sector(waypoint_index, fix_index1) and table.inside_sector(waypoint_index, fix_index2)
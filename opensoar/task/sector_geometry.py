@@ -0,0 +1,187 @@
+"""
+Compiled geometry of waypoint sectors and lines.
+
+Every waypoint gets an azimuthal equidistant projection on the WGS84 ellipsoid, centred on the waypoint. In this
+projection the distance and the bearing from the waypoint are exact, so point queries are a bulk projection followed by
+the polar rules of the waypoint (Waypoint.inside_sector_polar_mask and Waypoint.crossed_line_polar_mask). The shapely
+shape of the sector or line is a polygon approximation in the same projection; it only serves GeoJSON output and
+intersections with other geometries (e.g. airspaces), never the scoring.
+"""
+from copy import copy
+from math import ceil, sin, cos, radians
+from typing import List, Tuple
+
+import numpy as np
+import shapely
+from pyproj import Transformer
+from shapely.geometry import Polygon, LineString, Point
+
+WGS84 = '+proj=longlat +datum=WGS84 +no_defs'
+ARC_RESOLUTION = 72  # polygon vertices per full circle
+
+
+def _local_projection(latitude: float, longitude: float) -> str:
+    return '+proj=aeqd +ellps=WGS84 +units=m +lat_0={} +lon_0={}'.format(latitude, longitude)
+
+
+def _arc(radius: float, bearing1: float, bearing2: float, resolution: int) -> List[Tuple[float, float]]:
+    """Points on a circle around the origin, from bearing1 clockwise to bearing2 (degrees), x east and y north"""
+    number_of_points = max(2, ceil((bearing2 - bearing1) / 360 * resolution) + 1)
+    return [(radius * sin(radians(bearing)), radius * cos(radians(bearing)))
+            for bearing in np.linspace(bearing1, bearing2, number_of_points)]
+
+
+def _sector_shape(r_inner: float, r_outer: float, centre_bearing: float, half_angle: float, resolution: int):
+    """Part of an annulus (or disk when r_inner is 0) around the origin, within half_angle of centre_bearing"""
+    if half_angle >= 180:
+        shape = Point(0, 0).buffer(r_outer, quad_segs=max(1, resolution // 4))
+        if r_inner > 0:
+            shape = shape.difference(Point(0, 0).buffer(r_inner, quad_segs=max(1, resolution // 4)))
+        return shape
+
+    outer_arc = _arc(r_outer, centre_bearing - half_angle, centre_bearing + half_angle, resolution)
+    if r_inner > 0:
+        inner_arc = _arc(r_inner, centre_bearing - half_angle, centre_bearing + half_angle, resolution)
+        return Polygon(outer_arc + inner_arc[::-1])
+    else:
+        return Polygon([(0, 0)] + outer_arc)
+
+
+class SectorGeometry:
+    """
+    Projection and shape of a waypoint, compiled once per task (see Task.sector_geometries). The waypoint attributes are
+    copied at compilation. Point queries use the projection and the waypoint rules, the shape is only used for output
+    and intersections.
+    """
+
+    __slots__ = ('_waypoint', '_transformer', '_shape', '_lon_lat_shape')
+
+    def __init__(self, waypoint, resolution: int = ARC_RESOLUTION):
+        """
+        :param waypoint: Waypoint with its orientation angle set
+        :param resolution: number of polygon vertices per full circle
+        """
+
+        if waypoint.orientation_angle is None:
+            raise ValueError('Orientation angle of waypoint {} is not set'.format(waypoint.name))
+
+        self._waypoint = copy(waypoint)
+        self._transformer = Transformer.from_proj(WGS84, _local_projection(waypoint.latitude, waypoint.longitude))
+
+        if waypoint.is_line:
+            self._shape = LineString(_arc(waypoint.r_max, waypoint.orientation_angle - 90,
+                                          waypoint.orientation_angle + 90, 2))
+        else:
+            # the orientation points away from the sector
+            centre_bearing = waypoint.orientation_angle + 180
+            r_min = waypoint.r_min or 0
+            self._shape = _sector_shape(r_min, waypoint.r_max, centre_bearing, waypoint.angle_max, resolution)
+            if waypoint.r_min is not None:
+                inner_shape = _sector_shape(0, waypoint.r_min, centre_bearing, waypoint.angle_min, resolution)
+                self._shape = self._shape.union(inner_shape)
+
+        shapely.prepare(self._shape)
+        self._lon_lat_shape = None
+
+    def _to_local_coordinates(self, coordinates: np.ndarray) -> np.ndarray:
+        x, y = self._transformer.transform(coordinates[:, 0], coordinates[:, 1])
+        return np.column_stack([x, y])
+
+    def _to_lon_lat_coordinates(self, coordinates: np.ndarray) -> np.ndarray:
+        lons, lats = self._transformer.transform(coordinates[:, 0], coordinates[:, 1], direction='INVERSE')
+        return np.column_stack([lons, lats])
+
+    @property
+    def name(self) -> str:
+        return self._waypoint.name
+
+    @property
+    def is_line(self) -> bool:
+        return self._waypoint.is_line
+
+    @property
+    def shape(self):
+        """Prepared shapely Polygon (sector) or LineString (line) in meters, with the waypoint at the origin"""
+        return self._shape
+
+    @property
+    def lon_lat_shape(self):
+        """The shape in longitude and latitude (degrees), e.g. for GeoJSON output"""
+        if self._lon_lat_shape is None:
+            self._lon_lat_shape = shapely.transform(self._shape, self._to_lon_lat_coordinates)
+        return self._lon_lat_shape
+
+    def to_local(self, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param lats: latitudes in degrees
+        :param lons: longitudes in degrees
+        :return: x (east) and y (north) in meters, with the waypoint at the origin
+        """
+        return self._transformer.transform(np.asarray(lons, dtype=float), np.asarray(lats, dtype=float))
+
+    def polar(self, lats, lons) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param lats: latitudes in degrees
+        :param lons: longitudes in degrees
+        :return: geodesic distances in meters and bearings in degrees (0-360) from the waypoint
+        """
+        x, y = self.to_local(lats, lons)
+        return np.hypot(x, y), np.degrees(np.arctan2(x, y)) % 360
+
+    def contains(self, lats, lons, candidates=None) -> np.ndarray:
+        """
+        Bulk point-in-sector query: the points are projected and tested with Waypoint.inside_sector_polar_mask
+        (including the SeeYou margin).
+        :param lats: latitudes in degrees
+        :param lons: longitudes in degrees
+        :param candidates: optional boolean array, e.g. Waypoint.prefilter_mask. Only these points are projected, the
+                           others are outside.
+        :return: boolean array
+        """
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        if candidates is None:
+            return self._waypoint.inside_sector_polar_mask(*self.polar(lats, lons))
+
+        candidates = np.flatnonzero(candidates)
+        mask = np.zeros(len(lats), dtype=bool)
+        mask[candidates] = self._waypoint.inside_sector_polar_mask(*self.polar(lats[candidates], lons[candidates]))
+        return mask
+
+    def crossed(self, lats, lons, candidates=None) -> np.ndarray:
+        """
+        Line crossings between consecutive points: the points are projected and tested with
+        Waypoint.crossed_line_polar_mask.
+        :param lats: latitudes in degrees
+        :param lons: longitudes in degrees
+        :param candidates: optional boolean array, e.g. Waypoint.prefilter_mask. Only these points and their neighbours
+                           are projected; pairs of two rejected points are out of range of the line.
+        :return: boolean array with one entry less than the number of points
+        """
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        if candidates is None:
+            return self._waypoint.crossed_line_polar_mask(*self.polar(lats, lons))
+
+        needed = np.array(candidates, dtype=bool)
+        needed[1:] |= candidates[:-1]
+        needed[:-1] |= candidates[1:]
+        needed = np.flatnonzero(needed)
+
+        distances = np.full(len(lats), np.inf)
+        bearings = np.zeros(len(lats))
+        distances[needed], bearings[needed] = self.polar(lats[needed], lons[needed])
+        return self._waypoint.crossed_line_polar_mask(distances, bearings)
+
+    def intersects(self, geometry) -> bool:
+        """
+        :param geometry: shapely geometry in longitude and latitude (degrees), e.g. an airspace
+        :return: whether the geometry touches the nominal shape of the sector or line
+        """
+        return self._shape.intersects(shapely.transform(geometry, self._to_local_coordinates))
+
+    def intersection(self, geometry):
+        """
+        :param geometry: shapely geometry in longitude and latitude (degrees)
+        :return: the overlap with the nominal shape, in longitude and latitude
+        """
+        local_intersection = self._shape.intersection(shapely.transform(geometry, self._to_local_coordinates))
+        return shapely.transform(local_intersection, self._to_lon_lat_coordinates)
@@ -1,9 +1,30 @@
 import datetime
+from collections import namedtuple
 from typing import List
 
+import numpy as np
+
+from opensoar.task.sector_geometry import SectorGeometry
 from opensoar.task.waypoint import Waypoint
+from opensoar.task.waypoint_fix_table import WaypointFixTable
+from opensoar.trace.trace import Trace
+from opensoar.utilities.distance_engines import DistanceEngine, get_default_distance_engine
 from opensoar.utilities.helper_functions import calculate_distance_bearing, calculate_bearing_difference, \
-    interpolate_fixes, double_iterator
+    interpolate_fixes, interpolate_fix, double_iterator
+
+# trace indices of the trip fixes, the sector fixes (per sector) and the outlanding fix (None when completed)
+TripIndices = namedtuple('TripIndices', 'fixes sector_fixes outlanding_fix')
+
+
+class PrefilterStatistics(namedtuple('PrefilterStatistics', 'tests rejections')):
+    """Number of fixes tested by the sector prefilter of the waypoints and the number rejected without geodesics"""
+
+    __slots__ = ()
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of the tested fixes rejected by the prefilter, None when nothing has been tested"""
+        return self.rejections / self.tests if self.tests else None
 
 
 class Task:
@@ -15,13 +36,15 @@ class Task:
     ENL_TIME_THRESHOLD = 30
 
     def __init__(self, waypoints: List[Waypoint], timezone: int, start_opening: datetime.datetime,
-                 start_time_buffer: int, multistart: bool):
+                 start_time_buffer: int, multistart: bool, distance_engine: DistanceEngine = None):
         """
         :param waypoints:
         :param timezone: time difference wrt UTC in hours
         :param start_opening: in UTC
         :param start_time_buffer: in seconds
         :param multistart: flag whether multistart takes place
+        :param distance_engine: optional engine for all fix related calculations. defaults to the global engine.
+                                The task distances themselves are always calculated on the ellipsoid.
         """
 
         self._waypoints = waypoints
@@ -29,8 +52,15 @@ class Task:
         self.start_opening = start_opening
         self.start_time_buffer = start_time_buffer
         self.multistart = multistart
+        self._distance_engine = distance_engine
+        self._fix_table = None  # cache for the last analysed trace
+        self._sector_geometries = None  # compiled on first use
+        self._sector_geometries_signature = None  # waypoint attributes at compilation
 
         self.set_orientation_angles(self.waypoints)
+        if distance_engine is not None:
+            for waypoint in self.waypoints:
+                waypoint.distance_engine = distance_engine
 
     def __eq__(self, other):
         same_number_waypoints = len(self.waypoints) == len(other.waypoints)
@@ -50,6 +80,45 @@ class Task:
         # waypoints may not be altered because subclasses perform tasks to calculate distances based on waypoints.
         return self._waypoints
 
+    @property
+    def distance_engine(self) -> DistanceEngine:
+        """Distance engine in use: either the engine set on this task or the global default"""
+        if self._distance_engine is None:
+            return get_default_distance_engine()
+        else:
+            return self._distance_engine
+
+    @property
+    def sector_geometries(self) -> List[SectorGeometry]:
+        """
+        Compiled geometry of every waypoint, see task.sector_geometry. Compiled on first use and compiled again when
+        the position, sector or orientation angle of a waypoint has changed (e.g. by set_orientation_angles).
+        """
+        signature = tuple((waypoint.latitude, waypoint.longitude, waypoint.r_min, waypoint.angle_min, waypoint.r_max,
+                           waypoint.angle_max, waypoint.orientation_angle, waypoint.is_line)
+                          for waypoint in self.waypoints)
+        if self._sector_geometries is None or signature != self._sector_geometries_signature:
+            self._sector_geometries = [SectorGeometry(waypoint) for waypoint in self.waypoints]
+            self._sector_geometries_signature = signature
+        return self._sector_geometries
+
+    def enable_prefilter_statistics(self, enabled: bool = True):
+        """Count the fixes tested and rejected by the prefilter of all waypoints, see prefilter_statistics"""
+        for waypoint in self.waypoints:
+            waypoint.prefilter_statistics_enabled = enabled
+
+    def prefilter_statistics(self) -> PrefilterStatistics:
+        """
+        Prefilter statistics of all waypoints, since enable_prefilter_statistics or reset_prefilter_statistics.
+        Nothing is counted unless enabled.
+        """
+        return PrefilterStatistics(sum(waypoint.prefilter_tests for waypoint in self.waypoints),
+                                   sum(waypoint.prefilter_rejections for waypoint in self.waypoints))
+
+    def reset_prefilter_statistics(self):
+        for waypoint in self.waypoints:
+            waypoint.reset_prefilter_statistics()
+
     @property
     def no_tps(self):
         return len(self.waypoints) - 2
@@ -130,6 +199,48 @@ class Task:
 
         return distance
 
+    def apply_rules_indices(self, trace):
+        """
+        Result of apply_rules with the trace indices of the trip fixes appended as TripIndices. This default looks up
+        the fixes returned by apply_rules in the trace, such that subclasses which only implement apply_rules work
+        with Trip. Fixes which are not part of the trace (e.g. interpolated) get index None.
+        :param trace:
+        :return:
+        """
+
+        result = tuple(self.apply_rules(trace))
+        fixes, outlanding_fix, sector_fixes = result[0], result[2], result[5]
+
+        def find_indices(fixes_to_find):
+            indices = list()
+            start = 0
+            for fix in fixes_to_find:
+                try:
+                    index = trace.index(fix, start)
+                except ValueError:
+                    index = None
+                indices.append(index)
+                if index is not None:
+                    start = index
+            return indices
+
+        outlanding_index = None if outlanding_fix is None else find_indices([outlanding_fix])[0]
+        indices = TripIndices(find_indices(fixes), [find_indices(fixes_in_sector) for fixes_in_sector in sector_fixes],
+                              outlanding_index)
+        return result + (indices, )
+
+    def fix_table(self, trace) -> WaypointFixTable:
+        """
+        Distance and bearing table between the waypoints and the fixes of the trace.
+        The table of the last trace is cached, which makes re-analysing the same trace cheap. A change of the waypoints
+        compiles new sector geometries and therefore gives a new table.
+        """
+        engine = self.distance_engine
+        sector_geometries = self.sector_geometries
+        if self._fix_table is None or not self._fix_table.describes(trace, engine, sector_geometries):
+            self._fix_table = WaypointFixTable(self.waypoints, trace, engine, sector_geometries)
+        return self._fix_table
+
     def started(self, fix1, fix2):
         start = self.waypoints[0]
         if start.is_line:
@@ -144,15 +255,110 @@ class Task:
         else:
             return finish.outside_sector(fix1) and finish.inside_sector(fix2)
 
-    def determine_refined_start(self, trace, fixes):
-        start_i = trace.index(fixes[0])
-        interpolated_fixes = interpolate_fixes(trace[start_i], trace[start_i+1])
+    def _started(self, table: WaypointFixTable, fix_index1: int, fix_index2: int) -> bool:
+        """Same as started, using the fix indices in the table"""
+        if self.start.is_line:
+            return table.crossed_line(0, fix_index1, fix_index2)
+        else:
+            return table.inside_sector(0, fix_index1) and table.outside_sector(0, fix_index2)
+
+    def _finished(self, table: WaypointFixTable, fix_index1: int, fix_index2: int) -> bool:
+        """Same as finished, using the fix indices in the table"""
+        finish_index = len(self.waypoints) - 1
+        if self.finish.is_line:
+            return table.crossed_line(finish_index, fix_index1, fix_index2)
+        else:
+            return table.outside_sector(finish_index, fix_index1) and table.inside_sector(finish_index, fix_index2)
+
+    def _transition_indices(self, table: WaypointFixTable, waypoint_index: int, entering: bool) -> np.ndarray:
+        """
+        Transitions of a waypoint for all pairs of consecutive fixes at once: a line crossing, or entering (or leaving)
+        the sector. Same as _started (entering=False) and _finished (entering=True) for every pair.
+        :return: sorted indices of the second fix of each pair
+        """
+        if self.waypoints[waypoint_index].is_line:
+            return table.crossed_line_indices(waypoint_index) + 1
+
+        inside = table.inside_sector_mask(waypoint_index)
+        if entering:
+            return np.flatnonzero(~inside[:-1] & inside[1:]) + 1
+        else:
+            return np.flatnonzero(inside[:-1] & ~inside[1:]) + 1
+
+    def determine_refined_start(self, trace, fixes, start_index: int = None):
+        """
+        Time of the last interpolated fix before crossing the start.
+        :param trace:
+        :param fixes: trip fixes, as determined by apply_rules
+        :param start_index: optional index of the start fix in the trace, to prevent a search
+        :return:
+        """
+        start_i = trace.index(fixes[0]) if start_index is None else start_index
+        fix_before, _ = self.refine_transition(trace[start_i], trace[start_i + 1], self.started)
+        return fix_before['datetime']
+
+    def determine_refined_finish(self, trace, fixes, finish_index: int = None):
+        """
+        Time of the first interpolated fix after crossing the finish. Only valid when the task is completed.
+        :param trace:
+        :param fixes: trip fixes, as determined by apply_rules
+        :param finish_index: optional index of the finish fix in the trace, to prevent a search
+        :return:
+        """
+        finish_i = trace.index(fixes[-1]) if finish_index is None else finish_index
+        _, fix_after = self.refine_transition(trace[finish_i - 1], trace[finish_i], self.finished)
+        return fix_after['datetime']
+
+    @staticmethod
+    def refine_transition(fix1, fix2, transition, interval=1):
+        """
+        Locate a transition (e.g. a start, finish or sector entry) between two fixes at a time resolution of interval
+        seconds. The position is interpolated linearly between the fixes and the transition is found by bisection,
+        which needs a logarithmic number of evaluations instead of one per interval.
+        With a single transition between the fixes (the normal case for consecutive fixes of a trace) the result
+        equals scanning all interpolated fixes. With several transitions, bisection returns one of them, which is
+        not necessarily the first.
+        :param fix1: fix before the transition
+        :param fix2: fix after the transition
+        :param transition: function taking two fixes, returning whether the transition takes place in between
+        :param interval: time resolution in seconds
+        :return: interpolated fixes directly before and after the transition. fix1 and fix2 when they have the
+                 same time.
+        """
+
+        total_difference = int((fix2['datetime'] - fix1['datetime']).total_seconds())
+        if total_difference <= 0:
+            if transition(fix1, fix2):
+                return fix1, fix2
+            raise ValueError('Transition should have been determined')
 
-        for fix, next_fix in double_iterator(interpolated_fixes):
-            if self.started(fix, next_fix):
-                return fix['datetime']
+        number_of_intervals = -(-total_difference // interval)
 
-        raise ValueError('Start should have been determined')
+        def grid_fix(index):
+            return interpolate_fix(fix1, fix2, min(index * interval, total_difference), total_difference)
+
+        low, high = 0, number_of_intervals
+        low_fix, high_fix = grid_fix(low), grid_fix(high)
+        if transition(low_fix, high_fix):
+            while high - low > 1:
+                middle = (low + high) // 2
+                middle_fix = grid_fix(middle)
+                if transition(low_fix, middle_fix):
+                    high, high_fix = middle, middle_fix
+                elif transition(middle_fix, high_fix):
+                    low, low_fix = middle, middle_fix
+                else:
+                    break
+
+            if high - low == 1:
+                return low_fix, high_fix
+
+        # transition cannot be bisected (e.g. an even number of crossings in both halves), scan all intervals
+        for fix, next_fix in double_iterator(interpolate_fixes(fix1, fix2, interval)):
+            if transition(fix, next_fix):
+                return fix, next_fix
+
+        raise ValueError('Transition should have been determined')
 
     def enl_value_exceeded(self, fix) -> bool:
         """
@@ -162,5 +368,14 @@ class Task:
         """
         return 'ENL' in fix and fix['ENL'] > self.ENL_VALUE_THRESHOLD
 
+    def enl_exceeded_mask(self, trace) -> np.ndarray:
+        """enl_value_exceeded for all fixes of the trace at once"""
+        if isinstance(trace, Trace):
+            if trace.enl is None:
+                return np.zeros(len(trace), dtype=bool)
+            return trace.enl > self.ENL_VALUE_THRESHOLD
+        else:
+            return np.fromiter((self.enl_value_exceeded(fix) for fix in trace), dtype=bool, count=len(trace))
+
     def enl_time_exceeded(self, enl_time):
         return enl_time >= self.ENL_TIME_THRESHOLD
@@ -5,7 +5,7 @@ class Trip:
 
     def __init__(self, task, trace):
 
-        task_result = task.apply_rules(trace)
+        task_result = task.apply_rules_indices(trace)
 
         self.fixes = task_result[0]
         self.refined_start_time = task_result[1]
@@ -14,6 +14,11 @@ class Trip:
         self.finish_time = task_result[4]
         self.sector_fixes = task_result[5]
 
+        # indices of the fixes in the trace
+        self.fix_indices = task_result[6].fixes
+        self.sector_fix_indices = task_result[6].sector_fixes
+        self.outlanding_fix_index = task_result[6].outlanding_fix
+
     def completed_legs(self):
         return len(self.fixes) - 1
 
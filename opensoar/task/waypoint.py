@@ -1,18 +1,27 @@
-from math import isclose
+from math import isclose, degrees, radians, cos
+
+import numpy as np
 
 from opensoar.utilities.helper_functions import both_none_or_same_float, both_none_or_same_str
-from opensoar.utilities.helper_functions import calculate_distance_bearing
-from opensoar.utilities.helper_functions import calculate_bearing_difference
+from opensoar.utilities.helper_functions import calculate_bearing_difference, calculate_bearing_differences
+from opensoar.utilities.helper_functions import fixes_to_lat_lon
 from opensoar.utilities.helper_functions import calculate_average_bearing
+from opensoar.utilities.distance_engines import get_default_distance_engine
 
 
 class Waypoint(object):
 
     SEEYOU_SECTOR_MARGIN = 12  # SeeYou does not outland flights which come this close to the sector
 
+    # the prefilter rejects fixes outside a box and circle in degrees around the waypoint without geodesic calculation.
+    # the smallest meridian radius of curvature of the WGS84 ellipsoid (at the equator) gives the fewest meters per
+    # degree; the safety factor covers the error of the local approximation and of the planar distance engine.
+    PREFILTER_EARTH_RADIUS = 6335439  # m
+    PREFILTER_SAFETY_FACTOR = 1.01
+
     def __init__(self, name: str, latitude: float, longitude: float, r_min: float, angle_min: float, r_max: float,
                  angle_max: float, is_line: bool, sector_orientation: str,
-                 distance_correction=None, orientation_angle=None):
+                 distance_correction=None, orientation_angle=None, distance_engine=None):
         """
         Waypoint is either the start point, one of the turn points or the finish point of a task.
         :param name:
@@ -26,6 +35,8 @@ class Waypoint(object):
         :param sector_orientation:  valid values: 'fixed', 'symmetrical', 'next', 'previous', 'start'
         :param distance_correction: optional argument. valid values: 'displace_tp', 'shorten_legs'
         :param orientation_angle: optional argument. Should only be set when sector_orientation='fixed'.
+        :param distance_engine: optional argument. engine for sector calculations, defaults to the global engine.
+                                Overwritten when the waypoint is used in a Task with a distance engine.
         """
 
         self.name = name
@@ -46,6 +57,15 @@ class Waypoint(object):
 
         self.sector_orientation = sector_orientation
         self.distance_correction = distance_correction
+        self.distance_engine = distance_engine
+
+        # number of fixes tested by the prefilter and the number of those rejected without geodesic calculation.
+        # only counted when prefilter_statistics_enabled is set, to keep the sector tests free of bookkeeping.
+        self.prefilter_statistics_enabled = False
+        self.prefilter_tests = 0
+        self.prefilter_rejections = 0
+
+        self._prefilter_bounds_cache = dict()  # by radius and latitude of the waypoint
 
     def __eq__(self, other):
 
@@ -68,6 +88,14 @@ class Waypoint(object):
     def fix(self):
         return dict(lat=self.latitude, lon=self.longitude)
 
+    @property
+    def engine(self):
+        """Distance engine in use: either the engine set on this waypoint or the global default"""
+        if self.distance_engine is None:
+            return get_default_distance_engine()
+        else:
+            return self.distance_engine
+
     def set_orientation_angle(self, angle_start=None, angle_previous=None, angle_next=None):
         # Fixed orientation is skipped as that has already been set
 
@@ -86,9 +114,96 @@ class Waypoint(object):
         else:
             raise ValueError("Unknown sector orientation: %s " % self.sector_orientation)
 
+    @property
+    def prefilter_radius(self) -> float:
+        """Distance in meters beyond which a fix is certainly outside the sector, or out of range of the line"""
+        if self.is_line:
+            return self.r_max
+        else:
+            return self.r_max + self.SEEYOU_SECTOR_MARGIN
+
+    def _prefilter_bounds(self, radius: float):
+        """
+        Conservative bounds in degrees: the latitude bound, the longitude bound (None close to the poles) and the
+        cosine of the latitude furthest from the equator within the bounds, which scales longitude differences.
+        The bounds are calculated once per radius (and latitude of the waypoint).
+        """
+        key = (radius, self.latitude)
+        bounds = self._prefilter_bounds_cache.get(key)
+        if bounds is not None:
+            return bounds
+
+        latitude_bound = degrees(radius * self.PREFILTER_SAFETY_FACTOR / self.PREFILTER_EARTH_RADIUS)
+        furthest_latitude = abs(self.latitude) + latitude_bound
+        if furthest_latitude >= 89:
+            bounds = latitude_bound, None, 0
+        else:
+            cos_latitude = cos(radians(furthest_latitude))
+            bounds = latitude_bound, latitude_bound / cos_latitude, cos_latitude
+
+        self._prefilter_bounds_cache[key] = bounds
+        return bounds
+
+    def _certainly_outside(self, fix, radius: float) -> bool:
+        """Scalar prefilter: True when the fix is certainly further than radius from the waypoint"""
+        latitude_bound, longitude_bound, cos_latitude = self._prefilter_bounds(radius)
+
+        delta_latitude = fix['lat'] - self.latitude
+        delta_longitude = (fix['lon'] - self.longitude + 180) % 360 - 180
+        outside = (abs(delta_latitude) > latitude_bound or
+                   (longitude_bound is not None and abs(delta_longitude) > longitude_bound) or
+                   delta_latitude ** 2 + (delta_longitude * cos_latitude) ** 2 > latitude_bound ** 2)
+
+        if self.prefilter_statistics_enabled:
+            self.prefilter_tests += 1
+            self.prefilter_rejections += outside
+        return outside
+
+    def prefilter_mask(self, lats, lons, radius: float = None) -> np.ndarray:
+        """
+        Fixes which may be within radius of the waypoint. Fixes outside the mask are certainly further away; the fixes
+        inside the mask need the exact (geodesic) test.
+        :param lats: latitudes of the fixes in degrees
+        :param lons: longitudes of the fixes in degrees
+        :param radius: in m, defaults to prefilter_radius
+        :return: boolean array
+        """
+
+        if radius is None:
+            radius = self.prefilter_radius
+        latitude_bound, longitude_bound, cos_latitude = self._prefilter_bounds(radius)
+
+        delta_latitudes = np.asarray(lats, dtype=float) - self.latitude
+        delta_longitudes = (np.asarray(lons, dtype=float) - self.longitude + 180) % 360 - 180
+        candidates = np.abs(delta_latitudes) <= latitude_bound
+        if longitude_bound is not None:
+            candidates &= np.abs(delta_longitudes) <= longitude_bound
+        candidates &= delta_latitudes ** 2 + (delta_longitudes * cos_latitude) ** 2 <= latitude_bound ** 2
+
+        if self.prefilter_statistics_enabled:
+            self.prefilter_tests += len(candidates)
+            self.prefilter_rejections += len(candidates) - int(np.count_nonzero(candidates))
+        return candidates
+
+    def reset_prefilter_statistics(self):
+        self.prefilter_tests = 0
+        self.prefilter_rejections = 0
+
     def inside_sector(self, fix):
 
-        distance, bearing = calculate_distance_bearing(self.fix, fix)
+        if not self.is_line and self._certainly_outside(fix, self.prefilter_radius):
+            return False
+
+        distance, bearing = self.engine.distance_bearing(self.fix, fix)
+        return self.inside_sector_polar(distance, bearing)
+
+    def inside_sector_polar(self, distance, bearing):
+        """
+        Sector test on a fix given in polar coordinates with respect to the waypoint.
+        :param distance: distance from waypoint to fix in meters
+        :param bearing: bearing from waypoint to fix in degrees
+        :return:
+        """
 
         angle_wrt_orientation = abs(calculate_bearing_difference(self.orientation_angle, bearing))
 
@@ -104,10 +219,155 @@ class Waypoint(object):
     def outside_sector(self, fix):
         return not self.inside_sector(fix)
 
+    def inside_sector_mask(self, fixes) -> np.ndarray:
+        """
+        Sector test on all fixes at once, with a single batched distance calculation.
+        :param fixes: Trace or list of fixes
+        :return: boolean array, equal to inside_sector per fix
+        """
+
+        lats, lons = fixes_to_lat_lon(fixes)
+        return self.inside_sector_coordinates_mask(lats, lons)
+
+    def inside_sector_coordinates_mask(self, lats, lons) -> np.ndarray:
+        """
+        Same as inside_sector_mask, for fixes given as coordinate arrays. Distances and bearings are only calculated for
+        the fixes passing the prefilter.
+        :param lats: latitudes in degrees
+        :param lons: longitudes in degrees
+        :return: boolean array
+        """
+
+        if self.is_line:
+            raise ValueError('Calling inside_sector on a line')
+
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        candidates = np.flatnonzero(self.prefilter_mask(lats, lons))
+
+        mask = np.zeros(len(lats), dtype=bool)
+        distances, bearings, _ = self.engine.distances_bearings(self.latitude, self.longitude,
+                                                                lats[candidates], lons[candidates])
+        mask[candidates] = self.inside_sector_polar_mask(distances, bearings)
+        return mask
+
+    def inside_sector_polar_mask(self, distances, bearings) -> np.ndarray:
+        """
+        Batched counterpart of inside_sector_polar, with identical results per fix.
+        :param distances: distances from waypoint to fixes in meters
+        :param bearings: bearings from waypoint to fixes in degrees
+        :return: boolean array
+        """
+
+        if self.is_line:
+            raise ValueError('Calling inside_sector on a line')
+
+        distances = np.asarray(distances, dtype=float)
+        angles_wrt_orientation = np.abs(calculate_bearing_differences(self.orientation_angle, bearings))
+        angles_to_sector = 180 - angles_wrt_orientation
+
+        if self.r_min is not None:
+            inside_outer_sector = ((self.r_min - self.SEEYOU_SECTOR_MARGIN < distances) &
+                                   (distances < self.r_max + self.SEEYOU_SECTOR_MARGIN) &
+                                   (angles_to_sector < self.angle_max))
+            inside_inner_sector = (distances < self.r_min) & (angles_to_sector < self.angle_min)
+            return inside_outer_sector | inside_inner_sector
+        else:  # self.r_min is None
+            return (distances < (self.r_max + self.SEEYOU_SECTOR_MARGIN)) & (angles_to_sector < self.angle_max)
+
     def crossed_line(self, fix1, fix2):
 
-        distance1, _ = calculate_distance_bearing(fix1, self.fix)
-        distance2, _ = calculate_distance_bearing(fix2, self.fix)
+        if not self.is_line:
+            raise ValueError('Calling crossed_line on a sector!')
+
+        # evaluate both fixes, such that the statistics count every fix
+        outside1 = self._certainly_outside(fix1, self.r_max)
+        outside2 = self._certainly_outside(fix2, self.r_max)
+        if outside1 and outside2:
+            return False
+
+        engine = self.engine
+        distance1, _ = engine.distance_bearing(fix1, self.fix)
+        distance2, _ = engine.distance_bearing(fix2, self.fix)
+
+        if distance2 > self.r_max and distance1 > self.r_max:
+            return False
+        else:
+            _, bearing1 = engine.distance_bearing(self.fix, fix1)
+            _, bearing2 = engine.distance_bearing(self.fix, fix2)
+            return self.crossed_line_polar(distance1, bearing1, distance2, bearing2)
+
+    def crossed_line_indices(self, fixes) -> np.ndarray:
+        """
+        Line crossings between consecutive fixes, with a single batched distance calculation.
+        :param fixes: Trace or list of fixes
+        :return: indices i for which crossed_line(fixes[i], fixes[i + 1]) holds
+        """
+
+        lats, lons = fixes_to_lat_lon(fixes)
+        return np.flatnonzero(self.crossed_line_coordinates_mask(lats, lons))
+
+    def crossed_line_coordinates_mask(self, lats, lons) -> np.ndarray:
+        """
+        Same as crossed_line_polar_mask, for fixes given as coordinate arrays. Distances and bearings are only
+        calculated for the fixes passing the prefilter and their neighbours; pairs of two rejected fixes are out of
+        range of the line.
+        :param lats: latitudes in degrees
+        :param lons: longitudes in degrees
+        :return: boolean array with one entry less than the number of fixes
+        """
+
+        if not self.is_line:
+            raise ValueError('Calling crossed_line on a sector!')
+
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        candidates = self.prefilter_mask(lats, lons)
+        needed = candidates.copy()
+        needed[1:] |= candidates[:-1]
+        needed[:-1] |= candidates[1:]
+        needed = np.flatnonzero(needed)
+
+        distances = np.full(len(lats), np.inf)
+        bearings = np.zeros(len(lats))
+        distances[needed], bearings[needed], _ = self.engine.distances_bearings(self.latitude, self.longitude,
+                                                                                lats[needed], lons[needed])
+        return self.crossed_line_polar_mask(distances, bearings)
+
+    def crossed_line_polar_mask(self, distances, bearings) -> np.ndarray:
+        """
+        Batched counterpart of crossed_line_polar for all pairs of consecutive fixes: the side of the line is determined
+        once per fix and a crossing is a change of side within r_max of the waypoint.
+        :param distances: distances from waypoint to fixes in meters
+        :param bearings: bearings from waypoint to fixes in degrees
+        :return: boolean array with one entry less than the number of fixes. entry i denotes fix i to fix i + 1.
+        """
+
+        if not self.is_line:
+            raise ValueError('Calling crossed_line on a sector!')
+
+        distances = np.asarray(distances, dtype=float)
+        angles_wrt_orientation = np.abs(calculate_bearing_differences(self.orientation_angle, bearings))
+        in_range = distances <= self.r_max
+        in_front = angles_wrt_orientation < 90
+        behind = angles_wrt_orientation > 90
+
+        if self.sector_orientation == "next":  # start line
+            crossed = behind[:-1] & in_front[1:]
+        elif self.sector_orientation == "previous":  # finish line
+            crossed = in_front[:-1] & behind[1:]
+        else:
+            raise ValueError("A line with this orientation is not implemented!")
+
+        return crossed & (in_range[:-1] | in_range[1:])
+
+    def crossed_line_polar(self, distance1, bearing1, distance2, bearing2):
+        """
+        Line crossing test on two fixes given in polar coordinates with respect to the waypoint.
+        :param distance1: distance between waypoint and first fix in meters
+        :param bearing1: bearing from waypoint to first fix in degrees
+        :param distance2: distance between waypoint and second fix in meters
+        :param bearing2: bearing from waypoint to second fix in degrees
+        :return:
+        """
 
         if not self.is_line:
             raise ValueError('Calling crossed_line on a sector!')
@@ -115,9 +375,6 @@ class Waypoint(object):
             if distance2 > self.r_max and distance1 > self.r_max:
                 return False
             else:  # either both within circle or only one, leading to small amount of false positives
-                _, bearing1 = calculate_distance_bearing(self.fix, fix1)
-                _, bearing2 = calculate_distance_bearing(self.fix, fix2)
-
                 angle_wrt_orientation1 = abs(calculate_bearing_difference(self.orientation_angle, bearing1))
                 angle_wrt_orientation2 = abs(calculate_bearing_difference(self.orientation_angle, bearing2))
 
@@ -0,0 +1,129 @@
+from typing import List
+
+import numpy as np
+
+from opensoar.task.sector_geometry import SectorGeometry
+from opensoar.task.waypoint import Waypoint
+from opensoar.utilities.distance_engines import EllipsoidDistanceEngine
+from opensoar.utilities.helper_functions import fixes_to_lat_lon
+
+
+class WaypointFixTable:
+    """
+    Distance and bearing from every waypoint of a task to every fix of a trace. The rows are calculated with a single
+    batched call per waypoint, the first time they are needed. Sector and line tests on fixes of the trace can then be
+    answered by index, without any geodesic calculation.
+
+    When the sector geometries of the task are given and the engine is the ellipsoid engine, the sector and line masks
+    project the fixes with the sector geometry instead of calculating geodesics. Both give the distance and bearing on
+    the WGS84 ellipsoid, so the masks are the same.
+    """
+
+    def __init__(self, waypoints: List[Waypoint], trace, distance_engine,
+                 sector_geometries: List[SectorGeometry] = None):
+        """
+        :param waypoints:
+        :param trace: list of fixes
+        :param distance_engine: engine used for filling the table
+        :param sector_geometries: optional compiled geometry of the waypoints, see Task.sector_geometries
+        """
+
+        self.waypoints = waypoints
+        self.trace = trace
+        self.distance_engine = distance_engine
+        self.sector_geometries = sector_geometries
+
+        self._lats, self._lons = fixes_to_lat_lon(trace)
+        self._distances = [None] * len(waypoints)
+        self._bearings = [None] * len(waypoints)
+        self._inside_sector_masks = [None] * len(waypoints)
+        self._crossed_line_masks = [None] * len(waypoints)
+
+    def __len__(self):
+        return len(self._lats)
+
+    def describes(self, trace, distance_engine, sector_geometries: List[SectorGeometry] = None) -> bool:
+        """Whether this table has been built for this (unchanged) trace, engine and sector geometries"""
+        return self.trace is trace and len(trace) == len(self) and self.distance_engine is distance_engine and \
+            self.sector_geometries is sector_geometries
+
+    def _calculate_row(self, waypoint_index):
+        waypoint = self.waypoints[waypoint_index]
+        distances, bearings, _ = self.distance_engine.distances_bearings(waypoint.latitude, waypoint.longitude,
+                                                                         self._lats, self._lons)
+        self._distances[waypoint_index] = distances
+        self._bearings[waypoint_index] = bearings
+
+    def _use_prefilter(self, waypoint_index: int) -> bool:
+        """
+        The masks are calculated from the full row when it is already present. Otherwise the waypoint calculates
+        distances only for the fixes near the sector, when it uses the same engine as this table.
+        """
+        return self._distances[waypoint_index] is None and \
+            self.waypoints[waypoint_index].engine is self.distance_engine
+
+    def _use_sector_geometry(self, waypoint_index: int) -> bool:
+        """Projection with the sector geometry gives the same distances and bearings as the ellipsoid engine"""
+        return self.sector_geometries is not None and isinstance(self.distance_engine, EllipsoidDistanceEngine) and \
+            self._use_prefilter(waypoint_index)
+
+    def distances(self, waypoint_index: int) -> np.ndarray:
+        """Distances in meters from waypoint to all fixes"""
+        if self._distances[waypoint_index] is None:
+            self._calculate_row(waypoint_index)
+        return self._distances[waypoint_index]
+
+    def bearings(self, waypoint_index: int) -> np.ndarray:
+        """Bearings in degrees from waypoint to all fixes"""
+        if self._bearings[waypoint_index] is None:
+            self._calculate_row(waypoint_index)
+        return self._bearings[waypoint_index]
+
+    def inside_sector_mask(self, waypoint_index: int) -> np.ndarray:
+        """Sector test of the waypoint on all fixes, see Waypoint.inside_sector_polar_mask"""
+        if self._inside_sector_masks[waypoint_index] is None:
+            waypoint = self.waypoints[waypoint_index]
+            if self._use_sector_geometry(waypoint_index):
+                candidates = waypoint.prefilter_mask(self._lats, self._lons)
+                mask = self.sector_geometries[waypoint_index].contains(self._lats, self._lons, candidates)
+            elif self._use_prefilter(waypoint_index):
+                mask = waypoint.inside_sector_coordinates_mask(self._lats, self._lons)
+            else:
+                mask = waypoint.inside_sector_polar_mask(self.distances(waypoint_index), self.bearings(waypoint_index))
+            self._inside_sector_masks[waypoint_index] = mask
+        return self._inside_sector_masks[waypoint_index]
+
+    def inside_sector(self, waypoint_index: int, fix_index: int) -> bool:
+        return bool(self.inside_sector_mask(waypoint_index)[fix_index])
+
+    def outside_sector(self, waypoint_index: int, fix_index: int) -> bool:
+        return not self.inside_sector(waypoint_index, fix_index)
+
+    def crossed_line_mask(self, waypoint_index: int) -> np.ndarray:
+        """Line crossings of the waypoint between consecutive fixes, see Waypoint.crossed_line_polar_mask"""
+        if self._crossed_line_masks[waypoint_index] is None:
+            waypoint = self.waypoints[waypoint_index]
+            if self._use_sector_geometry(waypoint_index):
+                candidates = waypoint.prefilter_mask(self._lats, self._lons)
+                mask = self.sector_geometries[waypoint_index].crossed(self._lats, self._lons, candidates)
+            elif self._use_prefilter(waypoint_index):
+                mask = waypoint.crossed_line_coordinates_mask(self._lats, self._lons)
+            else:
+                mask = waypoint.crossed_line_polar_mask(self.distances(waypoint_index), self.bearings(waypoint_index))
+            self._crossed_line_masks[waypoint_index] = mask
+        return self._crossed_line_masks[waypoint_index]
+
+    def crossed_line_indices(self, waypoint_index: int) -> np.ndarray:
+        """Indices i of the fixes after which the line is crossed (between fix i and i + 1)"""
+        return np.flatnonzero(self.crossed_line_mask(waypoint_index))
+
+    def crossed_line(self, waypoint_index: int, fix_index1: int, fix_index2: int) -> bool:
+        if fix_index2 == fix_index1 + 1:
+            return bool(self.crossed_line_mask(waypoint_index)[fix_index1])
+
+        distances = self.distances(waypoint_index)
+        bearings = self.bearings(waypoint_index)
+        return self.waypoints[waypoint_index].crossed_line_polar(float(distances[fix_index1]),
+                                                                 float(bearings[fix_index1]),
+                                                                 float(distances[fix_index2]),
+                                                                 float(bearings[fix_index2]))
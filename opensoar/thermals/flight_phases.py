@@ -2,8 +2,10 @@ from collections import namedtuple
 from typing import Union, List
 
 from opensoar.thermals.pysoar_thermal_detector import PySoarThermalDetector
+from opensoar.trace.trace import Trace
 
-Phase = namedtuple('Phase', 'is_cruise fixes')
+# start_index: index in the trace of the first fix of the phase, None when unknown
+Phase = namedtuple('Phase', 'is_cruise fixes start_index', defaults=(None, ))
 
 
 class FlightPhases:
@@ -11,15 +13,16 @@ class FlightPhases:
     Container to combine the different flight phases (thermal and cruise) with helper methods for easy access.
     """
 
-    def __init__(self, classification_method: str, trace: list, trip=None):
+    def __init__(self, classification_method: str, trace: Union[list, Trace], trip=None, distance_engine=None):
         """
         :param classification_method: currently only 'pysoar' supported
-        :param trace: 
+        :param trace: list of b-records or Trace
         :param trip: optional parameter for obtain thermals per leg
+        :param distance_engine: optional engine used by the thermal detector. defaults to the global engine.
         """
 
         if classification_method == 'pysoar':
-            self._thermal_detector = PySoarThermalDetector()
+            self._thermal_detector = PySoarThermalDetector(distance_engine)
         else:
             raise ValueError('Classification method {} not supported'.format(classification_method))
 
@@ -155,19 +158,22 @@ class FlightPhases:
             use_trip_start_fix = True
             use_trip_end_fix = False
 
-        start_fix = self._trip.fixes[leg] if use_trip_start_fix else phase.fixes[0]
+        if use_trip_start_fix:
+            phase_start_index = self._index_in_phase(phase, self._trip.fixes[leg], self._trip.fix_indices[leg])
+        else:
+            phase_start_index = 0
 
         if use_trip_end_fix:
             if self._trip.outlanded() and leg == self._trip.outlanding_leg():
-                end_fix = self._trip.outlanding_fix
+                phase_end_index = self._index_in_phase(phase, self._trip.outlanding_fix,
+                                                       self._trip.outlanding_fix_index)
             else:
-                end_fix = self._trip.fixes[leg + 1]
+                phase_end_index = self._index_in_phase(phase, self._trip.fixes[leg + 1],
+                                                       self._trip.fix_indices[leg + 1])
         else:
-            end_fix = phase.fixes[-1]
+            phase_end_index = len(phase.fixes) - 1
 
-        phase_start_index = phase.fixes.index(start_fix)
-        phase_end_index = phase.fixes.index(end_fix)
-        return Phase(phase.is_cruise, phase.fixes[phase_start_index:phase_end_index + 1])
+        return self._sub_phase(phase, phase_start_index, phase_end_index)
 
     def _get_phase_within_trip(self, phase):
 
@@ -203,16 +209,43 @@ class FlightPhases:
             if phase_start_after_trip:
                 return None
 
-        start_fix = self._trip.fixes[first_leg] if use_trip_start_fix else phase.fixes[first_leg]
+        if use_trip_start_fix:
+            phase_start_index = self._index_in_phase(phase, self._trip.fixes[first_leg],
+                                                     self._trip.fix_indices[first_leg])
+        else:
+            phase_start_index = 0
 
         if use_trip_end_fix:
             if self._trip.outlanded() and last_leg == self._trip.outlanding_leg():
-                end_fix = self._trip.outlanding_fix
+                phase_end_index = self._index_in_phase(phase, self._trip.outlanding_fix,
+                                                       self._trip.outlanding_fix_index)
             else:
-                end_fix = self._trip.fixes[last_leg + 1]
+                phase_end_index = self._index_in_phase(phase, self._trip.fixes[last_leg + 1],
+                                                       self._trip.fix_indices[last_leg + 1])
         else:
-            end_fix = phase.fixes[-1]
+            phase_end_index = len(phase.fixes) - 1
+
+        return self._sub_phase(phase, phase_start_index, phase_end_index)
+
+    @staticmethod
+    def _index_in_phase(phase: Phase, fix, trace_index: int) -> int:
+        """
+        Index of a trip fix within the fixes of the phase.
+        :param phase:
+        :param fix:
+        :param trace_index: index of the fix in the trace
+        :return:
+        """
+
+        # phases are contiguous parts of the trace: no search needed when phase and trip share the trace
+        if phase.start_index is not None:
+            index = trace_index - phase.start_index
+            if 0 <= index < len(phase.fixes) and (phase.fixes[index] is fix or phase.fixes[index] == fix):
+                return index
+
+        return phase.fixes.index(fix)
 
-        phase_start_index = phase.fixes.index(start_fix)
-        phase_end_index = phase.fixes.index(end_fix)
-        return Phase(phase.is_cruise, phase.fixes[phase_start_index:phase_end_index + 1])
+    @staticmethod
+    def _sub_phase(phase: Phase, start_index: int, end_index: int) -> Phase:
+        trace_start_index = None if phase.start_index is None else phase.start_index + start_index
+        return Phase(phase.is_cruise, phase.fixes[start_index:end_index + 1], trace_start_index)
@@ -1,4 +1,5 @@
-from opensoar.utilities.helper_functions import triple_iterator, calculate_bearing_change, calculate_distance_bearing
+from opensoar.utilities.distance_engines import get_default_distance_engine
+from opensoar.utilities.segment_table import get_segment_table
 
 
 class PySoarThermalDetector:
@@ -13,33 +14,43 @@ class PySoarThermalDetector:
     THERMAL_THRESHOLD_BEARINGRATE_AVG = 2  # deg/s
     THERMAL_THRESHOLD_BEARINGRATE = 4  # deg/s
 
-    def __init__(self):
-        pass
+    def __init__(self, distance_engine=None):
+        """
+        :param distance_engine: optional engine for distance and bearing calculations. defaults to the global engine.
+        """
+        self.distance_engine = distance_engine
 
     def analyse(self, trace):
 
         # To prevent circular import with flight_phases
         from opensoar.thermals.flight_phases import Phase
 
+        engine = self.distance_engine if self.distance_engine is not None else get_default_distance_engine()
+
         cruise = True
         possible_thermal_fixes = list()
         possible_cruise_fixes = list()
+        possible_thermal_index = None  # index in trace of first possible thermal fix
+        possible_cruise_index = None  # index in trace of first possible cruise fix
         sharp_thermal_entry_found = False
         turning_left = True
         total_bearing_change = 0
 
         # Start with first phase
-        phases = [Phase(cruise, trace[0:2])]
+        phases = [Phase(cruise, trace[0:2], 0)]
+
+        segments = get_segment_table(trace, engine)
+        bearing_changes = segments.bearing_changes.tolist()
+        time_deltas = segments.time_deltas.tolist()
+        times = segments.times.tolist()  # seconds since epoch
 
-        for fix_minus2, fix_minus1, fix in triple_iterator(trace):
+        for fix_index in range(2, len(trace)):
 
-            time_minus2 = fix_minus2['datetime']
-            time_minus1 = fix_minus1['datetime']
-            time = fix['datetime']
+            fix = trace[fix_index]
 
-            bearing_change = calculate_bearing_change(fix_minus2, fix_minus1, fix)
-            delta_t = (0.5 * (time - time_minus1).total_seconds() +
-                       0.5 * (time - time_minus2).total_seconds())
+            bearing_change = bearing_changes[fix_index - 2]
+            delta_t = (0.5 * time_deltas[fix_index - 1] +
+                       0.5 * (time_deltas[fix_index - 2] + time_deltas[fix_index - 1]))
             bearing_change_rate = bearing_change / delta_t
 
             if cruise:
@@ -53,11 +64,13 @@ class PySoarThermalDetector:
 
                     if len(possible_thermal_fixes) == 0:
                         possible_thermal_fixes = [fix]
+                        possible_thermal_index = fix_index
                     else:
                         if not sharp_thermal_entry_found and abs(bearing_change_rate) > self.CRUISE_THRESHOLD_BEARINGRATE:
                             sharp_thermal_entry_found = True
                             phases[-1].fixes.extend(possible_thermal_fixes)
                             possible_thermal_fixes = [fix]
+                            possible_thermal_index = fix_index
                         else:
                             possible_thermal_fixes.append(fix)
 
@@ -76,7 +89,7 @@ class PySoarThermalDetector:
                 if abs(total_bearing_change) > self.CRUISE_THRESHOLD_BEARINGTOT:
                     cruise = False
                     phases[-1].fixes.append(possible_thermal_fixes[0])
-                    phases.append(Phase(cruise, possible_thermal_fixes))
+                    phases.append(Phase(cruise, possible_thermal_fixes, possible_thermal_index))
 
                     possible_thermal_fixes = list()
                     sharp_thermal_entry_found = False
@@ -95,13 +108,14 @@ class PySoarThermalDetector:
 
                     if len(possible_cruise_fixes) == 0:
                         possible_cruise_fixes = [fix]
+                        possible_cruise_index = fix_index
                         total_bearing_change = bearing_change
                     else:
                         possible_cruise_fixes.append(fix)
                         total_bearing_change += bearing_change
 
-                    delta_t = (time - possible_cruise_fixes[0]['datetime']).total_seconds()
-                    cruise_distance, _ = calculate_distance_bearing(possible_cruise_fixes[0], fix)
+                    delta_t = times[fix_index] - times[possible_cruise_index]
+                    cruise_distance, _ = engine.distance_bearing(possible_cruise_fixes[0], fix)
                     temp_bearing_rate_avg = 0 if delta_t == 0 else total_bearing_change / delta_t
 
                     if (cruise_distance > self.THERMAL_THRESHOLD_DISTANCE and
@@ -109,7 +123,7 @@ class PySoarThermalDetector:
 
                         cruise = True
                         phases[-1].fixes.append(possible_cruise_fixes[0])
-                        phases.append(Phase(cruise, possible_cruise_fixes))
+                        phases.append(Phase(cruise, possible_cruise_fixes, possible_cruise_index))
                         possible_cruise_fixes = list()
                         total_bearing_change = 0
 
@@ -0,0 +1,3 @@
+"""
+This package contains the columnar Trace type and the functionality operating on complete traces.
+"""
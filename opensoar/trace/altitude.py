@@ -0,0 +1,174 @@
+"""
+Altitude analytics of traces: gain and loss with hysteresis, extremes and the offset between gps and pressure altitude.
+
+Gps altitudes jitter by a few meters from fix to fix. Summing all differences counts this noise as climb and descent,
+so the gain and loss are computed with a hysteresis threshold: altitude changes count only when the altitude moves
+more than the threshold in the opposite direction. All functions work on the columns of a Trace at once.
+"""
+from collections import namedtuple
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from opensoar.trace.trace import Trace
+
+HYSTERESIS_THRESHOLD = 10  # m, clearly above the fix to fix noise of the gps altitude
+
+# gain and loss in m (positive numbers), altitudes in m. the offset is the median of gps minus pressure altitude.
+AltitudeStatistics = namedtuple('AltitudeStatistics',
+                                'gain loss max_altitude min_altitude gps_pressure_offset')
+
+
+def _hysteresis_path(altitudes: np.ndarray, half_width: float) -> np.ndarray:
+    """
+    Play operator: the output follows the altitude with a backlash of half_width, moving only when the altitude is
+    further away than half_width. Each step clamps the previous output; clamps compose to a clamp, so the recursion is
+    solved with a prefix scan in log2(n) vectorised steps instead of a loop over all fixes.
+    """
+
+    lower = altitudes - half_width
+    upper = altitudes + half_width
+
+    offset = 1
+    while offset < len(altitudes):
+        # compose the clamp of each fix with the combined clamp of the preceding offset fixes
+        new_lower, new_upper = lower.copy(), upper.copy()
+        new_lower[offset:] = np.clip(lower[:-offset], lower[offset:], upper[offset:])
+        new_upper[offset:] = np.clip(upper[:-offset], lower[offset:], upper[offset:])
+        lower, upper = new_lower, new_upper
+        offset *= 2
+
+    return np.clip(altitudes[0], lower, upper)
+
+
+def turning_altitudes(altitudes, threshold: float = HYSTERESIS_THRESHOLD) -> np.ndarray:
+    """
+    Altitudes of the turning points: the first altitude, then alternately the highest and lowest altitude between
+    reversals larger than the threshold, ending with the last extreme.
+    :param altitudes: m
+    :param threshold: m, smaller reversals are ignored. 0 keeps every reversal.
+    :return:
+    """
+
+    altitudes = np.asarray(altitudes, dtype=np.float64)
+    if len(altitudes) < 2:
+        return altitudes
+
+    half_width = 0.5 * threshold
+    path = _hysteresis_path(altitudes, half_width)
+
+    steps = np.diff(path)
+    moving = np.flatnonzero(steps)
+    directions = np.sign(steps[moving])
+
+    # the last step of every run in the same direction. the path is half_width below a peak and above a trough.
+    run_ends = np.append(directions[1:] != directions[:-1], True)
+    extremes = path[moving[run_ends] + 1] + directions[run_ends] * half_width
+
+    return np.concatenate([altitudes[:1], extremes])
+
+
+def gain_and_loss(altitudes, threshold: float = HYSTERESIS_THRESHOLD) -> Tuple[float, float]:
+    """
+    Total altitude gain and loss, ignoring reversals smaller than the threshold.
+    :param altitudes: m
+    :param threshold: m. with 0 every difference between consecutive altitudes counts.
+    :return: gain and loss, both positive
+    """
+    climbs = np.diff(turning_altitudes(altitudes, threshold))
+    return climbs[climbs > 0].sum().item(), -climbs[climbs < 0].sum().item()
+
+
+def altitude_statistics(trace, start: int = 0, end: int = None, threshold: float = HYSTERESIS_THRESHOLD,
+                        gps_altitude: bool = True) -> AltitudeStatistics:
+    """
+    :param trace: Trace or list of b-records
+    :param start: index of the first fix
+    :param end: index of the last fix (inclusive). defaults to the last fix of the trace
+    :param threshold: hysteresis threshold for gain and loss in m
+    :param gps_altitude: use gps altitude for gain, loss and extremes, otherwise pressure altitude
+    :return: None when there are no fixes between start and end
+    """
+
+    trace = Trace.from_fixes(trace)
+    stop = len(trace) if end is None else end + 1
+    gps_alt = trace.gps_alt[start:stop]
+    pressure_alt = trace.pressure_alt[start:stop]
+    if len(gps_alt) == 0:
+        return None
+
+    altitudes = gps_alt if gps_altitude else pressure_alt
+    gain, loss = gain_and_loss(altitudes, threshold)
+    offset = np.median(gps_alt.astype(np.float64) - pressure_alt).item()
+
+    return AltitudeStatistics(gain, loss, altitudes.max().item(), altitudes.min().item(), offset)
+
+
+def phase_altitude_statistics(trace, phases: List, threshold: float = HYSTERESIS_THRESHOLD,
+                              gps_altitude: bool = True) -> List[AltitudeStatistics]:
+    """
+    :param trace: the trace in which the phases are detected
+    :param phases: list of Phase, e.g. from FlightPhases.all_phases
+    :param threshold:
+    :param gps_altitude:
+    :return: statistics per phase
+    """
+
+    trace = Trace.from_fixes(trace)
+    statistics = list()
+    for phase in phases:
+        start = phase.start_index if phase.start_index is not None else trace.index(phase.fixes[0])
+        statistics.append(altitude_statistics(trace, start, start + len(phase.fixes) - 1, threshold, gps_altitude))
+    return statistics
+
+
+def leg_altitude_statistics(trace, trip, threshold: float = HYSTERESIS_THRESHOLD,
+                            gps_altitude: bool = True) -> List[AltitudeStatistics]:
+    """
+    :param trace: the trace on which the trip is determined
+    :param trip: Trip
+    :param threshold:
+    :param gps_altitude:
+    :return: statistics per started leg, the leg of an outlanding ends at the outlanding fix
+    """
+
+    boundaries = list(trip.fix_indices)
+    if trip.outlanded():
+        boundaries.append(trip.outlanding_fix_index)
+
+    return [altitude_statistics(trace, start, end, threshold, gps_altitude)
+            for start, end in zip(boundaries[:-1], boundaries[1:])]
+
+
+def competition_day_altitude_statistics(competition_day, threshold: float = HYSTERESIS_THRESHOLD,
+                                        gps_altitude: bool = True) -> Dict[str, dict]:
+    """
+    Altitude statistics of all competitors of an analysed CompetitionDay (see CompetitionDay.analyse_flights).
+    :param competition_day:
+    :param threshold:
+    :param gps_altitude:
+    :return: per competition_id a dict with the statistics of the complete 'trace', per 'legs' and per 'phases'
+             (the phases within the trip). Legs and phases are empty lists for competitors who did not start.
+    """
+
+    statistics = dict()
+    for competitor in competition_day.competitors:
+        trace = competitor.trace
+        if trace is None or len(trace) == 0:
+            continue
+
+        trace = Trace.from_fixes(trace)
+        legs, phases = list(), list()
+        if competitor.trip is not None and len(competitor.trip.fixes) >= 1:
+            legs = leg_altitude_statistics(trace, competitor.trip, threshold, gps_altitude)
+        if competitor.phases is not None:
+            phases = phase_altitude_statistics(trace, competitor.phases.all_phases(leg='all'), threshold,
+                                               gps_altitude)
+
+        statistics[competitor.competition_id] = dict(
+            trace=altitude_statistics(trace, threshold=threshold, gps_altitude=gps_altitude),
+            legs=legs,
+            phases=phases,
+        )
+
+    return statistics
@@ -0,0 +1,177 @@
+"""
+Resampling of traces: a uniform time grid, decimation to a maximum number of fixes and simplification within a distance
+tolerance. All functions work on the columns of a Trace at once. They make the trade-off between accuracy and speed
+explicit, e.g. for the sector fixes of an AAT, for GeoJSON output and for comparing competitors at the same moments.
+"""
+from math import radians, cos
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from opensoar.trace.trace import Trace
+
+EARTH_RADIUS = 6371000  # m, mean radius for the local projection used in simplify_indices
+
+
+def decimation_stride(number_of_fixes: int, max_fixes: int) -> int:
+    """Stride for keeping at most max_fixes fixes (always keeping the first)"""
+    return number_of_fixes // max_fixes + 1
+
+
+def decimate(fixes: Sequence, max_fixes: int) -> Sequence:
+    """
+    Keep every k-th element, with k the smallest stride resulting in at most max_fixes elements.
+    :param fixes: list of fixes, list of indices, array or Trace
+    :param max_fixes:
+    :return: same type as fixes (a Trace results in a Trace)
+    """
+    stride = decimation_stride(len(fixes), max_fixes)
+    if isinstance(fixes, Trace):
+        return fixes.take(np.arange(0, len(fixes), stride))
+    else:
+        return fixes[0::stride]
+
+
+def uniform_times(start: int, end: int, interval: int) -> np.ndarray:
+    """
+    Grid of times between start and end (inclusive), at multiples of interval. Grids of different traces with the same
+    interval therefore share their timestamps.
+    :param start: seconds since epoch
+    :param end: seconds since epoch
+    :param interval: seconds
+    :return:
+    """
+    first = -(-start // interval) * interval  # first multiple of interval >= start
+    return np.arange(first, end + 1, interval, dtype=np.int64)
+
+
+def resample(trace: Trace, times: np.ndarray) -> Trace:
+    """
+    Linear interpolation of the trace at the given times, which should lie within the trace. ENL values are taken from
+    the last fix at or before each time, since interpolating the engine noise would smear engine runs.
+    :param trace:
+    :param times: seconds since epoch
+    :return:
+    """
+
+    times = np.asarray(times, dtype=np.int64)
+    if len(trace) == 0 or len(times) == 0:
+        return Trace(times[:0], [], [], [], [], None if trace.enl is None else [])
+    if times[0] < trace.time[0] or times[-1] > trace.time[-1]:
+        raise ValueError('Resampling times should be within the trace')
+
+    lat = np.interp(times, trace.time, trace.lat)
+    lon = np.interp(times, trace.time, trace.lon)
+    gps_alt = np.rint(np.interp(times, trace.time, trace.gps_alt))
+    pressure_alt = np.rint(np.interp(times, trace.time, trace.pressure_alt))
+
+    enl = None
+    if trace.enl is not None:
+        enl = trace.enl[np.searchsorted(trace.time, times, side='right') - 1]
+
+    return Trace(times, lat, lon, gps_alt, pressure_alt, enl)
+
+
+def resample_uniform(trace: Trace, interval: int) -> Trace:
+    """
+    Resample on a uniform grid of multiples of interval seconds, see uniform_times.
+    :param trace:
+    :param interval: seconds
+    :return:
+    """
+    if len(trace) == 0:
+        return resample(trace, [])
+    return resample(trace, uniform_times(int(trace.time[0]), int(trace.time[-1]), interval))
+
+
+def align_traces(traces: List[Trace], interval: int) -> Tuple[np.ndarray, List[Trace]]:
+    """
+    Resample multiple traces (e.g. all competitors of a day) on one common time grid, such that the fixes of different
+    traces can be compared by index.
+    :param traces:
+    :param interval: seconds
+    :return: the common grid (from the earliest to the latest fix) and the resampled traces. Every trace only covers
+             the part of the grid between its own first and last fix.
+    """
+
+    traces = [Trace.from_fixes(trace) for trace in traces]
+    non_empty = [trace for trace in traces if len(trace) != 0]
+    if len(non_empty) == 0:
+        return np.zeros(0, dtype=np.int64), [resample(trace, []) for trace in traces]
+
+    start = min(int(trace.time[0]) for trace in non_empty)
+    end = max(int(trace.time[-1]) for trace in non_empty)
+    grid = uniform_times(start, end, interval)
+
+    resampled = list()
+    for trace in traces:
+        if len(trace) == 0:
+            resampled.append(resample(trace, []))
+        else:
+            first = np.searchsorted(grid, trace.time[0], side='left')
+            end = np.searchsorted(grid, trace.time[-1], side='right')
+            resampled.append(resample(trace, grid[first:end]))
+
+    return grid, resampled
+
+
+def _local_coordinates(trace: Trace) -> Tuple[np.ndarray, np.ndarray]:
+    """Equirectangular projection in meters around the centre of the trace"""
+    lat0 = radians(0.5 * (trace.lat.min() + trace.lat.max()))
+    x = np.radians(trace.lon) * EARTH_RADIUS * cos(lat0)
+    y = np.radians(trace.lat) * EARTH_RADIUS
+    return x, y
+
+
+def simplify_indices(trace: Trace, tolerance: float) -> np.ndarray:
+    """
+    Douglas-Peucker simplification: the kept fixes form a path which stays within tolerance of every removed fix.
+    Distances are computed in a local projection, which is accurate to well below a meter for the size of a flight.
+    :param trace:
+    :param tolerance: maximum distance in meters between a removed fix and the simplified path
+    :return: increasing indices of the kept fixes, always including the first and the last
+    """
+
+    number_of_fixes = len(trace)
+    if number_of_fixes < 3:
+        return np.arange(number_of_fixes)
+
+    x, y = _local_coordinates(trace)
+    keep = np.zeros(number_of_fixes, dtype=bool)
+    keep[0] = keep[-1] = True
+
+    segments = [(0, number_of_fixes - 1)]
+    while segments:
+        first, last = segments.pop()
+        if last - first < 2:
+            continue
+
+        # distance of all intermediate fixes to the segment between first and last
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        length_squared = dx * dx + dy * dy
+        if length_squared == 0:
+            distances_squared = px * px + py * py
+        else:
+            fraction = np.clip((px * dx + py * dy) / length_squared, 0, 1)
+            distances_squared = (px - fraction * dx) ** 2 + (py - fraction * dy) ** 2
+
+        max_index = int(np.argmax(distances_squared))
+        if distances_squared[max_index] > tolerance * tolerance:
+            split = first + 1 + max_index
+            keep[split] = True
+            segments.append((first, split))
+            segments.append((split, last))
+
+    return np.flatnonzero(keep)
+
+
+def simplify(trace: Trace, tolerance: float) -> Trace:
+    """
+    Trace with only the fixes needed to stay within tolerance meters of the original path, see simplify_indices.
+    :param trace:
+    :param tolerance: meters
+    :return:
+    """
+    trace = Trace.from_fixes(trace)
+    return trace.take(simplify_indices(trace, tolerance))
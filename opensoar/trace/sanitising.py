@@ -0,0 +1,149 @@
+"""
+Removal of invalid fixes from a trace, before the analysis.
+
+Loggers occasionally record fixes with the same time as the previous fix, with a time before the previous fix, or with
+a position far away from the neighbouring fixes (gps spikes). Zero time differences break the speed calculations of the
+thermal detector, and spikes can cause false sector entries. Fixes identical to the previous fix apart from the time
+(e.g. while standing on the ground) carry no information and are removed as well. All checks work on the columns of a
+Trace at once.
+"""
+from collections import namedtuple
+from math import radians, cos
+from typing import Tuple
+
+import numpy as np
+
+from opensoar.trace.trace import Trace
+
+MAX_SPEED = 140  # m/s, clearly above the speed of any glider
+MAX_GLITCH_FIXES = 10  # maximum length of a run of fixes removed as a single glitch
+EARTH_RADIUS = 6371000  # m
+
+# original trace indices of the removed fixes, per reason
+SanitisingReport = namedtuple('SanitisingReport', 'duplicate_times time_reversals speed_glitches zero_movements')
+
+
+def number_of_removed_fixes(report: SanitisingReport) -> int:
+    return sum(len(indices) for indices in report)
+
+
+def _monotonic_mask(time: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fixes which are not later than all previous fixes are rejected. A single fix with a time after the next fix (while
+    its predecessor is before the next fix) is a time glitch itself. It is rejected first, otherwise all following fixes
+    would be rejected.
+    :param time:
+    :return: masks of the fixes with the same time as the latest previous fix and of the fixes before it (or glitches)
+    """
+
+    glitch = np.zeros(len(time), dtype=bool)
+    glitch[1:-1] = (time[1:-1] > time[2:]) & (time[:-2] < time[2:])
+
+    candidates = np.flatnonzero(~glitch)
+    candidate_time = time[candidates]
+    latest_previous = np.maximum.accumulate(candidate_time)[:-1]
+
+    duplicate = np.zeros(len(time), dtype=bool)
+    reversal = glitch
+    duplicate[candidates[1:]] = candidate_time[1:] == latest_previous
+    reversal[candidates[1:]] = candidate_time[1:] < latest_previous
+    return duplicate, reversal
+
+
+def _segment_speeds(time: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Ground speed between consecutive fixes (equirectangular approximation), in m/s"""
+    cos_lat = cos(radians(0.5 * (lat.min() + lat.max())))
+    dx = np.radians(np.diff(lon)) * EARTH_RADIUS * cos_lat
+    dy = np.radians(np.diff(lat)) * EARTH_RADIUS
+    return np.hypot(dx, dy) / np.diff(time)
+
+
+def _speed_glitch_mask(time: np.ndarray, lat: np.ndarray, lon: np.ndarray, max_speed: float) -> np.ndarray:
+    """
+    A glitch is a short run of fixes which is entered and left at an impossible speed, while the fixes around it are
+    reachable from each other. A first or last fix which can only be reached at an impossible speed is a glitch as well.
+    The speeds are calculated at once; only the (rare) impossible segments are inspected one by one.
+    """
+
+    speeds = _segment_speeds(time, lat, lon)
+    too_fast = np.flatnonzero(speeds > max_speed)  # segment i connects fix i and i + 1
+    glitch = np.zeros(len(time), dtype=bool)
+
+    position = 0
+    while position < len(too_fast):
+        enter = too_fast[position]
+        if position + 1 < len(too_fast):
+            leave = too_fast[position + 1]
+            if leave - enter <= MAX_GLITCH_FIXES:
+                bridge = _segment_speeds(time[[enter, leave + 1]], lat[[enter, leave + 1]], lon[[enter, leave + 1]])
+                if bridge[0] <= max_speed:
+                    glitch[enter + 1:leave + 1] = True
+                    position += 2
+                    continue
+
+        if enter == 0:
+            glitch[0] = True
+        elif enter == len(time) - 2:
+            glitch[-1] = True
+        position += 1
+
+    return glitch
+
+
+def _zero_movement_mask(trace: Trace, kept: np.ndarray) -> np.ndarray:
+    """
+    Fixes with the same position, altitudes and ENL value as the previous kept fix.
+    :param trace:
+    :param kept: increasing indices of the fixes which are kept so far
+    :return: mask over all fixes of the trace
+    """
+
+    columns = [trace.lat, trace.lon, trace.gps_alt, trace.pressure_alt]
+    if trace.enl is not None:
+        columns.append(trace.enl)
+
+    same = np.ones(len(kept) - 1, dtype=bool)
+    for column in columns:
+        values = column[kept]
+        same &= values[1:] == values[:-1]
+
+    zero_movement = np.zeros(len(trace), dtype=bool)
+    zero_movement[kept[1:][same]] = True
+    return zero_movement
+
+
+def sanitise(trace, max_speed: float = MAX_SPEED,
+             remove_zero_movement: bool = True) -> Tuple[Trace, SanitisingReport]:
+    """
+    Remove fixes with duplicate times, time reversals, gps glitches and fixes without movement.
+    :param trace: Trace or list of b-records
+    :param max_speed: fixes which are only reachable at a higher speed (m/s) are removed as glitches
+    :param remove_zero_movement: remove fixes which are identical to the previous fix apart from the time
+    :return: cleaned trace (the original Trace when nothing is removed) and the report of removed fixes
+    """
+
+    trace = Trace.from_fixes(trace)
+    indices = np.arange(len(trace))
+    empty = np.zeros(0, dtype=np.intp)
+    if len(trace) < 2:
+        return trace, SanitisingReport(empty, empty, empty, empty)
+
+    duplicate, reversal = _monotonic_mask(trace.time)
+    keep = ~(duplicate | reversal)
+
+    kept = indices[keep]
+    speed_glitch = np.zeros(len(trace), dtype=bool)
+    speed_glitch[kept[_speed_glitch_mask(trace.time[kept], trace.lat[kept], trace.lon[kept], max_speed)]] = True
+    keep &= ~speed_glitch
+
+    if remove_zero_movement:
+        zero_movement = _zero_movement_mask(trace, indices[keep])
+        keep &= ~zero_movement
+    else:
+        zero_movement = np.zeros(len(trace), dtype=bool)
+
+    report = SanitisingReport(indices[duplicate], indices[reversal], indices[speed_glitch], indices[zero_movement])
+    if keep.all():
+        return trace, report
+    else:
+        return trace.take(indices[keep]), report
@@ -0,0 +1,209 @@
+"""
+Season-wide storage of traces in a single memory-mapped file.
+
+A store is a directory with two files: 'traces.bin' with the columns of all traces one after another, and
+'index.json' with the location of every trace by key (competition/class/date/competition_id). Traces are returned as
+Trace objects whose columns are read-only views on the memory map, so opening a trace does not read or copy any data
+and the operating system shares the pages between all processes which open the same store.
+"""
+import datetime
+import json
+import os
+import tempfile
+from collections import namedtuple, OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+
+from opensoar.trace.trace import Trace
+
+DATA_FILE_NAME = 'traces.bin'
+INDEX_FILE_NAME = 'index.json'
+ALIGNMENT = 8  # bytes, every column starts at a multiple of the largest item size
+
+_COLUMNS = (
+    ('time', np.int64),
+    ('lat', np.float64),
+    ('lon', np.float64),
+    ('gps_alt', np.int32),
+    ('pressure_alt', np.int32),
+    ('enl', np.int16),
+)
+
+MAX_OPEN_STORES = 8  # stores kept open by TraceReference.load per process
+
+_open_stores = OrderedDict()  # by directory: (index signature, TraceStore), least recently used first
+
+
+def _index_signature(directory: str):
+    """Modification time and size of the index file, None when the store has no index yet"""
+    try:
+        status = os.stat(os.path.join(directory, INDEX_FILE_NAME))
+    except FileNotFoundError:
+        return None
+    return status.st_mtime_ns, status.st_size
+
+
+def _open_store(directory: str, key: str) -> 'TraceStore':
+    """
+    Open store of the directory, shared by all references in the process. The store is opened again when its index
+    file has been rewritten (e.g. traces added by another process) or does not contain the key yet. Only the most
+    recently used MAX_OPEN_STORES stores stay open.
+    :param directory: absolute path of the store
+    :param key: key to be read from the store
+    :return:
+    """
+
+    signature = _index_signature(directory)
+    signature_and_store = _open_stores.pop(directory, None)
+    if signature_and_store is None or signature_and_store[0] != signature or key not in signature_and_store[1]:
+        signature_and_store = (signature, TraceStore(directory))
+
+    _open_stores[directory] = signature_and_store
+    while len(_open_stores) > MAX_OPEN_STORES:
+        _open_stores.popitem(last=False)
+
+    return signature_and_store[1]
+
+
+class TraceReference(namedtuple('TraceReference', 'store_directory key')):
+    """Reference to a trace inside a TraceStore. Cheap to pickle, e.g. for sending to worker processes."""
+
+    __slots__ = ()
+
+    def load(self) -> Trace:
+        """The referenced trace. Stores are kept open per process, see _open_store."""
+        return _open_store(os.path.abspath(self.store_directory), self.key)[self.key]
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class TraceStore(Mapping):
+    """
+    Mapping from key to Trace, backed by a memory-mapped data file. New traces are appended with add; the index is
+    written by flush (or when leaving a with block). Only a single process should write to a store at a time.
+    """
+
+    def __init__(self, directory: str):
+        """
+        :param directory: created when not existing
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self._data_path = os.path.join(directory, DATA_FILE_NAME)
+        self._index_path = os.path.join(directory, INDEX_FILE_NAME)
+
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                self._index = json.load(f)
+        else:
+            self._index = dict()
+
+        self._data = None  # memory map, opened on first read
+        self._index_changed = False
+
+    @staticmethod
+    def key(competition: str, plane_class: str, date: datetime.date, competition_id: str) -> str:
+        """
+        :param competition:
+        :param plane_class: may be None
+        :param date:
+        :param competition_id:
+        :return: 'competition/plane_class/date/competition_id'
+        """
+        for name, value in [('competition', competition), ('date', date), ('competition_id', competition_id)]:
+            if not value:
+                raise ValueError('A trace key needs a {}'.format(name))
+        return '/'.join([competition, str(plane_class), date.isoformat(), competition_id])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __getitem__(self, key) -> Trace:
+        entry = self._index[key]
+        if self._data is None:
+            self._data = np.memmap(self._data_path, dtype=np.uint8, mode='r')
+
+        number_of_fixes = entry['fixes']
+        offset = entry['offset']
+        columns = dict()
+        for name, dtype in _COLUMNS:
+            if name == 'enl' and not entry['enl']:
+                columns[name] = None
+                continue
+            columns[name] = np.frombuffer(self._data, dtype=dtype, count=number_of_fixes, offset=offset)
+            offset = _aligned(offset + number_of_fixes * np.dtype(dtype).itemsize)
+
+        return Trace(**columns)
+
+    def reference(self, key: str) -> TraceReference:
+        if key not in self._index:
+            raise KeyError(key)
+        return TraceReference(self.directory, key)
+
+    def add(self, key: str, trace):
+        """
+        Append a trace. An existing trace with the same key is replaced (its data stays in the file).
+        :param key: see TraceStore.key
+        :param trace: Trace or list of b-records
+        """
+
+        trace = Trace.from_fixes(trace)
+        with open(self._data_path, 'ab') as f:
+            offset = _aligned(f.tell())
+            f.write(bytes(offset - f.tell()))
+
+            for name, dtype in _COLUMNS:
+                column = getattr(trace, name)
+                if column is None:
+                    continue
+                f.write(np.ascontiguousarray(column, dtype=dtype).tobytes())
+                f.write(bytes(_aligned(f.tell()) - f.tell()))
+
+        self._index[key] = dict(offset=offset, fixes=len(trace), enl=trace.enl is not None)
+        self._index_changed = True
+        self._data = None  # the file has grown: map again on the next read
+
+    def add_competition_day(self, competition_day):
+        """
+        Append the traces of all competitors of a CompetitionDay and write the index.
+        :param competition_day:
+        :return: keys of the added traces
+        """
+
+        # all keys are determined before any trace is written, such that a missing field does not leave a partial day
+        competitors = [competitor for competitor in competition_day.competitors if competitor.trace is not None]
+        keys = [self.key(competition_day.name, competition_day.plane_class, competition_day.date,
+                         competitor.competition_id) for competitor in competitors]
+
+        for key, competitor in zip(keys, competitors):
+            self.add(key, competitor.trace)
+
+        self.flush()
+        return keys
+
+    def flush(self):
+        """Write the index, atomically, when traces have been added"""
+        if not self._index_changed:
+            return
+
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(temporary_path, self._index_path)
+        self._index_changed = False
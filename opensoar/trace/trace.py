@@ -0,0 +1,195 @@
+import datetime
+from collections.abc import Mapping, Sequence
+from typing import List
+
+import numpy as np
+
+
+class FixView(Mapping):
+    """
+    Read-only, dict-compatible view on a single fix of a Trace. It supports the keys of an aerofiles b-record which
+    are used throughout opensoar: 'datetime', 'lat', 'lon', 'gps_alt', 'pressure_alt' and (when logged) 'ENL'.
+    """
+
+    __slots__ = ('trace', 'index')
+
+    def __init__(self, trace: 'Trace', index: int):
+        self.trace = trace
+        self.index = index
+
+    def __getitem__(self, key):
+        trace = self.trace
+        if key == 'lat':
+            return float(trace.lat[self.index])
+        elif key == 'lon':
+            return float(trace.lon[self.index])
+        elif key == 'datetime':
+            return trace.datetime(self.index)
+        elif key == 'gps_alt':
+            return int(trace.gps_alt[self.index])
+        elif key == 'pressure_alt':
+            return int(trace.pressure_alt[self.index])
+        elif key == 'ENL' and trace.enl is not None:
+            return int(trace.enl[self.index])
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.trace.keys
+
+    def __iter__(self):
+        return iter(self.trace.keys)
+
+    def __len__(self):
+        return len(self.trace.keys)
+
+    def __eq__(self, other):
+        if isinstance(other, FixView) and other.trace is self.trace:
+            return other.index == self.index
+        else:
+            return super().__eq__(other)
+
+    def __hash__(self):
+        return hash((id(self.trace), self.index))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        # views are immutable: copying should not copy the complete trace
+        return self
+
+    def __repr__(self):
+        return "<FixView %s lat=%s, lon=%s>" % (self['datetime'], self['lat'], self['lon'])
+
+
+class Trace(Sequence):
+    """
+    Gps trace stored as contiguous arrays, one entry per fix. Indexing returns a FixView, slicing a list of
+    FixViews, such that a Trace can be used everywhere a list of aerofiles b-records is expected.
+    """
+
+    def __init__(self, time, lat, lon, gps_alt=None, pressure_alt=None, enl=None):
+        """
+        :param time: seconds since epoch (UTC)
+        :param lat: latitudes in degrees
+        :param lon: longitudes in degrees
+        :param gps_alt: optional gps altitudes in meters, zero when not given
+        :param pressure_alt: optional pressure altitudes in meters, zero when not given
+        :param enl: optional engine noise levels. None when not logged
+        """
+
+        self.time = np.asarray(time, dtype=np.int64)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+
+        number_of_fixes = len(self.time)
+        self.gps_alt = np.zeros(number_of_fixes, np.int32) if gps_alt is None else np.asarray(gps_alt, np.int32)
+        self.pressure_alt = np.zeros(number_of_fixes, np.int32) if pressure_alt is None else \
+            np.asarray(pressure_alt, np.int32)
+        self.enl = None if enl is None else np.asarray(enl, dtype=np.int16)
+
+        if not (len(self.lat) == len(self.lon) == len(self.gps_alt) == len(self.pressure_alt) == number_of_fixes):
+            raise ValueError('All columns of a trace should have the same length')
+        if self.enl is not None and len(self.enl) != number_of_fixes:
+            raise ValueError('All columns of a trace should have the same length')
+
+        self.keys = ('datetime', 'lat', 'lon', 'gps_alt', 'pressure_alt')
+        if self.enl is not None:
+            self.keys += ('ENL', )
+
+        self._segment_table = None
+
+    @classmethod
+    def from_fixes(cls, fixes) -> 'Trace':
+        """
+        Create a Trace from aerofiles b-records.
+        :param fixes: list of dicts with at least the keys 'datetime', 'lat' and 'lon'
+        :return:
+        """
+        # prevent circular import
+        from opensoar.utilities.helper_functions import fixes_to_seconds
+
+        if isinstance(fixes, Trace):
+            return fixes
+
+        number_of_fixes = len(fixes)
+        time = fixes_to_seconds(fixes).astype(np.int64)
+        lat = np.fromiter((fix['lat'] for fix in fixes), dtype=np.float64, count=number_of_fixes)
+        lon = np.fromiter((fix['lon'] for fix in fixes), dtype=np.float64, count=number_of_fixes)
+        gps_alt = np.fromiter((fix.get('gps_alt', 0) for fix in fixes), dtype=np.int32, count=number_of_fixes)
+        pressure_alt = np.fromiter((fix.get('pressure_alt', 0) for fix in fixes), dtype=np.int32,
+                                   count=number_of_fixes)
+
+        if any('ENL' in fix for fix in fixes):
+            enl = np.fromiter((fix.get('ENL', 0) for fix in fixes), dtype=np.int16, count=number_of_fixes)
+        else:
+            enl = None
+
+        return cls(time, lat, lon, gps_alt, pressure_alt, enl)
+
+    def to_fixes(self) -> List[dict]:
+        """Convert to list of dicts"""
+        return [dict(fix) for fix in self]
+
+    def __len__(self):
+        return len(self.time)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [FixView(self, index) for index in range(*key.indices(len(self)))]
+        elif isinstance(key, (int, np.integer)):
+            index = int(key)
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError('Trace index out of range')
+            return FixView(self, index)
+        else:
+            raise TypeError('Trace indices must be integers or slices')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield FixView(self, index)
+
+    def __repr__(self):
+        return "<Trace fixes=%s>" % len(self)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_segment_table'] = None  # derived data is not transferred
+        return state
+
+    def index(self, fix, start=0, stop=None):
+        """Index of the fix in this trace. Constant time for fixes obtained from this trace."""
+        if isinstance(fix, FixView) and fix.trace is self:
+            if fix.index >= start and (stop is None or fix.index < stop):
+                return fix.index
+        return super().index(fix, start, len(self) if stop is None else stop)
+
+    def datetime(self, index: int) -> datetime.datetime:
+        """Timezone aware (UTC) datetime of a fix"""
+        return datetime.datetime.fromtimestamp(int(self.time[index]), tz=datetime.timezone.utc)
+
+    def subtrace(self, start: int, stop: int) -> 'Trace':
+        """New Trace sharing the arrays of this trace between start and stop (exclusive)"""
+        return Trace(self.time[start:stop], self.lat[start:stop], self.lon[start:stop], self.gps_alt[start:stop],
+                     self.pressure_alt[start:stop], None if self.enl is None else self.enl[start:stop])
+
+    def take(self, indices) -> 'Trace':
+        """New Trace with the fixes at the given (increasing) indices"""
+        indices = np.asarray(indices, dtype=np.intp)
+        return Trace(self.time[indices], self.lat[indices], self.lon[indices], self.gps_alt[indices],
+                     self.pressure_alt[indices], None if self.enl is None else self.enl[indices])
+
+    def segment_table(self, distance_engine=None):
+        """
+        Segment table of this trace, built on first use and rebuilt when the columns or the engine change.
+        Values changed in place within the column arrays are not detected.
+        """
+        # prevent circular import
+        from opensoar.utilities.segment_table import SegmentTable
+
+        if self._segment_table is None or not self._segment_table.describes(self, distance_engine):
+            self._segment_table = SegmentTable(self, distance_engine)
+        return self._segment_table
@@ -0,0 +1,241 @@
+"""
+Distance engines determine how distances, bearings and destinations are calculated during the analysis.
+
+The default EllipsoidDistanceEngine uses geodesics on the WGS84 ellipsoid and is scoring-grade. The
+PlanarDistanceEngine approximates the earth locally by a tangent plane around the task area, which replaces
+the geodesic calculations by plain arithmetic at the cost of a (reported) error.
+"""
+from abc import ABC, abstractmethod
+from math import radians, degrees, sin, cos, sqrt, atan2
+from typing import Tuple
+
+import numpy as np
+
+from opensoar.utilities.helper_functions import calculate_distance_bearing, calculate_distances_bearings, \
+    calculate_destination, calculate_destinations, calculate_bearing_difference
+
+WGS84_SEMI_MAJOR_AXIS = 6378137.0
+WGS84_FLATTENING = 1 / 298.257223563
+
+
+class DistanceEngine(ABC):
+    """
+    Abstract Base Class for distance engines.
+    """
+
+    max_error = 0  # worst-case distance error in meters with respect to the ellipsoid
+
+    @abstractmethod
+    def distance_bearing(self, fix1, fix2, final_bearing=False) -> Tuple[float, float]:
+        """
+        :param fix1: dict with keys 'lat' and 'lon'
+        :param fix2: dict with keys 'lat' and 'lon'
+        :param final_bearing: switch to True results in taking the bearing at fix2
+        :return: distance in meters, bearing in degrees (0-360)
+        """
+
+    @abstractmethod
+    def distances_bearings(self, lats1, lons1, lats2, lons2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Batched version of distance_bearing. Inputs are broadcast against each other.
+        :return: distances in meters, forward bearings and final bearings in degrees (0-360)
+        """
+
+    @abstractmethod
+    def destination(self, start_fix, distance, bearing) -> dict:
+        """
+        :param start_fix: dict with keys 'lat' and 'lon'
+        :param distance: in meters
+        :param bearing: in degrees
+        :return: dict with keys 'lat' and 'lon'
+        """
+
+    @abstractmethod
+    def destinations(self, lats, lons, distances, bearings) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batched version of destination. Inputs are broadcast against each other.
+        :return: latitudes and longitudes in degrees
+        """
+
+    def bearing_change(self, fix_minus2, fix_minus1, fix) -> float:
+        """Bearing change between three fixes in degrees between -180 and +180."""
+        _, bearing1 = self.distance_bearing(fix_minus2, fix_minus1)
+        _, bearing2 = self.distance_bearing(fix_minus1, fix)
+        return calculate_bearing_difference(bearing1, bearing2)
+
+
+class EllipsoidDistanceEngine(DistanceEngine):
+    """
+    Scoring-grade engine using geodesics on the WGS84 ellipsoid.
+    """
+
+    max_error = 0
+
+    def __repr__(self):
+        return "<EllipsoidDistanceEngine>"
+
+    def distance_bearing(self, fix1, fix2, final_bearing=False):
+        return calculate_distance_bearing(fix1, fix2, final_bearing=final_bearing)
+
+    def distances_bearings(self, lats1, lons1, lats2, lons2):
+        return calculate_distances_bearings(lats1, lons1, lats2, lons2)
+
+    def destination(self, start_fix, distance, bearing):
+        return calculate_destination(start_fix, distance, bearing)
+
+    def destinations(self, lats, lons, distances, bearings):
+        return calculate_destinations(lats, lons, distances, bearings)
+
+
+class PlanarDistanceEngine(DistanceEngine):
+    """
+    Fast engine which treats the task area as a local tangent plane. The radii of curvature of the ellipsoid are
+    evaluated once at the reference point. Longitude differences are scaled with the mean latitude of each point pair
+    and bearings are corrected for meridian convergence.
+
+    The worst-case distance error with respect to the ellipsoid is determined on construction for all point pairs
+    within the extent and is available as max_error.
+    """
+
+    def __init__(self, latitude: float, longitude: float, extent: float):
+        """
+        :param latitude: latitude of the reference point in degrees
+        :param longitude: longitude of the reference point in degrees
+        :param extent: radius around the reference point in meters for which the engine is used
+        """
+        self.latitude = latitude
+        self.longitude = longitude
+        self.extent = extent
+
+        e2 = WGS84_FLATTENING * (2 - WGS84_FLATTENING)
+        w = sqrt(1 - e2 * sin(radians(latitude)) ** 2)
+        self._meridional_radius = WGS84_SEMI_MAJOR_AXIS * (1 - e2) / w ** 3
+        self._normal_radius = WGS84_SEMI_MAJOR_AXIS / w
+
+        self.max_error = self._calculate_max_error()
+
+    def __repr__(self):
+        return "<PlanarDistanceEngine lat=%s, lon=%s, extent=%s, max_error=%.1f>" % (
+            self.latitude, self.longitude, self.extent, self.max_error)
+
+    @classmethod
+    def from_waypoints(cls, waypoints, margin: float = 20000):
+        """
+        Create engine centred on the task area.
+        :param waypoints:
+        :param margin: distance in meters outside the sectors which is still covered by the extent
+        :return:
+        """
+        lats = np.array([waypoint.latitude for waypoint in waypoints])
+        lons = np.array([waypoint.longitude for waypoint in waypoints])
+        latitude = (lats.min() + lats.max()) / 2
+        longitude = (lons.min() + lons.max()) / 2
+
+        distances, _, _ = calculate_distances_bearings(latitude, longitude, lats, lons)
+        max_radius = max(waypoint.r_max or 0 for waypoint in waypoints)
+        extent = distances.max() + max_radius + margin
+
+        return cls(float(latitude), float(longitude), float(extent))
+
+    def _calculate_max_error(self, number_of_bearings=16):
+        """Compare with the ellipsoid for all pairs of a set of points sampled within the extent"""
+
+        bearings = np.linspace(0, 360, number_of_bearings, endpoint=False)
+        sample_distances = np.concatenate([np.full(number_of_bearings, self.extent),
+                                           np.full(number_of_bearings, self.extent / 2)])
+        sample_bearings = np.concatenate([bearings, bearings + 180 / number_of_bearings])
+        lats, lons = calculate_destinations(self.latitude, self.longitude, sample_distances, sample_bearings)
+        lats = np.append(lats, self.latitude)
+        lons = np.append(lons, self.longitude)
+
+        lats1, lats2 = np.meshgrid(lats, lats)
+        lons1, lons2 = np.meshgrid(lons, lons)
+
+        exact, _, _ = calculate_distances_bearings(lats1, lons1, lats2, lons2)
+        approximate, _, _ = self.distances_bearings(lats1, lons1, lats2, lons2)
+        return float(np.abs(exact - approximate).max())
+
+    def distance_bearing(self, fix1, fix2, final_bearing=False):
+        mean_lat = radians(0.5 * (fix1['lat'] + fix2['lat']))
+        delta_lon = radians(fix2['lon'] - fix1['lon'])
+        dx = self._normal_radius * cos(mean_lat) * delta_lon
+        dy = self._meridional_radius * radians(fix2['lat'] - fix1['lat'])
+
+        distance = sqrt(dx * dx + dy * dy)
+        bearing = degrees(atan2(dx, dy))
+
+        # meridian convergence: half of the change in bearing has taken place at the middle of the line
+        if final_bearing:
+            bearing += 0.5 * degrees(delta_lon * sin(mean_lat))
+        else:
+            bearing -= 0.5 * degrees(delta_lon * sin(mean_lat))
+
+        return distance, bearing % 360
+
+    def distances_bearings(self, lats1, lons1, lats2, lons2):
+        lats1, lons1, lats2, lons2 = np.broadcast_arrays(*[np.asarray(values, dtype=float)
+                                                           for values in (lats1, lons1, lats2, lons2)])
+
+        mean_lats = np.radians(0.5 * (lats1 + lats2))
+        delta_lons = np.radians(lons2 - lons1)
+        dx = self._normal_radius * np.cos(mean_lats) * delta_lons
+        dy = self._meridional_radius * np.radians(lats2 - lats1)
+
+        distances = np.hypot(dx, dy)
+        bearings = np.degrees(np.arctan2(dx, dy))
+        half_convergence = 0.5 * np.degrees(delta_lons * np.sin(mean_lats))
+
+        return distances, (bearings - half_convergence) % 360, (bearings + half_convergence) % 360
+
+    def destination(self, start_fix, distance, bearing):
+        lat = start_fix['lat']
+        dy = distance * cos(radians(bearing))
+        end_lat = lat + degrees(dy / self._meridional_radius)
+
+        # two iterations to take the mean latitude and meridian convergence into account
+        mid_bearing = radians(bearing)
+        for _ in range(2):
+            mean_lat = radians(0.5 * (lat + end_lat))
+            dx = distance * sin(mid_bearing)
+            dy = distance * cos(mid_bearing)
+            end_lat = lat + degrees(dy / self._meridional_radius)
+            delta_lon = dx / (self._normal_radius * cos(mean_lat))
+            mid_bearing = radians(bearing) + 0.5 * delta_lon * sin(mean_lat)
+
+        return dict(lat=end_lat, lon=start_fix['lon'] + degrees(delta_lon))
+
+    def destinations(self, lats, lons, distances, bearings):
+        lats, lons, distances, bearings = np.broadcast_arrays(*[np.asarray(values, dtype=float)
+                                                                for values in (lats, lons, distances, bearings)])
+
+        dy = distances * np.cos(np.radians(bearings))
+        end_lats = lats + np.degrees(dy / self._meridional_radius)
+
+        # two iterations to take the mean latitude and meridian convergence into account
+        mid_bearings = np.radians(bearings)
+        for _ in range(2):
+            mean_lats = np.radians(0.5 * (lats + end_lats))
+            dx = distances * np.sin(mid_bearings)
+            dy = distances * np.cos(mid_bearings)
+            end_lats = lats + np.degrees(dy / self._meridional_radius)
+            delta_lons = dx / (self._normal_radius * np.cos(mean_lats))
+            mid_bearings = np.radians(bearings) + 0.5 * delta_lons * np.sin(mean_lats)
+
+        end_lons = lons + np.degrees(delta_lons)
+        return end_lats, end_lons
+
+
+_default_distance_engine = EllipsoidDistanceEngine()
+
+
+def get_default_distance_engine() -> DistanceEngine:
+    """Engine used by all Waypoints, Tasks and thermal detectors for which no engine has been set."""
+    return _default_distance_engine
+
+
+def set_default_distance_engine(distance_engine: DistanceEngine):
+    """Globally replace the default engine. Pass None to restore the ellipsoid engine."""
+    global _default_distance_engine
+    if distance_engine is None:
+        distance_engine = EllipsoidDistanceEngine()
+    _default_distance_engine = distance_engine
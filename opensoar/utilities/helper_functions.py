@@ -2,10 +2,13 @@ from copy import copy
 from math import isclose, pi, sin, cos, atan2
 
 import datetime
-from typing import List
+from typing import List, Sequence, Tuple
 
+import numpy as np
 from pyproj import Geod
 
+from opensoar.trace.trace import Trace
+
 g = Geod(ellps='WGS84')
 
 
@@ -50,6 +53,73 @@ def calculate_distance_bearing(fix1, fix2, final_bearing=False):
         return dist, bw_bearing
 
 
+def fixes_to_lat_lon(fixes: Sequence[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Collect the coordinates of a sequence of fixes in two arrays.
+    :param fixes: b-records from IGC file (dicts with keys 'lat' and 'lon')
+    :return: latitudes and longitudes in degrees
+    """
+    if isinstance(fixes, Trace):
+        return fixes.lat, fixes.lon
+
+    lats = np.fromiter((fix['lat'] for fix in fixes), dtype=float, count=len(fixes))
+    lons = np.fromiter((fix['lon'] for fix in fixes), dtype=float, count=len(fixes))
+    return lats, lons
+
+
+def datetime_to_seconds(time: datetime.datetime) -> float:
+    """Seconds since epoch. Naive datetimes are taken as UTC."""
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=datetime.timezone.utc)
+    return time.timestamp()
+
+
+def fixes_to_seconds(fixes: Sequence[dict]) -> np.ndarray:
+    """
+    Collect the times of a sequence of fixes in an array, such that time arithmetic can be done on plain numbers.
+    :param fixes: b-records from IGC file (dicts with key 'datetime')
+    :return: seconds since epoch
+    """
+    if isinstance(fixes, Trace):
+        return fixes.time.astype(float)
+
+    return np.fromiter((datetime_to_seconds(fix['datetime']) for fix in fixes), dtype=float, count=len(fixes))
+
+
+def calculate_distances_bearings(lats1, lons1, lats2, lons2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Batched counterpart of calculate_distance_bearing: all point pairs are solved in a single Geod.inv call.
+    Inputs are broadcast against each other, so a single waypoint can be compared with a complete trace.
+    :param lats1: latitudes of the first points in degrees
+    :param lons1: longitudes of the first points in degrees
+    :param lats2: latitudes of the second points in degrees
+    :param lons2: longitudes of the second points in degrees
+    :return: distances in meters, forward bearings (tangent at first points) and final bearings (tangent at second
+    points) in degrees (0-360)
+    """
+    lats1, lons1, lats2, lons2 = np.broadcast_arrays(*[np.asarray(values, dtype=float)
+                                                       for values in (lats1, lons1, lats2, lons2)])
+    shape = lats1.shape
+
+    fw_bearings, bw_bearings, distances = g.inv(lons1.ravel(), lats1.ravel(), lons2.ravel(), lats2.ravel())
+
+    fw_bearings = np.where(fw_bearings < 0, fw_bearings + 360, fw_bearings)
+    bw_bearings = bw_bearings + 180
+
+    return distances.reshape(shape), fw_bearings.reshape(shape), bw_bearings.reshape(shape)
+
+
+def calculate_trace_distances_bearings(fixes: Sequence[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calculate distance and bearing between all consecutive fixes in one go.
+    :param fixes: b-records from IGC file (dicts with keys 'lat' and 'lon')
+    :return: distances in meters and bearings in degrees, with one entry less than the number of fixes
+    """
+    lats, lons = fixes_to_lat_lon(fixes)
+    distances, bearings, _ = calculate_distances_bearings(lats[:-1], lons[:-1], lats[1:], lons[1:])
+    return distances, bearings
+
+
 def calculate_bearing_difference(bearing1, bearing2):
     """
     Calculate smallest difference from bearing 1 -> bearing2.
@@ -67,6 +137,18 @@ def calculate_bearing_difference(bearing1, bearing2):
         return difference - 360
 
 
+def calculate_bearing_differences(bearings1, bearings2) -> np.ndarray:
+    """
+    Batched counterpart of calculate_bearing_difference, with identical results per element.
+    :param bearings1: start bearings in degrees (0-360)
+    :param bearings2: end bearings in degrees (0-360)
+    :return: angles between -180 and +180 degrees.
+    """
+    differences = np.asarray(bearings2, dtype=float) - np.asarray(bearings1, dtype=float)
+    return np.where(differences <= -180, differences + 360,
+                    np.where(differences >= 180, differences - 360, differences))
+
+
 def calculate_bearing_change(fix_minus2, fix_minus1, fix):
     """
     Calculate bearing change between three fixes.
@@ -106,32 +188,41 @@ def height_difference_fixes(fix1, fix2, gps_altitude=True):
         return fix2['pressure_alt'] - fix1['pressure_alt']
 
 
-def altitude_gain_and_loss(fixes: List[dict], gps_altitude=True):
-    if gps_altitude:
-        altitude_key = 'gps_alt'
-    else:
-        altitude_key = 'pressure_alt'
+def altitude_gain_and_loss(fixes: List[dict], gps_altitude=True, threshold: float = 0):
+    """
+    Total altitude gain and loss (both positive).
+    :param fixes:
+    :param gps_altitude: use gps altitude, otherwise pressure altitude
+    :param threshold: hysteresis in m, see trace.altitude.gain_and_loss. 0 counts every altitude difference.
+    :return:
+    """
+    # prevent circular import
+    from opensoar.utilities.segment_table import get_segment_table
+    from opensoar.trace.altitude import gain_and_loss
 
-    gain, loss = 0, 0
-    for fix, next_fix in double_iterator(fixes):
-        delta_h = next_fix[altitude_key] - fix[altitude_key]
+    if len(fixes) < 2:
+        return 0, 0
 
-        if delta_h >= 0:
-            gain += delta_h
-        else:
-            loss += (-delta_h)
+    if threshold > 0:
+        trace = Trace.from_fixes(fixes)
+        return gain_and_loss(trace.gps_alt if gps_altitude else trace.pressure_alt, threshold)
+
+    climbs = get_segment_table(fixes).climbs(gps_altitude)
+    gain = climbs[climbs >= 0].sum().item()
+    loss = -climbs[climbs < 0].sum().item()
 
     return gain, loss
 
 
 def total_distance_travelled(fixes: List[dict]):
     """Calculates the total distance, summing over the inter fix distances"""
-    distance = 0
-    for fix, next_fix in double_iterator(fixes):
-        inter_fix_dist, _ = calculate_distance_bearing(fix, next_fix)
-        distance += inter_fix_dist
+    # prevent circular import
+    from opensoar.utilities.segment_table import get_segment_table
+
+    if len(fixes) < 2:
+        return 0
 
-    return distance
+    return get_segment_table(fixes).distances.sum().item()
 
 
 def range_with_bounds(start: int, stop: int, interval: int) -> List[int]:
@@ -161,16 +252,35 @@ def interpolate_fixes(fix1, fix2, interval=1):
 
     fixes = list()
     for difference in time_differences:
-        fraction = difference / time_differences[-1]
-
-        lat = fix1['lat'] + fraction * (fix2['lat'] - fix1['lat'])
-        lon = fix1['lon'] + fraction * (fix2['lon'] - fix1['lon'])
-        time = fix1['datetime'] + datetime.timedelta(seconds=difference)
-        fixes.append(dict(datetime=time, lat=lat, lon=lon))
+        fixes.append(interpolate_fix(fix1, fix2, difference, time_differences[-1]))
 
     return fixes
 
 
+def interpolate_fix(fix1, fix2, difference, total_difference=None):
+    """
+    Create a single fix between fix1 and fix2. Only time, latitude and longitude are interpolated.
+    :param fix1: b-record from IGC file (dict with keys 'lat' and 'lon')
+    :param fix2: b-record from IGC file (dict with keys 'lat' and 'lon')
+    :param difference: time after fix1 in seconds
+    :param total_difference: optional time between fix1 and fix2 in seconds, to prevent recalculation
+    :return: fix at given time after fix1. fix1 itself when both fixes have the same time.
+    """
+
+    if total_difference is None:
+        total_difference = (fix2['datetime'] - fix1['datetime']).total_seconds()
+
+    if total_difference == 0:
+        return fix1
+
+    fraction = difference / total_difference
+
+    lat = fix1['lat'] + fraction * (fix2['lat'] - fix1['lat'])
+    lon = fix1['lon'] + fraction * (fix2['lon'] - fix1['lon'])
+    time = fix1['datetime'] + datetime.timedelta(seconds=difference)
+    return dict(datetime=time, lat=lat, lon=lon)
+
+
 def calculate_destination(start_fix, distance, bearing):
     if bearing > 180:
         bearing -= 360
@@ -178,6 +288,24 @@ def calculate_destination(start_fix, distance, bearing):
     return dict(lat=endlat, lon=endlon)
 
 
+def calculate_destinations(lats, lons, distances, bearings) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Batched counterpart of calculate_destination. Inputs are broadcast against each other.
+    :param lats: latitudes of the start points in degrees
+    :param lons: longitudes of the start points in degrees
+    :param distances: in meters
+    :param bearings: in degrees
+    :return: latitudes and longitudes of the destinations in degrees
+    """
+    lats, lons, distances, bearings = np.broadcast_arrays(*[np.asarray(values, dtype=float)
+                                                            for values in (lats, lons, distances, bearings)])
+    shape = lats.shape
+
+    bearings = np.where(bearings > 180, bearings - 360, bearings)
+    endlons, endlats, _ = g.fwd(lons.ravel(), lats.ravel(), bearings.ravel(), distances.ravel())
+    return endlats.reshape(shape), endlons.reshape(shape)
+
+
 def dms2dd(degrees, minutes, seconds, cardinal):
     """convert coordinate format with degrees, minutes and second to degrees"""
     dd = degrees + minutes / 60.0 + seconds / 3600.0
@@ -0,0 +1,121 @@
+"""
+Per-segment quantities of a trace. A segment is the part of the trace between two consecutive fixes.
+"""
+import numpy as np
+
+from opensoar.utilities.distance_engines import get_default_distance_engine
+from opensoar.trace.trace import Trace
+from opensoar.utilities.helper_functions import fixes_to_lat_lon, fixes_to_seconds
+
+
+def _columns(fixes) -> tuple:
+    if isinstance(fixes, Trace):
+        return fixes.time, fixes.lat, fixes.lon, fixes.gps_alt, fixes.pressure_alt
+    return ()
+
+
+class SegmentTable:
+    """
+    Distance, bearing, time delta and climb of all segments of a trace. Entry i describes the segment between
+    fix i and fix i+1. Every column is calculated vectorized the first time it is accessed.
+    """
+
+    def __init__(self, fixes, distance_engine=None):
+        """
+        :param fixes: b-records from IGC file
+        :param distance_engine: optional engine for distances and bearings. defaults to the global engine.
+        """
+        self.fixes = fixes
+        self.distance_engine = distance_engine if distance_engine is not None else get_default_distance_engine()
+
+        # columns at construction: a Trace whose columns are replaced afterwards is not described by this table
+        self._columns = _columns(fixes)
+
+        self._distances = None
+        self._bearings = None
+        self._bearing_changes = None
+        self._times = None
+        self._time_deltas = None
+        self._climbs = dict()
+
+    def __len__(self):
+        return max(len(self.fixes) - 1, 0)
+
+    def describes(self, fixes, distance_engine) -> bool:
+        """Whether this table has been built for these (unchanged) fixes and engine"""
+        if distance_engine is None:
+            distance_engine = get_default_distance_engine()
+        return self.fixes is fixes and len(fixes) - 1 == len(self) and self.distance_engine is distance_engine and \
+            all(column is cached_column for column, cached_column in zip(_columns(fixes), self._columns))
+
+    def _calculate_distances_bearings(self):
+        lats, lons = fixes_to_lat_lon(self.fixes)
+        self._distances, self._bearings, _ = self.distance_engine.distances_bearings(lats[:-1], lons[:-1],
+                                                                                     lats[1:], lons[1:])
+
+    @property
+    def distances(self) -> np.ndarray:
+        """Segment lengths in meters"""
+        if self._distances is None:
+            self._calculate_distances_bearings()
+        return self._distances
+
+    @property
+    def bearings(self) -> np.ndarray:
+        """Segment bearings in degrees (0-360), taken at the first fix of the segment"""
+        if self._bearings is None:
+            self._calculate_distances_bearings()
+        return self._bearings
+
+    @property
+    def bearing_changes(self) -> np.ndarray:
+        """
+        Bearing change between consecutive segments in degrees between -180 and +180.
+        Entry i is the change at fix i+1, equal to calculate_bearing_change on fixes i, i+1 and i+2.
+        """
+        if self._bearing_changes is None:
+            differences = self.bearings[1:] - self.bearings[:-1]
+            self._bearing_changes = np.select([differences <= -180, differences >= 180],
+                                              [differences + 360, differences - 360], differences)
+        return self._bearing_changes
+
+    @property
+    def times(self) -> np.ndarray:
+        """Time of every fix in seconds since epoch"""
+        if self._times is None:
+            self._times = fixes_to_seconds(self.fixes)
+        return self._times
+
+    @property
+    def time_deltas(self) -> np.ndarray:
+        """Segment durations in seconds"""
+        if self._time_deltas is None:
+            self._time_deltas = np.diff(self.times)
+        return self._time_deltas
+
+    def climbs(self, gps_altitude=True) -> np.ndarray:
+        """Altitude differences in meters"""
+        altitude_key = 'gps_alt' if gps_altitude else 'pressure_alt'
+        if altitude_key not in self._climbs and isinstance(self.fixes, Trace):
+            altitudes = self.fixes.gps_alt if gps_altitude else self.fixes.pressure_alt
+            self._climbs[altitude_key] = np.diff(altitudes.astype(int))
+        elif altitude_key not in self._climbs:
+            altitudes = np.array([fix[altitude_key] for fix in self.fixes])
+            self._climbs[altitude_key] = np.diff(altitudes)
+        return self._climbs[altitude_key]
+
+
+def get_segment_table(fixes, distance_engine=None) -> SegmentTable:
+    """
+    Obtain the segment table of a trace. The table of a Trace is stored on the trace (see Trace.segment_table), such
+    that all analyses on the same trace share one table. Traces derived with take or subtrace get their own table.
+    For a list of b-records a new table is built on every call.
+    :param fixes: b-records from IGC file
+    :param distance_engine: optional engine for distances and bearings. defaults to the global engine.
+    :return:
+    """
+
+    if isinstance(fixes, Trace):
+        return fixes.segment_table(distance_engine)
+
+    return SegmentTable(fixes, distance_engine)
@@ -11,14 +11,18 @@ setup(
     license='MIT',
     description='Open source python library for glider flight analysis',
     url='https://github.com/glidergeek/opensoar',
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['tests', 'tests.*', 'benchmarks', 'benchmarks.*']),
     long_description=long_description,
     install_requires=[
         'aerofiles~=1.4.0',
         'beautifulsoup4~=4.6.0',
         'pyproj>=3.4.1',
+        'numpy',
         'geojson>=3.0.0',
         'shapely>2.0.0',
         'requests~=2.32.3',
-    ]
+    ],
+    extras_require={
+        'zstd': ['zstandard'],
+    },
 )
@@ -0,0 +1,55 @@
+import datetime
+import unittest
+
+from benchmarks.synthetic import generate_race_task, generate_aat, generate_flight, flight_to_igc_lines
+from opensoar.igc.reader import parse_igc
+from opensoar.task.trip import Trip
+from opensoar.trace.trace import Trace
+
+
+class TestSyntheticFlights(unittest.TestCase):
+
+    duration = datetime.timedelta(hours=2)
+    leg_length = 15000
+
+    def test_deterministic(self):
+        task = generate_race_task(leg_length=self.leg_length)
+        self.assertListEqual(generate_flight(task, self.duration, seed=3), generate_flight(task, self.duration, seed=3))
+        self.assertNotEqual(generate_flight(task, self.duration, seed=3), generate_flight(task, self.duration, seed=4))
+
+    def test_sample_rate(self):
+        task = generate_race_task(leg_length=self.leg_length)
+        trace = generate_flight(task, self.duration, sample_rate=4)
+        self.assertEqual((trace[1]['datetime'] - trace[0]['datetime']).total_seconds(), 4)
+
+    def test_completed_race_task(self):
+        task = generate_race_task(leg_length=self.leg_length)
+        trip = Trip(task, generate_flight(task, self.duration))
+        self.assertFalse(trip.outlanded())
+        self.assertEqual(trip.completed_legs(), 3)
+
+    def test_completed_aat(self):
+        task = generate_aat(leg_length=self.leg_length, t_min=datetime.timedelta(hours=1))
+        trip = Trip(task, generate_flight(task, self.duration, as_trace=True))
+        self.assertFalse(trip.outlanded())
+        self.assertEqual(trip.completed_legs(), 3)
+
+    def test_outlanding(self):
+        task = generate_race_task(leg_length=self.leg_length)
+        trip = Trip(task, generate_flight(task, self.duration, outlanding_fraction=0.5, engine_noise=True))
+        self.assertTrue(trip.outlanded())
+        self.assertEqual(trip.outlanding_leg(), 1)
+
+    def test_as_trace(self):
+        task = generate_race_task(leg_length=self.leg_length)
+        self.assertIsInstance(generate_flight(task, self.duration, as_trace=True), Trace)
+
+    def test_igc_lines(self):
+        task = generate_race_task(leg_length=self.leg_length)
+        fixes = generate_flight(task, self.duration, sample_rate=4, engine_noise=True)
+        trace = parse_igc(flight_to_igc_lines(fixes), fallback=False)['fix_records'][1]
+
+        self.assertEqual(len(trace), len(fixes))
+        self.assertEqual(trace[10]['datetime'], fixes[10]['datetime'])
+        self.assertEqual(trace[10]['ENL'], fixes[10]['ENL'])
+        self.assertAlmostEqual(trace[10]['lat'], fixes[10]['lat'], places=4)
@@ -307,9 +307,8 @@ class TestCrosscountryDaily(unittest.TestCase):
     
     @mock.patch('urllib.request.urlopen')
     @mock.patch('opensoar.competition.crosscountry.CrosscountryDaily.download_flight')
-    @mock.patch('opensoar.competition.crosscountry.Reader')
-    @mock.patch('builtins.open', new_callable=mock.mock_open)
-    def test_generate_competition_day(self, mock_open, mock_reader, mock_download, mock_urlopen):
+    @mock.patch('opensoar.competition.crosscountry.read_igc_files')
+    def test_generate_competition_day(self, mock_read_igc, mock_download, mock_urlopen):
         """Test generating a CompetitionDay object from Crosscountry data."""
         # Setup mocks
         mock_urlopen.side_effect = [
@@ -330,16 +329,10 @@ class TestCrosscountryDaily(unittest.TestCase):
         # Mock downloading IGC files
         mock_download.side_effect = lambda url, cn: f"{self.temp_dir}/{cn}.igc"
         
-        # Mock IGC file content and reading
-        mock_igc_content = "AFILETYPENM"  # Minimal IGC content for testing
-        mock_open.return_value.read.return_value = mock_igc_content
-        
-        # Mock the Reader class and its read method
-        mock_parser = mock.MagicMock()
-        mock_parser.read.return_value = {
+        # Mock reading the IGC files
+        mock_read_igc.side_effect = lambda file_paths, max_workers: [{
             'fix_records': (None, [{'time': '101010', 'lat': 51.0, 'lon': 10.0}])
-        }
-        mock_reader.return_value = mock_parser
+        } for _ in file_paths]
         
         # Create CrosscountryDaily instance and generate competition day
         competition_day = sgp.generate_competition_day(str(self.temp_dir))
@@ -358,9 +351,9 @@ class TestCrosscountryDaily(unittest.TestCase):
         self.assertIsInstance(competition_day.task, RaceTask)
         self.assertEqual(len(competition_day.task.waypoints), 3)
         
-        # Verify that files were properly opened and read
-        mock_open.assert_called()
-        mock_reader.return_value.read.assert_called()
+        # Verify that the downloaded files were read
+        file_paths, max_workers = mock_read_igc.call_args[0]
+        self.assertEqual(file_paths[0], f"{self.temp_dir}/ABC.igc")
 
 if __name__ == "__main__":
     unittest.main()
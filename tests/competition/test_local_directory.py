@@ -0,0 +1,89 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from opensoar.competition.local_directory import LocalDirectoryDaily
+from opensoar.igc.archive import write_igc_bytes
+from opensoar.task.race_task import RaceTask
+from tests.task.helper_functions import get_task
+
+
+class TestLocalDirectory(unittest.TestCase):
+
+    cwd = os.path.dirname(__file__)
+    igc_dir = os.path.join(cwd, '..', 'igc_files')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.flight_dir = os.path.join(self.temp_dir, 'sallandse-tweedaagse')
+        os.makedirs(self.flight_dir)
+
+        for competition_id, file_name in [('HS', 'race_task_completed.igc'), ('PR', 'outlanding_race_task.igc')]:
+            shutil.copy(os.path.join(self.igc_dir, file_name), os.path.join(self.flight_dir, competition_id + '.igc'))
+
+        with open(os.path.join(self.igc_dir, 'outlanding_race_task_enl.igc'), 'rb') as f:
+            write_igc_bytes(os.path.join(self.flight_dir, 'XX.igc.gz'), f.read())
+
+        with open(os.path.join(self.flight_dir, 'notes.txt'), 'w') as f:
+            f.write('not an igc file')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_igc_files(self):
+        local_directory = LocalDirectoryDaily(self.flight_dir)
+        self.assertEqual([os.path.basename(file_path) for file_path in local_directory.igc_files()],
+                         ['HS.igc', 'PR.igc', 'XX.igc.gz'])
+
+        local_directory = LocalDirectoryDaily(os.path.join(self.flight_dir, '*.igc'))
+        self.assertEqual(len(local_directory.igc_files()), 2)
+
+    def test_competition_id_from_file_name(self):
+        self.assertEqual(LocalDirectoryDaily.competition_id_from_file_name('flights/PR.igc.gz'), 'PR')
+        self.assertEqual(LocalDirectoryDaily.competition_id_from_file_name('PR.IGC'), 'PR')
+
+    def test_generate_competition_day(self):
+        competition_day = LocalDirectoryDaily(self.flight_dir).generate_competition_day(max_workers=2)
+
+        self.assertEqual(competition_day.name, 'sallandse-tweedaagse')
+        self.assertEqual(competition_day.date, datetime.date(2014, 6, 21))
+        self.assertEqual(len(competition_day.competitors), 3)
+        self.assertIsInstance(competition_day.task, RaceTask)
+        self.assertEqual(competition_day.task, get_task(os.path.join(self.igc_dir, 'race_task_completed.igc')))
+
+    def test_skip_different_task(self):
+        # file without task information
+        shutil.copy(os.path.join(self.igc_dir, 'missing_lcu_lseeyou_lines.igc'), os.path.join(self.flight_dir, 'NT.igc'))
+
+        competition_day = LocalDirectoryDaily(self.flight_dir).generate_competition_day(skip_different_task=True)
+        self.assertEqual([competitor.competition_id for competitor in competition_day.competitors], ['HS', 'SU'])
+
+        competition_day.analyse_flights('pysoar')
+        self.assertEqual([competitor.trip.outlanded() for competitor in competition_day.competitors], [False, True])
+
+    def test_strepla(self):
+        shutil.copy(os.path.join(self.igc_dir, 'aat_strepla.igc'), self.temp_dir)
+        competition_day = LocalDirectoryDaily(os.path.join(self.temp_dir, '*.igc')).generate_competition_day()
+
+        self.assertEqual(len(competition_day.competitors), 1)
+        self.assertTrue(competition_day.task.waypoints)
+
+    def test_zip(self):
+        zip_path = os.path.join(self.temp_dir, 'day.zip')
+        with zipfile.ZipFile(zip_path, 'w') as archive:
+            for file_name in ('HS.igc', 'PR.igc'):
+                archive.write(os.path.join(self.flight_dir, file_name), file_name)
+
+        competition_day = LocalDirectoryDaily(zip_path).generate_competition_day()
+        self.assertEqual(competition_day.name, 'day')
+        self.assertEqual(len(competition_day.competitors), 2)
+
+        competition_day = LocalDirectoryDaily(zip_path).generate_competition_day(max_workers=2)
+        self.assertEqual(len(competition_day.competitors), 2)
+
+    def test_no_files(self):
+        with self.assertRaises(ValueError):
+            LocalDirectoryDaily(os.path.join(self.temp_dir, '*.igc')).generate_competition_day()
@@ -1,9 +1,13 @@
 import unittest
 import os
 import datetime
+import shutil
+import tempfile
+from unittest import mock
 
 from opensoar.competition.soaringspot import get_lat_long, get_fixed_orientation_angle, get_sector_orientation, \
     get_sector_dimensions, get_waypoint, get_waypoints, SoaringSpotDaily, get_task_rules, get_info_from_comment_lines
+from opensoar.igc.parallel import read_igc_files
 from opensoar.task.waypoint import Waypoint
 from opensoar.task.task import Task
 
@@ -262,3 +266,43 @@ class TestSoaringspot(unittest.TestCase):
 
         task, contest_information, competitor_information = get_info_from_comment_lines(parsed_igc_file, date=datetime.date(2023, 7, 4))
         self.assertIsNone(task, None)
+
+    def test_generate_competition_day_skip_different_task(self):
+        cwd = os.path.dirname(__file__)
+        igc_files = {
+            'AA': 'race_task_completed.igc',
+            'BB': 'race_task_completed.igc',
+            'CC': 'outlanding_race_task_enl.igc',
+            'DD': 'missing_lcu_lseeyou_lines.igc',  # no task information
+        }
+
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+
+        def download_flight(igc_url, competition_id):
+            file_path = os.path.join(temp_dir, '{}.igc'.format(competition_id))
+            shutil.copy(os.path.join(cwd, '..', 'igc_files', igc_files[competition_id]), file_path)
+            return file_path
+
+        competitors_info = [dict(competition_id=competition_id, igc_url=None, ranking=ranking)
+                            for ranking, competition_id in enumerate(igc_files, 1)]
+
+        soaringspot_page = SoaringSpotDaily('https://www.soaringspot.com/en/sallandse-tweedaagse-2014/results/club/'
+                                            'task-1-on-2014-06-21/daily')
+        with mock.patch.object(soaringspot_page, '_get_competition_day_info',
+                               return_value=('test', datetime.date(2014, 6, 21), 'club')), \
+                mock.patch.object(soaringspot_page, '_get_competitors_info', return_value=competitors_info), \
+                mock.patch.object(soaringspot_page, 'download_flight', side_effect=download_flight):
+
+            competition_day = soaringspot_page.generate_competition_day(temp_dir)
+            self.assertEqual([competitor.competition_id for competitor in competition_day.competitors],
+                             ['AA', 'BB', 'CC', 'DD'])
+
+            with mock.patch('opensoar.competition.soaringspot.read_igc_files',
+                            side_effect=read_igc_files) as mock_read_igc_files:
+                competition_day = soaringspot_page.generate_competition_day(temp_dir, skip_different_task=True,
+                                                                            max_workers=2)
+
+            self.assertEqual([competitor.competition_id for competitor in competition_day.competitors], ['AA', 'BB'])
+            file_paths, max_workers = mock_read_igc_files.call_args[0]
+            self.assertEqual(len(file_paths), 2)
@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+import numpy as np
+
+from opensoar.competition.soaringspot import SoaringSpotDaily
+from opensoar.igc.archive import read_igc_bytes, write_igc_bytes, compressed_file_path, zip_igc_members, \
+    read_zip_members
+from opensoar.igc.cache import read_igc_cached
+from opensoar.igc.reader import read_igc, read_igc_zip, read_igc_metadata
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class TestArchive(unittest.TestCase):
+
+    cwd = os.path.dirname(__file__)
+    igc_path = os.path.join(cwd, '..', 'igc_files', 'race_task_completed.igc')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with open(self.igc_path, 'rb') as f:
+            self.data = f.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def assert_equal_parse(self, parsed_igc_file, expected):
+        for column in ('time', 'lat', 'lon', 'gps_alt', 'pressure_alt'):
+            np.testing.assert_array_equal(getattr(parsed_igc_file['fix_records'][1], column),
+                                          getattr(expected['fix_records'][1], column))
+        self.assertEqual(parsed_igc_file['comment_records'], expected['comment_records'])
+
+    def test_compressed_files(self):
+        expected = read_igc(self.igc_path)
+
+        compressions = ['gz', 'xz'] if zstandard is None else ['gz', 'xz', 'zst']
+        for compression in compressions:
+            with self.subTest(compression=compression):
+                file_path = compressed_file_path(os.path.join(self.temp_dir, 'AA.igc'), compression)
+                write_igc_bytes(file_path, self.data)
+
+                self.assertLess(os.path.getsize(file_path), len(self.data) / 2)
+                self.assertEqual(read_igc_bytes(file_path), self.data)
+                self.assert_equal_parse(read_igc(file_path), expected)
+                self.assert_equal_parse(read_igc_cached(file_path), expected)
+                self.assertEqual(read_igc_metadata(file_path)['comment_records'], expected['comment_records'])
+
+    def test_interrupted_write(self):
+        file_path = os.path.join(self.temp_dir, 'AA.igc.gz')
+        write_igc_bytes(file_path, self.data)
+
+        with mock.patch('os.replace', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                write_igc_bytes(file_path, b'partial')
+
+        self.assertEqual(read_igc_bytes(file_path), self.data)
+        self.assertEqual(os.listdir(self.temp_dir), ['AA.igc.gz'])
+
+    def test_unknown_compression(self):
+        with self.assertRaises(ValueError):
+            compressed_file_path('AA.igc', 'rar')
+
+        with self.assertRaises(ValueError):
+            SoaringSpotDaily('https://www.soaringspot.com/', compression='rar')
+
+    def test_zip(self):
+        zip_path = os.path.join(self.temp_dir, 'day.zip')
+        with zipfile.ZipFile(zip_path, 'w') as archive:
+            archive.writestr('AA.igc', self.data)
+            archive.writestr('readme.txt', b'not an igc file')
+            archive.writestr('BB.IGC', self.data)
+
+        self.assertEqual(zip_igc_members(zip_path), ['AA.igc', 'BB.IGC'])
+        self.assertEqual(read_zip_members(zip_path), {'AA.igc': self.data, 'BB.IGC': self.data})
+        self.assertEqual(list(read_zip_members(zip_path, ['BB.IGC'])), ['BB.IGC'])
+
+        parsed_igc_files = read_igc_zip(zip_path)
+        self.assertEqual(list(parsed_igc_files), ['AA.igc', 'BB.IGC'])
+        self.assert_equal_parse(parsed_igc_files['BB.IGC'], read_igc(self.igc_path))
+
+    def test_daily_results_page_file_name(self):
+        soaringspot_page = SoaringSpotDaily('https://www.soaringspot.com/', compression='gz')
+        self.assertEqual(soaringspot_page.igc_file_name('AA'), 'AA.igc.gz')
+        self.assertEqual(SoaringSpotDaily('https://www.soaringspot.com/').igc_file_name('AA'), 'AA.igc')
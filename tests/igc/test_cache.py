@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from opensoar.igc import cache
+from opensoar.igc.cache import read_igc_cached, content_hash, cache_file_path, CACHE_DIRECTORY_NAME
+from opensoar.igc.reader import read_igc
+
+
+class TestCache(unittest.TestCase):
+
+    cwd = os.path.dirname(__file__)
+    igc_dir = os.path.join(cwd, '..', 'igc_files')
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def copy_igc_file(self, file_name):
+        file_path = os.path.join(self.temp_dir, file_name)
+        shutil.copy(os.path.join(self.igc_dir, file_name), file_path)
+        return file_path
+
+    def test_round_trip(self):
+        for file_name in ('race_task_completed.igc', 'outlanding_race_task_enl.igc'):
+            with self.subTest(file_name=file_name):
+                file_path = self.copy_igc_file(file_name)
+                expected = read_igc(file_path)
+
+                read_igc_cached(file_path)
+                cache_path = cache_file_path(os.path.join(self.temp_dir, CACHE_DIRECTORY_NAME),
+                                             content_hash(file_path))
+                self.assertTrue(os.path.exists(cache_path))
+
+                with mock.patch.object(cache, 'parse_igc_bytes') as mock_parse_igc_bytes:
+                    parsed_igc_file = read_igc_cached(file_path)
+                    mock_parse_igc_bytes.assert_not_called()
+
+                trace, expected_trace = parsed_igc_file['fix_records'][1], expected['fix_records'][1]
+                for column in ('time', 'lat', 'lon', 'gps_alt', 'pressure_alt', 'enl'):
+                    np.testing.assert_array_equal(getattr(trace, column), getattr(expected_trace, column))
+                self.assertEqual(parsed_igc_file['comment_records'], expected['comment_records'])
+                self.assertEqual(parsed_igc_file['fix_record_extensions'], expected['fix_record_extensions'])
+                self.assertEqual(parsed_igc_file['header'][1]['utc_date'], expected['header'][1]['utc_date'])
+
+    def test_changed_content(self):
+        file_path = self.copy_igc_file('race_task_completed.igc')
+        read_igc_cached(file_path)
+
+        with open(file_path, 'a') as f:
+            f.write('LCU::extra comment\n')
+
+        parsed_igc_file = read_igc_cached(file_path)
+        self.assertEqual(parsed_igc_file['comment_records'][1][-1]['comment'], ':extra comment')
+        self.assertEqual(len(os.listdir(os.path.join(self.temp_dir, CACHE_DIRECTORY_NAME))), 2)
+
+    def test_damaged_cache_entry(self):
+        file_path = self.copy_igc_file('race_task_completed.igc')
+        cache_directory = os.path.join(self.temp_dir, 'cache')
+        os.makedirs(cache_directory)
+        with open(cache_file_path(cache_directory, content_hash(file_path)), 'wb') as f:
+            f.write(b'no npz')
+
+        parsed_igc_file = read_igc_cached(file_path, cache_directory)
+        self.assertEqual(len(parsed_igc_file['fix_records'][1]), len(read_igc(file_path)['fix_records'][1]))
+
+    def test_truncated_cache_entry(self):
+        file_path = self.copy_igc_file('race_task_completed.igc')
+        read_igc_cached(file_path)
+
+        cache_path = cache_file_path(os.path.join(self.temp_dir, CACHE_DIRECTORY_NAME), content_hash(file_path))
+        size = os.path.getsize(cache_path)
+        with open(cache_path, 'r+b') as f:
+            f.truncate(size // 2)
+
+        parsed_igc_file = read_igc_cached(file_path)
+        self.assertEqual(len(parsed_igc_file['fix_records'][1]), len(read_igc(file_path)['fix_records'][1]))
+
+        # the damaged entry is replaced by a complete one
+        self.assertEqual(os.path.getsize(cache_path), size)
+        with mock.patch.object(cache, 'parse_igc_bytes') as mock_parse_igc_bytes:
+            read_igc_cached(file_path)
+            mock_parse_igc_bytes.assert_not_called()
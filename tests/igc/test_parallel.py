@@ -0,0 +1,45 @@
+import os
+import unittest
+
+import numpy as np
+
+from opensoar.igc.parallel import read_igc_files, parse_igc_contents
+from opensoar.igc.reader import read_igc
+
+
+class TestParallel(unittest.TestCase):
+
+    cwd = os.path.dirname(__file__)
+    igc_dir = os.path.join(cwd, '..', 'igc_files')
+
+    def test_order_and_errors(self):
+        file_paths = [os.path.join(self.igc_dir, file_name) for file_name in sorted(os.listdir(self.igc_dir))]
+        file_paths.insert(2, os.path.join(self.igc_dir, 'non_existing.igc'))
+
+        parsed_igc_files = read_igc_files(file_paths, max_workers=2, use_cache=False)
+
+        self.assertEqual(len(parsed_igc_files), len(file_paths))
+        self.assertIsInstance(parsed_igc_files[2], FileNotFoundError)
+        for file_path, parsed_igc_file in zip(file_paths, parsed_igc_files):
+            if file_path.endswith('non_existing.igc'):
+                continue
+            expected_trace = read_igc(file_path)['fix_records'][1]
+            np.testing.assert_array_equal(parsed_igc_file['fix_records'][1].time, expected_trace.time)
+            np.testing.assert_array_equal(parsed_igc_file['fix_records'][1].lat, expected_trace.lat)
+
+    def test_serial(self):
+        file_path = os.path.join(self.igc_dir, 'race_task_completed.igc')
+        parsed_igc_files = read_igc_files([file_path, file_path], max_workers=1, use_cache=False)
+        self.assertEqual(len(parsed_igc_files[0]['fix_records'][1]), len(parsed_igc_files[1]['fix_records'][1]))
+
+    def test_parse_contents(self):
+        with open(os.path.join(self.igc_dir, 'race_task_completed.igc'), 'rb') as f:
+            data = f.read()
+
+        invalid_date = b'HFDTE999999\nB1101355206343N00006198WA0058700558'
+        parsed_igc_files = parse_igc_contents([data, invalid_date, data], max_workers=2)
+
+        self.assertEqual(len(parsed_igc_files), 3)
+        self.assertIsInstance(parsed_igc_files[1], Exception)
+        np.testing.assert_array_equal(parsed_igc_files[2]['fix_records'][1].time,
+                                      parsed_igc_files[0]['fix_records'][1].time)
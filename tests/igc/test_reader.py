@@ -0,0 +1,114 @@
+import datetime
+import os
+import unittest
+
+import numpy as np
+from aerofiles.igc import Reader
+
+from opensoar.competition import soaringspot, strepla
+from opensoar.igc.reader import parse_igc, read_igc, decode_i_record, decode_h_utc_date, IgcDecodeError, \
+    read_igc_metadata, parse_igc_bytes
+from opensoar.trace.trace import Trace
+
+
+class TestReader(unittest.TestCase):
+
+    cwd = os.path.dirname(__file__)
+    igc_dir = os.path.join(cwd, '..', 'igc_files')
+
+    header = ['AFILETYPENM\n', 'HFDTE210614\n', 'I013638ENL\n']
+
+    def test_equal_to_aerofiles(self):
+        for file_name in sorted(os.listdir(self.igc_dir)):
+            with self.subTest(file_name=file_name):
+                igc_path = os.path.join(self.igc_dir, file_name)
+                with open(igc_path, 'r', encoding='latin1') as f:
+                    expected = Reader(skip_duplicates=True).read(f)
+
+                parsed_igc_file = read_igc(igc_path)
+                trace = parsed_igc_file['fix_records'][1]
+                expected_trace = Trace.from_fixes(expected['fix_records'][1])
+
+                self.assertIsInstance(trace, Trace)
+                self.assertEqual(trace.keys, expected_trace.keys)
+                for column in ('time', 'lat', 'lon', 'gps_alt', 'pressure_alt', 'enl'):
+                    np.testing.assert_array_equal(getattr(trace, column), getattr(expected_trace, column))
+
+                self.assertEqual(parsed_igc_file['comment_records'][1], expected['comment_records'][1])
+                self.assertEqual(parsed_igc_file['header'][1]['utc_date'], expected['header'][1]['utc_date'])
+
+    def test_metadata(self):
+        for file_name in sorted(os.listdir(self.igc_dir)):
+            with self.subTest(file_name=file_name):
+                igc_path = os.path.join(self.igc_dir, file_name)
+                parsed_igc_file = read_igc(igc_path)
+                metadata = read_igc_metadata(igc_path)
+
+                self.assertNotIn('fix_records', metadata)
+                for key in ('comment_records', 'fix_record_extensions', 'header'):
+                    self.assertEqual(metadata[key], parsed_igc_file[key])
+
+        igc_path = os.path.join(self.igc_dir, 'race_task_completed.igc')
+        date = datetime.date(2014, 6, 21)
+        self.assertEqual(soaringspot.get_info_from_comment_lines(read_igc_metadata(igc_path), date),
+                         soaringspot.get_info_from_comment_lines(read_igc(igc_path), date))
+
+        igc_path = os.path.join(self.igc_dir, 'aat_strepla.igc')
+        self.assertEqual(strepla.get_info_from_comment_lines(read_igc_metadata(igc_path)),
+                         strepla.get_info_from_comment_lines(read_igc(igc_path)))
+
+    def test_enl(self):
+        lines = self.header + ['B1133265228091N00620412EA0037000470012\n']
+        trace = parse_igc(lines, fallback=False)['fix_records'][1]
+        self.assertEqual(trace[0]['ENL'], 12)
+
+    def test_decode_per_line(self):
+        data = ''.join(self.header).encode('ascii') + \
+            'LCU::HPPLTPILOT:J\u00f6rg\n'.encode('utf-8') + \
+            'LCU::HPGTYGLIDERTYPE:Disc\u00fas\n'.encode('latin1') + \
+            b'B1133265228091N00620412EA0037000470012\r\n'
+
+        parsed_igc_file = parse_igc_bytes(data, fallback=False)
+        comments = [record['comment'] for record in parsed_igc_file['comment_records'][1]]
+        self.assertEqual(comments, [':HPPLTPILOT:J\u00f6rg', ':HPGTYGLIDERTYPE:Disc\u00fas'])
+        self.assertEqual(len(parsed_igc_file['fix_records'][1]), 1)
+
+    def test_skip_duplicates(self):
+        lines = self.header + ['B1133265228091N00620412EA0037000470012\n',
+                               'B1133265228092N00620412EA0037000470012\n',
+                               'B1133275228093N00620412EA0037000470012\n']
+
+        self.assertEqual(len(parse_igc(lines, fallback=False)['fix_records'][1]), 2)
+        self.assertEqual(len(parse_igc(lines, skip_duplicates=False, fallback=False)['fix_records'][1]), 3)
+
+    def test_day_rollover(self):
+        lines = self.header + ['B2359595228091N00620412EA0037000470012\n',
+                               'B0000015228091N00620412EA0037000470012\n']
+        trace = parse_igc(lines, fallback=False)['fix_records'][1]
+
+        self.assertEqual(trace[0]['datetime'], datetime.datetime(2014, 6, 21, 23, 59, 59, tzinfo=datetime.timezone.utc))
+        self.assertEqual(trace[1]['datetime'], datetime.datetime(2014, 6, 22, 0, 0, 1, tzinfo=datetime.timezone.utc))
+
+    def test_malformed_b_record(self):
+        lines = self.header + ['B1133265228091N00620412EA0037000470012\n',
+                               'B11332X5228091N00620412EA0037000470012\n']
+
+        with self.assertRaises(IgcDecodeError):
+            parse_igc(lines, fallback=False)
+
+        # aerofiles reports the malformed record as an error
+        fix_errors, trace = parse_igc(lines)['fix_records']
+        self.assertEqual(len(fix_errors), 1)
+
+    def test_decode_i_record(self):
+        extensions = decode_i_record('I023638FXA3941ENL')
+        self.assertEqual(extensions, [{'bytes': (36, 38), 'extension_type': 'FXA'},
+                                      {'bytes': (39, 41), 'extension_type': 'ENL'}])
+
+        with self.assertRaises(IgcDecodeError):
+            decode_i_record('I023638FXA39')
+
+    def test_decode_h_utc_date(self):
+        self.assertEqual(decode_h_utc_date('HFDTE210614'), datetime.date(2014, 6, 21))
+        self.assertEqual(decode_h_utc_date('HFDTEDATE:210614,01'), datetime.date(2014, 6, 21))
+        self.assertIsNone(decode_h_utc_date('HFDTE000000'))
@@ -49,3 +49,12 @@ class TestAAT(unittest.TestCase):
         # test unequal t_min
         aat2 = AAT(waypoints, datetime.time(1, 0, 0))
         self.assertNotEqual(self.aat, aat2)
+
+    def test_refinement_bounds(self):
+        fixes = [10, 20, 30, 40, 50]
+        self.assertEqual(self.aat._get_refinement_bounds(30, fixes, 1), (4, 1))
+
+        # the fix should be one of the fixes: no window around an insertion point
+        for missing_fix in [25, 60]:
+            with self.assertRaises(ValueError):
+                self.aat._get_refinement_bounds(missing_fix, fixes, 1)
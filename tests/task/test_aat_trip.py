@@ -63,6 +63,13 @@ class TestAATTripOutlandingOutside(unittest.TestCase):
         for opensoar_time, seeyou_time in fix_times:
             self.assertEqual(seeyou_time, opensoar_time)
 
+    def test_fix_indices(self):
+        self.assertIs(self.trace[self.trip.outlanding_fix_index], self.trip.outlanding_fix)
+        for fix_index, fix in zip(self.trip.fix_indices, self.trip.fixes):
+            self.assertIs(self.trace[fix_index], fix)
+        for sector_indices, sector_fixes in zip(self.trip.sector_fix_indices, self.trip.sector_fixes):
+            self.assertListEqual([self.trace[fix_index] for fix_index in sector_indices], sector_fixes)
+
     # todo: fix total distance calculation. why is this different from seeyou?
     # def test_total_distance(self):
     #     total_distance = sum(self.trip.distances)
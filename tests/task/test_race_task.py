@@ -4,9 +4,66 @@ from copy import deepcopy
 
 import datetime
 
+import numpy as np
+
 from opensoar.competition.soaringspot import get_waypoints
 from opensoar.task.race_task import RaceTask
-from tests.task.helper_functions import get_task
+from opensoar.trace.trace import Trace
+from opensoar.utilities.helper_functions import datetime_to_seconds
+from opensoar.utilities.segment_table import get_segment_table
+from tests.task.helper_functions import get_task, get_trace
+
+
+def trip_fix_indices_per_fix(race_task, trace):
+    """Reference: the rules of RaceTask.determine_trip_fix_indices, evaluated on every pair of consecutive fixes"""
+
+    table = race_task.fix_table(trace)
+    times = get_segment_table(trace, race_task.distance_engine).times.tolist()
+    if race_task.start_opening is not None:
+        start_opening = datetime_to_seconds(race_task.start_opening +
+                                            datetime.timedelta(seconds=race_task.start_time_buffer))
+
+    leg = -1
+    enl_first_index = None
+    enl_registered = False
+    fix_indices = list()
+    start_indices = list()
+    for fix_index in range(1, len(trace)):
+        if not enl_registered and race_task.enl_value_exceeded(trace[fix_index]):
+            if enl_first_index is None:
+                enl_first_index = fix_index - 1
+            enl_registered = race_task.enl_time_exceeded(times[fix_index] - times[enl_first_index])
+        elif not enl_registered:
+            enl_first_index = None
+
+        after_start_opening = race_task.start_opening is None or start_opening < times[fix_index]
+        if leg == -1 and after_start_opening:
+            if race_task._started(table, fix_index - 1, fix_index):
+                fix_indices.append(fix_index - 1)
+                start_indices.append(fix_index - 1)
+                leg += 1
+                enl_first_index = None
+                enl_registered = False
+        elif leg == 0:
+            if race_task._started(table, fix_index - 1, fix_index):  # restart
+                fix_indices[0] = fix_index - 1
+                start_indices.append(fix_index - 1)
+                enl_first_index = None
+                enl_registered = False
+            if race_task._finished_leg(table, leg, fix_index - 1, fix_index) and not enl_registered:
+                fix_indices.append(fix_index)
+                leg += 1
+        elif 0 < leg < race_task.no_legs:
+            if race_task._finished_leg(table, leg, fix_index - 1, fix_index) and not enl_registered:
+                fix_indices.append(fix_index)
+                leg += 1
+
+    enl_index = enl_first_index if enl_registered else None
+    outlanding_index = None
+    if len(fix_indices) != len(race_task.waypoints):
+        outlanding_index = race_task.determine_outlanding_index(trace, fix_indices, start_indices, enl_index)
+
+    return fix_indices, outlanding_index
 
 
 class TestRaceTask(unittest.TestCase):
@@ -15,6 +72,66 @@ class TestRaceTask(unittest.TestCase):
     igc_path = os.path.join(cwd, '..', 'igc_files', 'race_task_completed.igc')
     race_task = get_task(igc_path)
 
+    def test_prefilter_statistics(self):
+        race_task = get_task(self.igc_path)
+        race_task.apply_rules(get_trace(self.igc_path))
+        self.assertIsNone(race_task.prefilter_statistics().hit_rate)  # not enabled
+
+        race_task = get_task(self.igc_path)
+        race_task.enable_prefilter_statistics()
+        race_task.apply_rules(get_trace(self.igc_path))
+        statistics = race_task.prefilter_statistics()
+        self.assertGreater(statistics.tests, 0)
+        self.assertGreater(statistics.hit_rate, 0.5)
+
+        race_task.reset_prefilter_statistics()
+        self.assertEqual(race_task.prefilter_statistics().tests, 0)
+
+    def test_trip_fix_indices_equal_per_fix_rules(self):
+        """Same trip as the per-fix rules, with restarts, different start openings and many (short) engine runs"""
+
+        rng = np.random.default_rng(0)
+        for file_name in ['race_task_completed.igc', 'outlanding_race_task.igc', 'outlanding_race_task_enl.igc']:
+            igc_path = os.path.join(self.cwd, '..', 'igc_files', file_name)
+            race_task = get_task(igc_path)
+            fixes = Trace.from_fixes(get_trace(igc_path))
+
+            # opening just before each of the start crossings
+            race_task.start_opening = None
+            start_crossings = race_task._transition_indices(race_task.fix_table(fixes), 0, entering=False)
+            start_openings = [None] + [fixes[index - 2]['datetime'] for index in start_crossings]
+
+            for max_enl in [600, 1000]:
+                # noise on the engine level, giving engine runs of varying length
+                enl = rng.integers(0, max_enl, len(fixes))
+                trace = Trace(fixes.time, fixes.lat, fixes.lon, fixes.gps_alt, fixes.pressure_alt, enl)
+
+                for start_opening in start_openings:
+                    for enl_time_threshold in [2, 4, 30]:
+                        with self.subTest(file_name=file_name, max_enl=max_enl, start_opening=start_opening,
+                                          enl_time_threshold=enl_time_threshold):
+                            race_task.start_opening = start_opening
+                            race_task.ENL_TIME_THRESHOLD = enl_time_threshold
+                            self.assertEqual(race_task.determine_trip_fix_indices(trace),
+                                             trip_fix_indices_per_fix(race_task, trace))
+
+    def test_scalar_enl_time_exceeded(self):
+        """Overrides of enl_time_exceeded only receive single durations"""
+
+        class ScalarRaceTask(RaceTask):
+            def enl_time_exceeded(self, enl_time):
+                if not isinstance(enl_time, (int, float)):
+                    raise TypeError('enl_time should be a number')
+                return enl_time >= self.ENL_TIME_THRESHOLD
+
+        igc_path = os.path.join(self.cwd, '..', 'igc_files', 'outlanding_race_task_enl.igc')
+        race_task = get_task(igc_path)
+        scalar_race_task = ScalarRaceTask(race_task.waypoints, race_task.timezone, race_task.start_opening,
+                                          race_task.start_time_buffer, race_task.multistart)
+        trace = Trace.from_fixes(get_trace(igc_path))
+        self.assertEqual(scalar_race_task.determine_trip_fix_indices(trace),
+                         race_task.determine_trip_fix_indices(trace))
+
     def test_number_of_legs(self):
         self.assertEqual(self.race_task.no_legs, 4)
 
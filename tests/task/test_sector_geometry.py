@@ -0,0 +1,102 @@
+import os
+import unittest
+from math import pi
+
+import numpy as np
+from shapely.geometry import Point, box
+
+from opensoar.task.sector_geometry import SectorGeometry
+from opensoar.task.task import Task
+from opensoar.task.waypoint import Waypoint
+from opensoar.utilities.geojson_serializers import task_to_geojson_features
+from opensoar.utilities.helper_functions import fixes_to_lat_lon
+from tests.task.helper_functions import get_trace, get_task
+
+
+class TestSectorGeometry(unittest.TestCase):
+
+    cwd = os.path.dirname(__file__)
+    igc_path = os.path.join(cwd, '..', 'igc_files', 'aat_completed.igc')
+    aat = get_task(igc_path)
+    trace = get_trace(igc_path)[::5]
+
+    def test_contains_equals_waypoint(self):
+        lats, lons = fixes_to_lat_lon(self.trace)
+        for waypoint, sector_geometry in zip(self.aat.waypoints, self.aat.sector_geometries):
+            with self.subTest(waypoint=waypoint.name):
+                if waypoint.is_line:
+                    self.assertListEqual(np.flatnonzero(sector_geometry.crossed(lats, lons)).tolist(),
+                                         waypoint.crossed_line_indices(self.trace).tolist())
+                else:
+                    self.assertListEqual(sector_geometry.contains(lats, lons).tolist(),
+                                         waypoint.inside_sector_mask(self.trace).tolist())
+
+    def test_candidates(self):
+        lats, lons = fixes_to_lat_lon(self.trace)
+        for waypoint, sector_geometry in zip(self.aat.waypoints, self.aat.sector_geometries):
+            candidates = waypoint.prefilter_mask(lats, lons)
+            with self.subTest(waypoint=waypoint.name):
+                if waypoint.is_line:
+                    self.assertListEqual(sector_geometry.crossed(lats, lons, candidates).tolist(),
+                                         sector_geometry.crossed(lats, lons).tolist())
+                else:
+                    self.assertListEqual(sector_geometry.contains(lats, lons, candidates).tolist(),
+                                         sector_geometry.contains(lats, lons).tolist())
+
+    def test_keyhole(self):
+        waypoint = Waypoint('keyhole', latitude=52, longitude=6, r_min=500, angle_min=180, r_max=10000, angle_max=45,
+                            is_line=False, sector_orientation='fixed', orientation_angle=0)
+        sector_geometry = SectorGeometry(waypoint)
+
+        expected_area = pi * 500 ** 2 * 3 / 4 + pi * 10000 ** 2 / 4
+        self.assertAlmostEqual(sector_geometry.shape.area / expected_area, 1, places=2)
+
+        # the sector points south, away from the orientation
+        self.assertTrue(sector_geometry.shape.contains(Point(0, -5000)))
+        self.assertFalse(sector_geometry.shape.contains(Point(0, 5000)))
+        self.assertTrue(sector_geometry.shape.contains(Point(0, 400)))
+
+    def test_line(self):
+        start = self.aat.sector_geometries[0]
+        self.assertTrue(start.is_line)
+        self.assertAlmostEqual(start.shape.length, 2 * self.aat.start.r_max)
+
+    def test_intersects(self):
+        sector_geometry = self.aat.sector_geometries[1]
+        waypoint = self.aat.waypoints[1]
+
+        airspace = box(waypoint.longitude - 0.01, waypoint.latitude - 0.01,
+                       waypoint.longitude + 0.01, waypoint.latitude + 0.01)
+        far_airspace = box(waypoint.longitude + 5, waypoint.latitude, waypoint.longitude + 6, waypoint.latitude + 1)
+
+        self.assertTrue(sector_geometry.intersects(airspace))
+        self.assertFalse(sector_geometry.intersects(far_airspace))
+        self.assertAlmostEqual(sector_geometry.intersection(airspace).area / airspace.area, 1, places=6)
+        self.assertTrue(sector_geometry.intersection(far_airspace).is_empty)
+
+    def test_compiled_once_per_task(self):
+        self.assertIs(self.aat.sector_geometries, self.aat.sector_geometries)
+        self.assertEqual(len(self.aat.sector_geometries), len(self.aat.waypoints))
+
+    def test_compiled_again_after_waypoint_change(self):
+        aat = get_task(self.igc_path)
+        sector_geometries = aat.sector_geometries
+
+        waypoint = aat.waypoints[1]
+        waypoint.orientation_angle = (waypoint.orientation_angle + 90) % 360
+        self.assertIsNot(aat.sector_geometries, sector_geometries)
+
+        Task.set_orientation_angles(aat.waypoints)
+        self.assertTrue(aat.sector_geometries[1].shape.equals(sector_geometries[1].shape))
+
+    def test_orientation_not_set(self):
+        waypoint = Waypoint('symmetrical', latitude=52, longitude=6, r_min=None, angle_min=None, r_max=500,
+                            angle_max=180, is_line=False, sector_orientation='symmetrical')
+        with self.assertRaises(ValueError):
+            SectorGeometry(waypoint)
+
+    def test_geojson(self):
+        features = task_to_geojson_features(self.aat)
+        self.assertEqual(len(features), len(self.aat.waypoints) + 1)
+        self.assertListEqual([feature['geometry']['type'] for feature in features],
+                             ['LineString', 'Polygon', 'Polygon', 'Polygon', 'Polygon', 'LineString', 'LineString'])
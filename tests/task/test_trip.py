@@ -3,7 +3,9 @@ import unittest
 
 import datetime
 
+from opensoar.task.race_task import RaceTask
 from opensoar.task.trip import Trip
+from opensoar.utilities.helper_functions import double_iterator, interpolate_fixes, interpolate_fix
 from tests.task.helper_functions import get_trace, get_task
 
 
@@ -38,6 +40,76 @@ class TestTrip(unittest.TestCase):
         finish_fix = self.trip.fixes[-1]
         self.assertEqual(finish_fix['datetime'], datetime.datetime(2014, 6, 21, 13, 21, 58, tzinfo=datetime.timezone.utc))
 
+    def test_refined_finish_time(self):
+        refined_finish_time = self.race_task.determine_refined_finish(self.trace, self.trip.fixes)
+        self.assertEqual(refined_finish_time, datetime.datetime(2014, 6, 21, 13, 21, 58, tzinfo=datetime.timezone.utc))
+
+    def test_refined_taskpoint_time(self):
+        refined_time = self.race_task.determine_refined_taskpoint_time(self.trace, self.trip.fixes, 1)
+        self.assertEqual(refined_time, datetime.datetime(2014, 6, 21, 12, 32, 53, tzinfo=datetime.timezone.utc))
+
+    def test_refine_transition_equals_interpolation(self):
+        """Bisection should find the same start as checking all interpolated fixes, also for large fix intervals"""
+        start_i = self.trace.index(self.trip.fixes[0])
+        fix1 = self.trace[start_i - 5]
+        fix2 = self.trace[start_i + 6]
+
+        expected_fixes = [(fix, next_fix) for fix, next_fix in double_iterator(interpolate_fixes(fix1, fix2))
+                          if self.race_task.started(fix, next_fix)]
+
+        fix_before, fix_after = self.race_task.refine_transition(fix1, fix2, self.race_task.started)
+        self.assertEqual(fix_before['datetime'], expected_fixes[0][0]['datetime'])
+        self.assertEqual(fix_after['datetime'], expected_fixes[0][1]['datetime'])
+
+    def test_refine_transition_zero_duration(self):
+        fix1 = dict(datetime=datetime.datetime(2014, 6, 21, 12, 0, 0), lat=52.0, lon=6.0)
+        fix2 = dict(datetime=datetime.datetime(2014, 6, 21, 12, 0, 0), lat=52.1, lon=6.0)
+
+        self.assertIs(interpolate_fix(fix1, fix2, 0), fix1)
+        self.assertEqual(self.race_task.refine_transition(fix1, fix2, lambda fix, next_fix: True), (fix1, fix2))
+        with self.assertRaises(ValueError):
+            self.race_task.refine_transition(fix1, fix2, lambda fix, next_fix: False)
+
+    def test_refine_transition_multiple_transitions(self):
+        """With several transitions between the fixes, one of them is returned"""
+        time1 = datetime.datetime(2014, 6, 21, 12, 0, 0)
+        fix1 = dict(datetime=time1, lat=52.0, lon=6.0)
+        fix2 = dict(datetime=time1 + datetime.timedelta(seconds=20), lat=52.2, lon=6.0)
+
+        def inside(fix):
+            seconds = (fix['datetime'] - time1).total_seconds()
+            return seconds <= 3 or 8 <= seconds <= 12
+
+        def leaving(fix, next_fix):
+            return inside(fix) and not inside(next_fix)
+
+        transitions = [(fix['datetime'], next_fix['datetime'])
+                       for fix, next_fix in double_iterator(interpolate_fixes(fix1, fix2)) if leaving(fix, next_fix)]
+        self.assertEqual(len(transitions), 2)
+
+        fix_before, fix_after = self.race_task.refine_transition(fix1, fix2, leaving)
+        self.assertIn((fix_before['datetime'], fix_after['datetime']), transitions)
+
+    def test_fix_indices(self):
+        self.assertEqual(len(self.trip.fix_indices), len(self.trip.fixes))
+        for fix_index, fix in zip(self.trip.fix_indices, self.trip.fixes):
+            self.assertIs(self.trace[fix_index], fix)
+        self.assertIsNone(self.trip.outlanding_fix_index)
+
+    def test_task_subclass_with_apply_rules_only(self):
+        """Subclasses which implement apply_rules without indices get the indices looked up in the trace"""
+
+        class CustomRaceTask(RaceTask):
+            def apply_rules(self, trace):
+                return tuple(super().apply_rules(trace))
+
+        custom_task = CustomRaceTask(self.race_task.waypoints, self.race_task.timezone, self.race_task.start_opening,
+                                     self.race_task.start_time_buffer, self.race_task.multistart)
+        trip = Trip(custom_task, self.trace)
+        self.assertListEqual(trip.fix_indices, self.trip.fix_indices)
+        self.assertIsNone(trip.outlanding_fix_index)
+
+
 class TestOutlandingTrip(unittest.TestCase):
     """
     This testcase covers an outlanding on a race task. number 7, comp id SU:
@@ -62,6 +134,9 @@ class TestOutlandingTrip(unittest.TestCase):
         fix_after_leg = self.trip.fix_after_leg(fix, leg=2)
         self.assertFalse(fix_after_leg)
 
+    def test_outlanding_fix_index(self):
+        self.assertIs(self.trace[self.trip.outlanding_fix_index], self.trip.outlanding_fix)
+
 
 class TestEnlOutlandingTrip(unittest.TestCase):
     """
@@ -80,3 +155,6 @@ class TestEnlOutlandingTrip(unittest.TestCase):
 
     def test_completed_legs(self):
         self.assertEqual(self.trip.completed_legs(), 4)
+
+    def test_outlanding_fix_index(self):
+        self.assertIs(self.trace[self.trip.outlanding_fix_index], self.trip.outlanding_fix)
@@ -1,8 +1,11 @@
 import unittest
 from copy import deepcopy
 
+import numpy as np
+
 from opensoar.task.waypoint import Waypoint
-from opensoar.utilities.helper_functions import calculate_destination
+from opensoar.utilities.helper_functions import calculate_destination, calculate_destinations
+from opensoar.utilities.distance_engines import PlanarDistanceEngine
 
 
 class TestWaypoint(unittest.TestCase):
@@ -38,6 +41,38 @@ class TestWaypoint(unittest.TestCase):
         self.assertFalse(wp.inside_sector(point_outside_outer_sector))
         self.assertFalse(wp.inside_sector(point_outside_too_far))
 
+    def test_inside_sector_mask(self):
+        """Mask equals the scalar test for plain sectors and keyholes in all orientations, also at the sector edges"""
+
+        distances, bearings = np.meshgrid(np.arange(0, 13000, 250.0), np.arange(0, 360, 2.5))
+        lats, lons = calculate_destinations(52, 1, distances.ravel(), bearings.ravel())
+        fixes = [dict(lat=lat, lon=lon) for lat, lon in zip(lats, lons)]
+
+        sectors = [dict(r_min=None, angle_min=180, r_max=10000, angle_max=45),
+                   dict(r_min=5000, angle_min=90, r_max=10000, angle_max=45),
+                   dict(r_min=500, angle_min=180, r_max=10000, angle_max=180)]
+        orientations = [('fixed', 180), ('symmetrical', None), ('next', None), ('previous', None), ('start', None)]
+
+        for sector in sectors:
+            for sector_orientation, orientation_angle in orientations:
+                waypoint = Waypoint('testwaypoint', latitude=52, longitude=1, is_line=False,
+                                    sector_orientation=sector_orientation, orientation_angle=orientation_angle,
+                                    **sector)
+                waypoint.set_orientation_angle(angle_start=10, angle_previous=350, angle_next=95)
+
+                for distance_engine in [None, PlanarDistanceEngine(52, 1, 20000)]:
+                    with self.subTest(sector=sector, orientation=sector_orientation, engine=distance_engine):
+                        waypoint.distance_engine = distance_engine
+                        mask = waypoint.inside_sector_mask(fixes)
+                        self.assertListEqual(mask.tolist(), [waypoint.inside_sector(fix) for fix in fixes])
+                        self.assertTrue(mask.any() and not mask.all())
+
+    def test_inside_sector_mask_on_line(self):
+        start_line = Waypoint('testwaypoint', latitude=52, longitude=1, r_min=None, angle_min=None, r_max=1000,
+                              angle_max=90, is_line=True, sector_orientation='next', orientation_angle=180)
+        with self.assertRaises(ValueError):
+            start_line.inside_sector_mask([start_line.fix])
+
     def test_equal_waypoints(self):
         waypoint1 = Waypoint('test_waypoint', latitude=51.7509, longitude=-0.981, r_min=None, angle_min=180,
                              r_max=50000, angle_max=20, is_line=False, sector_orientation='fixed',
@@ -132,3 +167,68 @@ class TestWaypoint(unittest.TestCase):
         point_north_far = calculate_destination(finish_line.fix, 2000, 45)
         point_south_far = calculate_destination(finish_line.fix, 2000, 135)
         self.assertFalse(finish_line.crossed_line(point_north_far, point_south_far))
+
+    def test_crossed_line_indices(self):
+        """Indices equal the scalar test for start and finish lines, on a path crossing the line back and forth"""
+
+        rng = np.random.default_rng(0)
+        distances = rng.uniform(0, 3000, 2000)
+        bearings = rng.uniform(0, 360, 2000)
+        lats, lons = calculate_destinations(52, 1, distances, bearings)
+        fixes = [dict(lat=lat, lon=lon) for lat, lon in zip(lats, lons)]
+
+        for sector_orientation, orientation_angle in [('next', 180), ('previous', 0), ('next', 355)]:
+            line = Waypoint('testwaypoint', latitude=52, longitude=1, r_min=None, angle_min=None, r_max=1000,
+                            angle_max=90, is_line=True, sector_orientation=sector_orientation,
+                            orientation_angle=orientation_angle)
+            for distance_engine in [None, PlanarDistanceEngine(52, 1, 20000)]:
+                with self.subTest(orientation=sector_orientation, angle=orientation_angle, engine=distance_engine):
+                    line.distance_engine = distance_engine
+                    expected = [i for i in range(len(fixes) - 1) if line.crossed_line(fixes[i], fixes[i + 1])]
+                    self.assertListEqual(line.crossed_line_indices(fixes).tolist(), expected)
+                    self.assertNotEqual(len(expected), 0)
+
+    def test_crossed_line_indices_on_sector(self):
+        waypoint = Waypoint('testwaypoint', latitude=52, longitude=1, r_min=None, angle_min=180, r_max=1000,
+                            angle_max=180, is_line=False, sector_orientation='fixed', orientation_angle=180)
+        with self.assertRaises(ValueError):
+            waypoint.crossed_line_indices([waypoint.fix, waypoint.fix])
+
+    def test_prefilter_is_conservative(self):
+        """No fix within the radius is rejected, also at high latitudes and across the date line"""
+
+        rng = np.random.default_rng(0)
+        radius = 20000
+        distances = rng.uniform(0, 1.5 * radius, 5000)
+        bearings = rng.uniform(0, 360, 5000)
+
+        for latitude, longitude in [(0, 5), (-45, 170), (70, 179.9), (88.5, 0)]:
+            with self.subTest(latitude=latitude, longitude=longitude):
+                waypoint = Waypoint('testwaypoint', latitude=latitude, longitude=longitude, r_min=None,
+                                    angle_min=180, r_max=radius, angle_max=180, is_line=False,
+                                    sector_orientation='fixed', orientation_angle=180)
+                waypoint.prefilter_statistics_enabled = True
+                lats, lons = calculate_destinations(latitude, longitude, distances, bearings)
+                candidates = waypoint.prefilter_mask(lats, lons, radius)
+
+                self.assertTrue(candidates[distances <= radius].all())
+                if abs(latitude) < 80:  # close to the pole, the longitude bound is loose
+                    self.assertFalse(candidates[distances > 1.1 * radius].any())
+                self.assertEqual(waypoint.prefilter_tests, len(distances))
+                self.assertEqual(waypoint.prefilter_rejections, np.count_nonzero(~candidates))
+
+    def test_prefilter_in_scalar_tests(self):
+        waypoint = Waypoint('testwaypoint', latitude=52, longitude=1, r_min=None, angle_min=180, r_max=1000,
+                            angle_max=180, is_line=False, sector_orientation='fixed', orientation_angle=180)
+        waypoint.prefilter_statistics_enabled = True
+        self.assertTrue(waypoint.inside_sector(calculate_destination(waypoint.fix, 1005, 30)))
+        self.assertFalse(waypoint.inside_sector(calculate_destination(waypoint.fix, 5000, 30)))
+        self.assertEqual((waypoint.prefilter_tests, waypoint.prefilter_rejections), (2, 1))
+
+        waypoint.reset_prefilter_statistics()
+        self.assertEqual((waypoint.prefilter_tests, waypoint.prefilter_rejections), (0, 0))
+
+        # the bounds follow a moved waypoint
+        waypoint.latitude = 60
+        self.assertFalse(waypoint.inside_sector(calculate_destination(dict(lat=52, lon=1), 500, 30)))
+        self.assertTrue(waypoint.inside_sector(calculate_destination(waypoint.fix, 500, 30)))
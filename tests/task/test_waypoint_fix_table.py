@@ -0,0 +1,54 @@
+import os
+import unittest
+
+from opensoar.task.waypoint_fix_table import WaypointFixTable
+from tests.task.helper_functions import get_trace, get_task
+
+
+class TestWaypointFixTable(unittest.TestCase):
+
+    cwd = os.path.dirname(__file__)
+    igc_path = os.path.join(cwd, '..', 'igc_files', 'aat_completed.igc')
+    aat = get_task(igc_path)
+    trace = get_trace(igc_path)[::10]
+
+    def test_inside_sector_equals_waypoint(self):
+        table = WaypointFixTable(self.aat.waypoints, self.trace, self.aat.distance_engine)
+
+        for waypoint_index, waypoint in enumerate(self.aat.waypoints):
+            if waypoint.is_line:
+                continue
+
+            for fix_index, fix in enumerate(self.trace):
+                self.assertEqual(table.inside_sector(waypoint_index, fix_index), waypoint.inside_sector(fix))
+
+    def test_crossed_line_equals_waypoint(self):
+        table = WaypointFixTable(self.aat.waypoints, self.trace, self.aat.distance_engine)
+
+        start = self.aat.start
+        self.assertTrue(start.is_line)
+        for fix_index in range(1, len(self.trace)):
+            fix_minus1 = self.trace[fix_index - 1]
+            fix = self.trace[fix_index]
+            self.assertEqual(table.crossed_line(0, fix_index - 1, fix_index), start.crossed_line(fix_minus1, fix))
+
+    def test_sector_geometries_equal_engine(self):
+        table = WaypointFixTable(self.aat.waypoints, self.trace, self.aat.distance_engine)
+        geometry_table = WaypointFixTable(self.aat.waypoints, self.trace, self.aat.distance_engine,
+                                          self.aat.sector_geometries)
+
+        for waypoint_index, waypoint in enumerate(self.aat.waypoints):
+            with self.subTest(waypoint=waypoint.name):
+                if waypoint.is_line:
+                    self.assertListEqual(geometry_table.crossed_line_mask(waypoint_index).tolist(),
+                                         table.crossed_line_mask(waypoint_index).tolist())
+                else:
+                    self.assertListEqual(geometry_table.inside_sector_mask(waypoint_index).tolist(),
+                                         table.inside_sector_mask(waypoint_index).tolist())
+
+    def test_table_cached_per_trace(self):
+        table = self.aat.fix_table(self.trace)
+        self.assertIs(self.aat.fix_table(self.trace), table)
+
+        other_trace = list(self.trace)
+        self.assertIsNot(self.aat.fix_table(other_trace), table)
@@ -50,6 +50,10 @@ class TestFlightPhases(unittest.TestCase):
             time_diff = (pysoar_phase_start_time - phase.fixes[0]['datetime']).total_seconds()
             self.assertLessEqual(abs(time_diff), 2)
 
+    def test_phase_start_indices(self):
+        for phase in self.phases.all_phases(leg='all') + self.phases.all_phases(leg=1):
+            self.assertIs(self.trace[phase.start_index], phase.fixes[0])
+
     def test_thermals(self):
 
         thermals = self.phases.thermals(leg='all')
@@ -0,0 +1,84 @@
+import datetime
+import os
+import unittest
+
+import numpy as np
+
+from opensoar.competition.competition_day import CompetitionDay
+from opensoar.competition.competitor import Competitor
+from opensoar.trace.altitude import gain_and_loss, turning_altitudes, altitude_statistics, \
+    competition_day_altitude_statistics
+from opensoar.trace.trace import Trace
+from opensoar.utilities.helper_functions import altitude_gain_and_loss
+from tests.task.helper_functions import get_trace, get_task
+
+
+def hysteresis_reference(altitudes, threshold):
+    """Turning points with a loop over all altitudes: a reversal counts once it exceeds the threshold"""
+    turning_points = [altitudes[0]]
+    extreme, direction = altitudes[0], 0
+    for altitude in altitudes[1:]:
+        if direction >= 0 and altitude > extreme or direction <= 0 and altitude < extreme:
+            if direction == 0 and abs(altitude - extreme) <= threshold / 2:
+                continue
+            direction = 1 if altitude > extreme else -1
+            extreme = altitude
+        elif abs(altitude - extreme) > threshold:
+            turning_points.append(extreme)
+            direction, extreme = -direction, altitude
+    if direction != 0:
+        turning_points.append(extreme)
+    return turning_points
+
+
+class TestAltitude(unittest.TestCase):
+
+    cwd = os.path.dirname(__file__)
+    igc_path = os.path.join(cwd, '..', 'igc_files', 'race_task_completed.igc')
+    trace = Trace.from_fixes(get_trace(igc_path))
+
+    def test_jitter_is_ignored(self):
+        altitudes = [0, 1, 0, 1, 0, 50, 49, 50, 51, 0, 2, 0]
+        self.assertEqual(gain_and_loss(altitudes, 10), (51, 51))
+        self.assertEqual(gain_and_loss(altitudes, 0), (56, 56))
+
+    def test_turning_altitudes(self):
+        rng = np.random.default_rng(0)
+        altitudes = np.cumsum(rng.integers(-5, 6, 2000))
+        for threshold in [0, 4, 20]:
+            with self.subTest(threshold=threshold):
+                self.assertListEqual(turning_altitudes(altitudes, threshold).tolist(),
+                                     hysteresis_reference(altitudes.tolist(), threshold))
+
+    def test_zero_threshold_equals_all_differences(self):
+        fixes = list(self.trace)
+        self.assertEqual(gain_and_loss(self.trace.gps_alt, 0), altitude_gain_and_loss(fixes))
+        self.assertEqual(gain_and_loss(self.trace.pressure_alt, 0), altitude_gain_and_loss(fixes, False))
+
+        gain, loss = altitude_gain_and_loss(fixes, threshold=10)
+        self.assertLess(gain, altitude_gain_and_loss(fixes)[0])
+        # the net gain ends at the last extreme, which is within the threshold of the last fix
+        self.assertLessEqual(abs(gain - loss - (self.trace.gps_alt[-1] - self.trace.gps_alt[0])), 10)
+
+    def test_altitude_statistics(self):
+        statistics = altitude_statistics(self.trace, 100, 199)
+        self.assertEqual(statistics.max_altitude, self.trace.gps_alt[100:200].max())
+        self.assertEqual(statistics.min_altitude, self.trace.gps_alt[100:200].min())
+        self.assertEqual(statistics.gps_pressure_offset,
+                         np.median(self.trace.gps_alt[100:200] - self.trace.pressure_alt[100:200]))
+        self.assertIsNone(altitude_statistics(self.trace, len(self.trace)))
+
+    def test_competition_day(self):
+        task = get_task(self.igc_path)
+        competition_day = CompetitionDay('test', datetime.date(2014, 6, 21), 'club',
+                                         [Competitor(self.trace, 'PR')], task)
+        competition_day.analyse_flights('pysoar')
+
+        statistics = competition_day_altitude_statistics(competition_day)['PR']
+        competitor = competition_day.competitors[0]
+        self.assertEqual(len(statistics['legs']), competitor.trip.completed_legs())
+        self.assertEqual(len(statistics['phases']), len(competitor.phases.all_phases(leg='all')))
+
+        legs_max_altitude = max(leg.max_altitude for leg in statistics['legs'])
+        start, finish = competitor.trip.fix_indices[0], competitor.trip.fix_indices[-1]
+        self.assertEqual(legs_max_altitude, self.trace.gps_alt[start:finish + 1].max())
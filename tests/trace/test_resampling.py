@@ -0,0 +1,91 @@
+import os
+import unittest
+
+import numpy as np
+from pyproj import Transformer
+from shapely.geometry import LineString, Point
+
+from opensoar.trace.resampling import decimate, resample, resample_uniform, align_traces, simplify_indices, \
+    simplify, uniform_times
+from opensoar.trace.trace import Trace
+from opensoar.utilities.geojson_serializers import trace_to_geojson_features
+from tests.task.helper_functions import get_trace
+
+
+class TestResampling(unittest.TestCase):
+
+    cwd = os.path.dirname(__file__)
+    igc_path = os.path.join(cwd, '..', 'igc_files', 'outlanding_race_task_enl.igc')
+    trace = Trace.from_fixes(get_trace(igc_path))
+
+    def test_decimate(self):
+        indices = list(range(1000))
+        self.assertEqual(decimate(indices, 300), indices[0::4])
+        self.assertEqual(decimate(indices, 2000), indices)
+
+        decimated_trace = decimate(self.trace, 300)
+        self.assertIsInstance(decimated_trace, Trace)
+        self.assertLessEqual(len(decimated_trace), 300)
+        self.assertEqual(decimated_trace[1]['datetime'], self.trace[len(self.trace) // 300 + 1]['datetime'])
+
+    def test_uniform_times(self):
+        np.testing.assert_array_equal(uniform_times(101, 125, 10), [110, 120])
+        np.testing.assert_array_equal(uniform_times(100, 120, 10), [100, 110, 120])
+
+    def test_resample(self):
+        trace = Trace([0, 10], [50.0, 51.0], [5.0, 6.0], [100, 200], [90, 190], [10, 900])
+        resampled = resample(trace, [0, 5, 9, 10])
+
+        np.testing.assert_array_almost_equal(resampled.lat, [50.0, 50.5, 50.9, 51.0])
+        np.testing.assert_array_equal(resampled.gps_alt, [100, 150, 190, 200])
+        np.testing.assert_array_equal(resampled.enl, [10, 10, 10, 900])
+
+        with self.assertRaises(ValueError):
+            resample(trace, [-1, 5])
+
+    def test_resample_uniform(self):
+        resampled = resample_uniform(self.trace, 60)
+        self.assertTrue(np.all(resampled.time % 60 == 0))
+        self.assertTrue(np.all(np.diff(resampled.time) == 60))
+        self.assertGreaterEqual(resampled.time[0], self.trace.time[0])
+        self.assertLessEqual(resampled.time[-1], self.trace.time[-1])
+        self.assertIsNotNone(resampled.enl)
+
+    def test_align_traces(self):
+        first = self.trace.subtrace(0, 500)
+        second = self.trace.subtrace(200, 1000)
+
+        grid, (aligned_first, aligned_second) = align_traces([first, second], 10)
+        self.assertEqual(grid[0], -(-first.time[0] // 10) * 10)
+        self.assertLessEqual(grid[-1], second.time[-1])
+
+        # common moments can be compared by index
+        offset = np.searchsorted(grid, aligned_second.time[0])
+        overlap = np.searchsorted(grid, aligned_first.time[-1], side='right') - offset
+        self.assertGreater(overlap, 0)
+        np.testing.assert_array_equal(aligned_first.lat[offset:offset + overlap], aligned_second.lat[:overlap])
+
+    def test_simplify(self):
+        tolerance = 50
+        indices = simplify_indices(self.trace, tolerance)
+
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], len(self.trace) - 1)
+        self.assertLess(len(indices), len(self.trace) / 3)
+
+        # every fix is within the tolerance of the simplified path (checked in an azimuthal equidistant projection)
+        projection = Transformer.from_proj('+proj=longlat +datum=WGS84 +no_defs',
+                                           '+proj=aeqd +lat_0={} +lon_0={} +units=m'.format(self.trace.lat[0],
+                                                                                           self.trace.lon[0]),
+                                           always_xy=True)
+        x, y = projection.transform(self.trace.lon, self.trace.lat)
+        simplified_path = LineString(list(zip(x[indices], y[indices])))
+        distances = [simplified_path.distance(Point(x[index], y[index])) for index in range(0, len(self.trace), 5)]
+        self.assertLess(max(distances), tolerance * 1.01)
+        self.assertGreater(max(distances), tolerance / 2)
+
+        self.assertEqual(len(simplify(self.trace, 0)), len(simplify_indices(self.trace, 0)))
+
+    def test_simplified_geojson(self):
+        features = trace_to_geojson_features(self.trace, tolerance=20)
+        self.assertEqual(len(features[0]['geometry']['coordinates']), len(simplify_indices(self.trace, 20)))
@@ -0,0 +1,88 @@
+import datetime
+import os
+import unittest
+
+import numpy as np
+
+from opensoar.competition.competition_day import CompetitionDay
+from opensoar.competition.competitor import Competitor
+from opensoar.igc.reader import read_igc
+from opensoar.trace.sanitising import sanitise, number_of_removed_fixes
+from opensoar.trace.trace import Trace
+from tests.task.helper_functions import get_trace, get_task
+
+
+class TestSanitising(unittest.TestCase):
+
+    cwd = os.path.dirname(__file__)
+    igc_path = os.path.join(cwd, '..', 'igc_files', 'race_task_completed.igc')
+    trace = Trace.from_fixes(get_trace(igc_path))
+
+    def corrupted_trace(self):
+        """Trace with a duplicate time at 100, a time reversal at 200, a time glitch at 300 and a spike at 400"""
+        time, lat = self.trace.time.copy(), self.trace.lat.copy()
+        time[100] = time[99]
+        time[200] = time[198]
+        time[300] = time[300] + 86400
+        lat[400] = lat[400] + 0.5
+        return Trace(time, lat, self.trace.lon, self.trace.gps_alt, self.trace.pressure_alt)
+
+    def test_valid_trace(self):
+        for file_name in os.listdir(os.path.join(self.cwd, '..', 'igc_files')):
+            with self.subTest(file_name=file_name):
+                trace = read_igc(os.path.join(self.cwd, '..', 'igc_files', file_name))['fix_records'][1]
+                sanitised_trace, report = sanitise(trace, remove_zero_movement=False)
+                self.assertIs(sanitised_trace, trace)
+                self.assertEqual(number_of_removed_fixes(report), 0)
+
+                # only fixes without movement (e.g. on the ground) are removed
+                sanitised_trace, report = sanitise(trace)
+                self.assertEqual(number_of_removed_fixes(report), len(report.zero_movements))
+                self.assertEqual(len(sanitised_trace), len(trace) - len(report.zero_movements))
+
+    def test_corrupted_trace(self):
+        trace = self.corrupted_trace()
+        sanitised_trace, report = sanitise(trace)
+
+        self.assertListEqual(report.duplicate_times.tolist(), [100])
+        self.assertListEqual(report.time_reversals.tolist(), [200, 300])
+        self.assertListEqual(report.speed_glitches.tolist(), [400])
+        self.assertEqual(len(sanitised_trace), len(trace) - number_of_removed_fixes(report))
+        self.assertTrue(np.all(np.diff(sanitised_trace.time) > 0))
+
+    def test_zero_movement(self):
+        time = np.arange(6) * 4
+        lat = np.array([52.0, 52.0, 52.0, 52.001, 52.0, 52.0])
+        lon = np.full(6, 6.0)
+        gps_alt = np.array([10, 10, 10, 10, 10, 12])
+        trace = Trace(time, lat, lon, gps_alt, gps_alt)
+
+        sanitised_trace, report = sanitise(trace)
+        self.assertListEqual(report.zero_movements.tolist(), [1, 2])
+        self.assertListEqual(sanitised_trace.time.tolist(), [0, 12, 16, 20])
+
+        # a changed ENL value is information
+        enl_trace = Trace(time, lat, lon, gps_alt, gps_alt, enl=[0, 500, 500, 0, 0, 0])
+        _, report = sanitise(enl_trace)
+        self.assertListEqual(report.zero_movements.tolist(), [2])
+
+    def test_consecutive_spikes(self):
+        lat = self.trace.lat.copy()
+        lat[500:503] += 1
+        trace = Trace(self.trace.time, lat, self.trace.lon)
+
+        _, report = sanitise(trace)
+        self.assertListEqual(report.speed_glitches.tolist(), [500, 501, 502])
+
+    def test_analyse_sanitised_flights(self):
+        task = get_task(self.igc_path)
+        competitors = [Competitor(self.trace, 'clean'), Competitor(self.corrupted_trace(), 'corrupted')]
+        competition_day = CompetitionDay('test', datetime.date(2014, 6, 21), 'club', competitors, task)
+
+        competition_day.analyse_flights('pysoar', sanitise=True)
+
+        clean, corrupted = competitors
+        report = corrupted.sanitising_report
+        self.assertEqual(number_of_removed_fixes(report) - len(report.zero_movements), 4)
+        self.assertEqual(clean.trip.refined_start_time, corrupted.trip.refined_start_time)
+        self.assertEqual(clean.trip.finish_time, corrupted.trip.finish_time)
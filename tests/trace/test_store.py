@@ -0,0 +1,119 @@
+import datetime
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from opensoar.competition.competition_day import CompetitionDay
+from opensoar.competition.competitor import Competitor
+from opensoar.igc.reader import read_igc
+from opensoar.trace import store as store_module
+from opensoar.trace.store import TraceStore, TraceReference
+from opensoar.trace.trace import Trace
+
+
+class TestTraceStore(unittest.TestCase):
+
+    cwd = os.path.dirname(__file__)
+    igc_dir = os.path.join(cwd, '..', 'igc_files')
+    trace = read_igc(os.path.join(igc_dir, 'race_task_completed.igc'))['fix_records'][1]
+    enl_trace = read_igc(os.path.join(igc_dir, 'outlanding_race_task_enl.igc'))['fix_records'][1]
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store_dir = os.path.join(self.temp_dir, 'season')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def assert_equal_traces(self, trace, expected):
+        for column in ('time', 'lat', 'lon', 'gps_alt', 'pressure_alt', 'enl'):
+            np.testing.assert_array_equal(getattr(trace, column), getattr(expected, column))
+
+    def test_round_trip(self):
+        with TraceStore(self.store_dir) as store:
+            store.add('a', self.trace)
+            store.add('b', self.enl_trace)
+            store.add('c', self.trace.subtrace(0, 3))  # odd number of fixes: next column is padded
+
+        store = TraceStore(self.store_dir)
+        self.assertEqual(sorted(store), ['a', 'b', 'c'])
+        self.assert_equal_traces(store['a'], self.trace)
+        self.assert_equal_traces(store['b'], self.enl_trace)
+        self.assert_equal_traces(store['c'], self.trace.subtrace(0, 3))
+
+        self.assertIsInstance(store['a'].time, np.ndarray)
+        self.assertFalse(store['a'].time.flags.writeable)
+
+    def test_append_to_existing_store(self):
+        with TraceStore(self.store_dir) as store:
+            store.add('a', self.trace)
+
+        with TraceStore(self.store_dir) as store:
+            first = store['a']
+            store.add('b', self.enl_trace)
+            self.assert_equal_traces(store['b'], self.enl_trace)
+            self.assert_equal_traces(first, self.trace)
+
+        self.assertEqual(len(TraceStore(self.store_dir)), 2)
+
+    def test_competition_day_and_lazy_competitor(self):
+        date = datetime.date(2014, 6, 21)
+        competitors = [Competitor(self.trace, 'HS'), Competitor(self.enl_trace, 'SU')]
+        competition_day = CompetitionDay('sallandse', date, 'club', competitors, None)
+
+        keys = TraceStore(self.store_dir).add_competition_day(competition_day)
+        self.assertEqual(keys, ['sallandse/club/2014-06-21/HS', 'sallandse/club/2014-06-21/SU'])
+
+        reference = TraceStore(self.store_dir).reference(TraceStore.key('sallandse', 'club', date, 'SU'))
+        reference = pickle.loads(pickle.dumps(reference))
+        self.assertIsInstance(reference, TraceReference)
+
+        competitor = Competitor(reference, 'SU')
+        self.assertIsInstance(competitor.trace, Trace)
+        self.assertIs(competitor.trace, competitor.trace)
+        self.assert_equal_traces(competitor.trace, self.enl_trace)
+
+        with self.assertRaises(KeyError):
+            TraceStore(self.store_dir).reference('unknown')
+
+    def test_competition_day_without_date_or_competition_id(self):
+        date = datetime.date(2014, 6, 21)
+        for competition_date, competition_id, missing_field in [(None, 'HS', 'date'), (date, None, 'competition_id')]:
+            with self.subTest(missing_field=missing_field):
+                competitors = [Competitor(self.enl_trace, 'SU'), Competitor(self.trace, competition_id)]
+                competition_day = CompetitionDay('sallandse', competition_date, 'club', competitors, None)
+
+                store = TraceStore(self.store_dir)
+                with self.assertRaisesRegex(ValueError, missing_field):
+                    store.add_competition_day(competition_day)
+                self.assertEqual(len(store), 0)
+                self.assertFalse(os.path.exists(os.path.join(self.store_dir, 'traces.bin')))
+
+    def test_reference_after_store_changed(self):
+        with TraceStore(self.store_dir) as store:
+            store.add('a', self.trace)
+        self.assert_equal_traces(TraceReference(self.store_dir, 'a').load(), self.trace)
+
+        # added and replaced by another writer after the store was opened for the first reference
+        with TraceStore(self.store_dir) as store:
+            store.add('a', self.enl_trace)
+            store.add('b', self.trace)
+        self.assert_equal_traces(TraceReference(self.store_dir, 'a').load(), self.enl_trace)
+        self.assert_equal_traces(TraceReference(self.store_dir, 'b').load(), self.trace)
+
+        with self.assertRaises(KeyError):
+            TraceReference(self.store_dir, 'unknown').load()
+
+    def test_open_stores_bounded(self):
+        for i in range(store_module.MAX_OPEN_STORES + 2):
+            store_dir = os.path.join(self.temp_dir, str(i))
+            with TraceStore(store_dir) as store:
+                store.add('a', self.trace)
+            TraceReference(store_dir, 'a').load()
+
+        self.assertEqual(len(store_module._open_stores), store_module.MAX_OPEN_STORES)
+        self.assertIn(os.path.abspath(store_dir), store_module._open_stores)
@@ -0,0 +1,93 @@
+import os
+import unittest
+from copy import deepcopy
+
+import datetime
+
+import numpy as np
+
+from opensoar.task.trip import Trip
+from opensoar.thermals.flight_phases import FlightPhases
+from opensoar.trace.trace import Trace, FixView
+from opensoar.utilities.geojson_serializers import trace_to_geojson_features
+from opensoar.utilities.helper_functions import total_distance_travelled
+from tests.task.helper_functions import get_trace, get_task
+
+
+class TestTrace(unittest.TestCase):
+
+    cwd = os.path.dirname(__file__)
+    igc_path = os.path.join(cwd, '..', 'igc_files', 'race_task_completed.igc')
+    fixes = get_trace(igc_path)
+    trace = Trace.from_fixes(fixes)
+
+    def test_columns(self):
+        self.assertEqual(len(self.trace), len(self.fixes))
+        self.assertEqual(self.trace.time.dtype, np.int64)
+        self.assertEqual(self.trace.lat.dtype, np.float64)
+        self.assertIsNone(self.trace.enl)
+
+    def test_fix_view(self):
+        for index in (0, 100, -1):
+            fix = self.trace[index]
+            self.assertIsInstance(fix, FixView)
+            self.assertEqual(fix['datetime'], self.fixes[index]['datetime'])
+            self.assertEqual(fix['lat'], self.fixes[index]['lat'])
+            self.assertEqual(fix['lon'], self.fixes[index]['lon'])
+            self.assertEqual(fix['gps_alt'], self.fixes[index]['gps_alt'])
+            self.assertEqual(fix['pressure_alt'], self.fixes[index]['pressure_alt'])
+            self.assertNotIn('ENL', fix)
+
+    def test_fix_view_equality(self):
+        self.assertEqual(self.trace[10], self.trace[10])
+        self.assertNotEqual(self.trace[10], self.trace[11])
+        fix = self.trace[10]
+        self.assertIs(deepcopy(fix), fix)
+
+    def test_index(self):
+        self.assertEqual(self.trace.index(self.trace[-1]), len(self.trace) - 1)
+        self.assertEqual(self.trace.index(self.trace.to_fixes()[20]), 20)
+
+    def test_slice(self):
+        fixes = self.trace[10:20:2]
+        self.assertEqual([fix.index for fix in fixes], [10, 12, 14, 16, 18])
+
+    def test_out_of_range(self):
+        with self.assertRaises(IndexError):
+            self.trace[len(self.trace)]
+
+    def test_from_trace(self):
+        self.assertIs(Trace.from_fixes(self.trace), self.trace)
+
+    def test_enl(self):
+        fixes = get_trace(os.path.join(self.cwd, '..', 'igc_files', 'outlanding_race_task_enl.igc'))
+        trace = Trace.from_fixes(fixes)
+        self.assertIsNotNone(trace.enl)
+        self.assertEqual(trace[-1]['ENL'], fixes[-1]['ENL'])
+
+    def test_distance_travelled(self):
+        self.assertAlmostEqual(total_distance_travelled(self.trace), total_distance_travelled(self.fixes), places=6)
+
+    def test_geojson(self):
+        self.assertEqual(trace_to_geojson_features(self.trace), trace_to_geojson_features(self.fixes))
+
+    def test_trip(self):
+        task = get_task(self.igc_path)
+        trip = Trip(task, self.trace)
+        expected_trip = Trip(task, self.fixes)
+
+        self.assertListEqual([dict(fix) for fix in trip.fixes],
+                             [{key: fix[key] for key in self.trace.keys} for fix in expected_trip.fixes])
+        self.assertListEqual(trip.distances, expected_trip.distances)
+        self.assertEqual(trip.refined_start_time, expected_trip.refined_start_time)
+        self.assertEqual(trip.refined_start_time.tzinfo, datetime.timezone.utc)
+
+    def test_flight_phases(self):
+        phases = FlightPhases('pysoar', self.trace)
+        expected_phases = FlightPhases('pysoar', self.fixes)
+
+        self.assertEqual(len(phases.all_phases()), len(expected_phases.all_phases()))
+        for phase, expected_phase in zip(phases.all_phases(), expected_phases.all_phases()):
+            self.assertEqual(phase.is_cruise, expected_phase.is_cruise)
+            self.assertEqual(phase.fixes[0]['datetime'], expected_phase.fixes[0]['datetime'])
+            self.assertEqual(phase.fixes[-1]['datetime'], expected_phase.fixes[-1]['datetime'])
@@ -0,0 +1,103 @@
+import os
+import unittest
+
+import numpy as np
+
+from opensoar.task.race_task import RaceTask
+from opensoar.task.trip import Trip
+from opensoar.utilities.distance_engines import EllipsoidDistanceEngine, PlanarDistanceEngine, \
+    get_default_distance_engine, set_default_distance_engine
+from opensoar.utilities.helper_functions import calculate_distance_bearing, calculate_destination, \
+    calculate_bearing_difference
+from tests.task.helper_functions import get_trace, get_task
+
+
+class TestPlanarDistanceEngine(unittest.TestCase):
+
+    engine = PlanarDistanceEngine(latitude=52, longitude=6, extent=100000)
+
+    def test_max_error_grows_with_extent(self):
+        small_engine = PlanarDistanceEngine(latitude=52, longitude=6, extent=20000)
+        self.assertLess(small_engine.max_error, 1)
+        self.assertLess(small_engine.max_error, self.engine.max_error)
+
+    def test_distance_bearing_within_max_error(self):
+        fix1 = dict(lat=52.3, lon=5.6)
+        for fix2 in [dict(lat=51.8, lon=6.7), dict(lat=52.3, lon=5.61), dict(lat=52.9, lon=5.6)]:
+            for final_bearing in [False, True]:
+                distance, bearing = self.engine.distance_bearing(fix1, fix2, final_bearing)
+                expected_distance, expected_bearing = calculate_distance_bearing(fix1, fix2, final_bearing)
+
+                self.assertLessEqual(abs(distance - expected_distance), self.engine.max_error)
+                self.assertAlmostEqual(calculate_bearing_difference(bearing, expected_bearing), 0, places=1)
+
+    def test_batched_equals_scalar(self):
+        lats = np.array([51.8, 52.3, 52.9])
+        lons = np.array([6.7, 5.61, 5.6])
+        distances, bearings, final_bearings = self.engine.distances_bearings(52.3, 5.6, lats, lons)
+
+        for lat, lon, distance, bearing, final_bearing in zip(lats, lons, distances, bearings, final_bearings):
+            fix2 = dict(lat=lat, lon=lon)
+            self.assertAlmostEqual(distance, self.engine.distance_bearing(dict(lat=52.3, lon=5.6), fix2)[0])
+            self.assertAlmostEqual(bearing, self.engine.distance_bearing(dict(lat=52.3, lon=5.6), fix2)[1])
+            self.assertAlmostEqual(final_bearing, self.engine.distance_bearing(dict(lat=52.3, lon=5.6), fix2, True)[1])
+
+    def test_destination(self):
+        start = dict(lat=52.3, lon=5.6)
+        destination = self.engine.destination(start, 50000, 130)
+        expected_destination = calculate_destination(start, 50000, 130)
+
+        distance, _ = calculate_distance_bearing(destination, expected_destination)
+        self.assertLessEqual(distance, self.engine.max_error)
+
+        lats, lons = self.engine.destinations(start['lat'], start['lon'], [50000], [130])
+        self.assertAlmostEqual(lats[0], destination['lat'])
+        self.assertAlmostEqual(lons[0], destination['lon'])
+
+
+class TestDistanceEngineSelection(unittest.TestCase):
+
+    cwd = os.path.dirname(__file__)
+    igc_path = os.path.join(cwd, '..', 'igc_files', 'race_task_completed.igc')
+
+    def tearDown(self):
+        set_default_distance_engine(None)
+
+    def test_default_engine(self):
+        self.assertIsInstance(get_default_distance_engine(), EllipsoidDistanceEngine)
+
+        task = get_task(self.igc_path)
+        self.assertIs(task.distance_engine, get_default_distance_engine())
+        self.assertIs(task.start.engine, get_default_distance_engine())
+
+    def test_global_engine(self):
+        task = get_task(self.igc_path)
+        engine = PlanarDistanceEngine.from_waypoints(task.waypoints)
+        set_default_distance_engine(engine)
+
+        self.assertIs(task.distance_engine, engine)
+        self.assertIs(task.start.engine, engine)
+
+    def test_waypoint_engine_kept_without_task_engine(self):
+        task = get_task(self.igc_path)
+        engine = PlanarDistanceEngine.from_waypoints(task.waypoints)
+        for waypoint in task.waypoints:
+            waypoint.distance_engine = engine
+
+        race_task = RaceTask(task.waypoints, task.timezone, task.start_opening, task.start_time_buffer)
+        self.assertIs(race_task.start.engine, engine)
+
+    def test_planar_trip_equals_ellipsoid_trip(self):
+        task = get_task(self.igc_path)
+        trace = get_trace(self.igc_path)
+        engine = PlanarDistanceEngine.from_waypoints(task.waypoints)
+        planar_task = RaceTask(task.waypoints, task.timezone, task.start_opening, task.start_time_buffer,
+                               distance_engine=engine)
+
+        self.assertIs(planar_task.start.engine, engine)
+
+        trip = Trip(get_task(self.igc_path), trace)
+        planar_trip = Trip(planar_task, trace)
+
+        self.assertListEqual(planar_trip.fixes, trip.fixes)
+        self.assertEqual(planar_trip.refined_start_time, trip.refined_start_time)
@@ -9,6 +9,9 @@ from opensoar.utilities.helper_functions import triple_iterator
 from opensoar.utilities.helper_functions import calculate_distance_bearing
 from opensoar.utilities.helper_functions import range_with_bounds
 from opensoar.utilities.helper_functions import calculate_time_differences
+from opensoar.utilities.helper_functions import calculate_distances_bearings, calculate_destination, \
+    calculate_destinations, calculate_trace_distances_bearings, total_distance_travelled, datetime_to_seconds, \
+    fixes_to_seconds
 
 
 class TestHelperFunctions(unittest.TestCase):
@@ -30,6 +33,60 @@ class TestHelperFunctions(unittest.TestCase):
 
         self.assertEqual(calculate_distance_bearing(fix1, fix2)[0], 0)
 
+    def test_calculate_distances_bearings(self):
+        fixes1 = [dict(lat=52.0, lon=6.0), dict(lat=51.5, lon=5.0), dict(lat=52.3, lon=6.2)]
+        fixes2 = [dict(lat=52.1, lon=6.1), dict(lat=51.0, lon=5.5), dict(lat=52.3, lon=6.2)]
+
+        distances, bearings, final_bearings = calculate_distances_bearings(
+            [fix['lat'] for fix in fixes1], [fix['lon'] for fix in fixes1],
+            [fix['lat'] for fix in fixes2], [fix['lon'] for fix in fixes2])
+
+        for i, (fix1, fix2) in enumerate(zip(fixes1, fixes2)):
+            distance, bearing = calculate_distance_bearing(fix1, fix2)
+            _, final_bearing = calculate_distance_bearing(fix1, fix2, final_bearing=True)
+            self.assertAlmostEqual(distances[i], distance)
+            self.assertAlmostEqual(bearings[i], bearing)
+            self.assertAlmostEqual(final_bearings[i], final_bearing)
+
+    def test_calculate_distances_bearings_broadcast(self):
+        waypoint = dict(lat=52.0, lon=6.0)
+        lats = [52.1, 51.9, 52.0]
+        lons = [6.0, 6.0, 6.3]
+
+        distances, bearings, _ = calculate_distances_bearings(waypoint['lat'], waypoint['lon'], lats, lons)
+
+        self.assertEqual(distances.shape, (3, ))
+        for lat, lon, distance, bearing in zip(lats, lons, distances, bearings):
+            expected_distance, expected_bearing = calculate_distance_bearing(waypoint, dict(lat=lat, lon=lon))
+            self.assertAlmostEqual(distance, expected_distance)
+            self.assertAlmostEqual(bearing, expected_bearing)
+
+    def test_calculate_trace_distances_bearings(self):
+        fixes = [dict(lat=52.0, lon=6.0), dict(lat=52.1, lon=6.1), dict(lat=52.1, lon=6.3)]
+
+        distances, bearings = calculate_trace_distances_bearings(fixes)
+
+        self.assertEqual(len(distances), 2)
+        self.assertEqual(len(bearings), 2)
+        for i, (fix, next_fix) in enumerate(double_iterator(fixes)):
+            distance, bearing = calculate_distance_bearing(fix, next_fix)
+            self.assertAlmostEqual(distances[i], distance)
+            self.assertAlmostEqual(bearings[i], bearing)
+
+        self.assertAlmostEqual(total_distance_travelled(fixes), sum(distances))
+
+    def test_calculate_destinations(self):
+        start = dict(lat=52.0, lon=6.0)
+        distances = [1000, 5000, 20000]
+        bearings = [10, 190, 350]
+
+        lats, lons = calculate_destinations(start['lat'], start['lon'], distances, bearings)
+
+        for lat, lon, distance, bearing in zip(lats, lons, distances, bearings):
+            expected = calculate_destination(start, distance, bearing)
+            self.assertAlmostEqual(lat, expected['lat'])
+            self.assertAlmostEqual(lon, expected['lon'])
+
     def test_range_with_bounds(self):
         self.assertListEqual(range_with_bounds(start=2, stop=4, interval=2), [2, 4])
         self.assertListEqual(range_with_bounds(start=2, stop=6, interval=2), [2, 4, 6])
@@ -45,6 +102,17 @@ class TestHelperFunctions(unittest.TestCase):
         self.assertListEqual(calculate_time_differences(time1, time2, 2), [0, 2, 4, 5])
         self.assertListEqual(calculate_time_differences(time2, time3, 2), [0, 2, 4, 6, 7])
 
+    def test_datetime_to_seconds(self):
+        aware = datetime.datetime(2012, 5, 26, 14, 0, 50, tzinfo=datetime.timezone(datetime.timedelta(hours=2)))
+        naive = datetime.datetime(2012, 5, 26, 12, 0, 50)
+        self.assertEqual(datetime_to_seconds(aware), 1338033650)
+        self.assertEqual(datetime_to_seconds(naive), 1338033650)
+
+    def test_fixes_to_seconds(self):
+        fixes = [dict(datetime=datetime.datetime(2012, 5, 26, 12, 0, 50, tzinfo=datetime.timezone.utc)),
+                 dict(datetime=datetime.datetime(2012, 5, 26, 12, 0, 54, tzinfo=datetime.timezone.utc))]
+        self.assertListEqual(fixes_to_seconds(fixes).tolist(), [1338033650, 1338033654])
+
     def test_interpolate_fixes(self):
         fix1 = dict(datetime=datetime.datetime(2012, 5, 26, 12, 0, 10, tzinfo=datetime.timezone.utc), lat=50, lon=6)
         fix2 = dict(datetime=datetime.datetime(2012, 5, 26, 12, 0, 14, tzinfo=datetime.timezone.utc), lat=58, lon=8)
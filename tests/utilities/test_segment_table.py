@@ -0,0 +1,63 @@
+import os
+import unittest
+
+from opensoar.utilities.helper_functions import calculate_distance_bearing, calculate_bearing_change, \
+    double_iterator, altitude_gain_and_loss, total_distance_travelled
+from opensoar.trace.trace import Trace
+from opensoar.utilities.segment_table import SegmentTable, get_segment_table
+from tests.task.helper_functions import get_trace
+
+
+class TestSegmentTable(unittest.TestCase):
+
+    cwd = os.path.dirname(__file__)
+    igc_path = os.path.join(cwd, '..', 'igc_files', 'race_task_completed.igc')
+    trace = get_trace(igc_path)[0:500]
+
+    def test_distances_bearings(self):
+        segments = SegmentTable(self.trace)
+
+        self.assertEqual(len(segments), len(self.trace) - 1)
+        for i, (fix, next_fix) in enumerate(double_iterator(self.trace)):
+            distance, bearing = calculate_distance_bearing(fix, next_fix)
+            self.assertAlmostEqual(segments.distances[i], distance)
+            self.assertAlmostEqual(segments.bearings[i], bearing)
+
+    def test_bearing_changes(self):
+        """Bearing changes should be exactly equal, including the +/-180 degrees boundary"""
+        segments = SegmentTable(self.trace)
+
+        for i in range(len(self.trace) - 2):
+            expected = calculate_bearing_change(self.trace[i], self.trace[i + 1], self.trace[i + 2])
+            self.assertEqual(segments.bearing_changes[i], expected)
+
+    def test_time_deltas_and_climbs(self):
+        segments = SegmentTable(self.trace)
+
+        for i, (fix, next_fix) in enumerate(double_iterator(self.trace)):
+            self.assertEqual(segments.time_deltas[i], (next_fix['datetime'] - fix['datetime']).total_seconds())
+            self.assertEqual(segments.times[i], fix['datetime'].timestamp())
+            self.assertEqual(segments.climbs()[i], next_fix['gps_alt'] - fix['gps_alt'])
+            self.assertEqual(segments.climbs(gps_altitude=False)[i], next_fix['pressure_alt'] - fix['pressure_alt'])
+
+    def test_cached_table(self):
+        trace = Trace.from_fixes(self.trace)
+        segments = get_segment_table(trace)
+        self.assertIs(get_segment_table(trace), segments)
+        self.assertIsNot(get_segment_table(trace.subtrace(0, 100)), segments)
+        self.assertIsNot(get_segment_table(trace.take(range(0, 500, 2))), segments)
+
+        trace.lat = trace.lat + 0.1
+        self.assertIsNot(get_segment_table(trace), segments)
+
+        # lists of b-records are not cached
+        self.assertIsNot(get_segment_table(self.trace), get_segment_table(self.trace))
+
+    def test_consumers(self):
+        fixes = [dict(lat=52.0, lon=6.0, gps_alt=100), dict(lat=52.1, lon=6.1, gps_alt=150),
+                 dict(lat=52.1, lon=6.3, gps_alt=120)]
+
+        distance1, _ = calculate_distance_bearing(fixes[0], fixes[1])
+        distance2, _ = calculate_distance_bearing(fixes[1], fixes[2])
+        self.assertAlmostEqual(total_distance_travelled(fixes), distance1 + distance2)
+        self.assertEqual(altitude_gain_and_loss(fixes), (50, 30))